@@ -2,11 +2,40 @@
 # SEARCH ALGORITHMS
 # ============================================
 
-from collections import deque
+from collections import OrderedDict, deque
 import heapq
+from itertools import count
+import logging
+import sys
+import time
+
+from compact_graph import CompactGraph
+from contraction_hierarchy import ContractionHierarchy
+from hierarchical_graph import HierarchicalGraph
+from instrumentation import SearchStats, memory_checkpoint, peak_since
+
+
+# All agent/search output goes through this logger. By default it writes
+# plain messages to stdout; silence it per instance with verbose=False or
+# globally with logger.disabled = True (or any logging configuration).
+logger = logging.getLogger('hospital_agent')
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+INFINITY = float('inf')
 
 
 class Node:
+    """
+    Search tree node, kept for API compatibility (reconstruct_path).
+    The searches themselves store parents and costs in flat dicts.
+    """
+    __slots__ = ('state', 'parent', 'action', 'cost')
+    
     def __init__(self, state, parent=None, action=None, cost=0):
         self.state = state
         self.parent = parent
@@ -17,11 +46,207 @@ class Node:
         return self.cost < other.cost
 
 
+class RouteCache:
+    """
+    Bounded LRU cache of search results.
+    
+    Keys contain the graph version, so entries made before an edit of the
+    graph can never be returned afterwards (they simply age out).
+    """
+    
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, heuristics=()):
+        """Return (True, result) on a hit, (False, None) on a miss"""
+        entry = self.entries.get(key)
+        # A* entries remember their heuristic objects: a different dict
+        # that happens to reuse the same id() must not hit
+        if entry is None or len(entry[0]) != len(heuristics) or any(
+                a is not b for a, b in zip(entry[0], heuristics)):
+            self.misses += 1
+            return False, None
+        
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+    
+    def put(self, key, result, heuristics=()):
+        self.entries[key] = (tuple(heuristics), result)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+    
+    def migrate(self, old_version, new_version, keep):
+        """
+        Re-key entries made at old_version to new_version when
+        keep(key, result) says they are still valid; drop the others.
+        """
+        for key, entry in list(self.entries.items()):
+            if key[3] != old_version:
+                continue
+            del self.entries[key]
+            if keep(key, entry[1]):
+                self.entries[key[:3] + (new_version,) + key[4:]] = entry
+    
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+# Searches that return a shortest route (their cached results survive
+# closures of corridors they do not use)
+EXACT_SEARCHES = ('ucs', 'a_star', 'bidirectional_ucs', 'bidirectional_a_star', 'ch', 'hpa')
+
+
 class SearchAlgorithms:
     
-    def __init__(self, graph):
+    def __init__(self, graph, cache_size=0, verbose=True):
         self.graph = graph
+        self.verbose = verbose
+        # Count of the most recent call, kept for compatibility; per-call
+        # numbers (safe with concurrent calls) are in result['stats']
         self.nodes_explored = 0
+        # Optional callbacks: on_expand(state, cost) when a state is
+        # expanded, on_push(state, cost) when one enters the frontier
+        self.on_expand = None
+        self.on_push = None
+        # Optional StatsAggregator receiving every call's SearchStats
+        self.collector = None
+        # CompactGraph inputs are searched on integer ids (see *_indexed),
+        # with work arrays reused across calls (see _workspace)
+        self.compact = isinstance(graph, CompactGraph)
+        self.workspaces = []
+        # Optional LRU route cache in front of the point-to-point searches
+        self.cache = RouteCache(cache_size) if cache_size else None
+        # Contraction hierarchy, built on the first ch_query call
+        self.hierarchy = None
+        # Cluster hierarchy, built on the first hpa_query call
+        self.clusters = None
+        # Keep still-valid cached routes across corridor closures
+        if self.cache is not None and hasattr(graph, 'add_listener'):
+            graph.add_listener(self._edge_changed)
+    
+    def _header(self, title):
+        if self.verbose:
+            logger.info("\n=== %s ===", title)
+    
+    def _search(self, name, method, indexed, initial_state, goal_state, *heuristics):
+        """
+        Shared entry point: route cache lookup, then dict or id-based search
+        (indexed may be None when a search only has the dict version).
+        
+        Results are dicts with 'path', 'cost', 'nodes_explored', 'time'
+        (wall-clock seconds spent answering this call) and 'stats' (the
+        call's SearchStats).
+        """
+        start = time.perf_counter()
+        checkpoint = memory_checkpoint()
+        stats = SearchStats(name)
+        args = (initial_state, goal_state) + heuristics
+        if not (self.compact and indexed is not None):
+            indexed = method
+        
+        if self.cache is None:
+            result = indexed(*args, stats=stats)
+        else:
+            version = getattr(self.graph, 'version', 0)
+            key = (name, initial_state, goal_state, version) + tuple(id(h) for h in heuristics)
+            hit, result = self.cache.get(key, heuristics)
+            if hit:
+                stats.cache_hit = True
+                if result is not None:
+                    result = dict(result, path=list(result['path']))
+            else:
+                result = indexed(*args, stats=stats)
+                if result is not None:
+                    self.cache.put(key, dict(result, path=list(result['path'])), heuristics)
+                else:
+                    self.cache.put(key, None, heuristics)
+        
+        return self._finish(stats, start, checkpoint, result)
+    
+    def _run(self, name, method, *args):
+        """Uncached entry point with the same result format as _search"""
+        start = time.perf_counter()
+        checkpoint = memory_checkpoint()
+        stats = SearchStats(name)
+        result = method(*args, stats=stats)
+        return self._finish(stats, start, checkpoint, result)
+    
+    def _finish(self, stats, start, checkpoint, result):
+        """Close the call's stats, attach them to the result and hand them to the collector"""
+        stats.wall_time = time.perf_counter() - start
+        stats.peak_memory = peak_since(checkpoint)
+        self.nodes_explored = result['nodes_explored'] if result is not None else stats.nodes_explored
+        if result is not None:
+            result['time'] = stats.wall_time
+            result['stats'] = stats
+        if self.collector is not None:
+            self.collector.add(stats)
+        return result
+    
+    def _edge_changed(self, service1, service2, old, new, old_version, new_version):
+        """
+        Graph listener: when a corridor gets longer or closes, optimal
+        routes that do not use it are still optimal (and unreachable goals
+        stay unreachable), so those cache entries move to the new version
+        instead of being recomputed. A shorter corridor can improve any
+        route, so then nothing is carried over.
+        """
+        if new is not None and (old is None or new < old):
+            return
+        corridor = {service1, service2}
+        
+        def keep(key, result):
+            if key[0] not in EXACT_SEARCHES:
+                return False
+            if result is None:
+                return True
+            path = result['path']
+            return not any({a, b} == corridor for a, b in zip(path, path[1:]))
+        
+        self.cache.migrate(old_version, new_version, keep)
+    
+    def cache_stats(self):
+        """Hit/miss counters of the route cache (None when caching is off)"""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def _result(self, parents, goal_state, cost, nodes_explored):
+        """Result dict for goal_state, walking the parents map back to the start"""
+        path = []
+        state = goal_state
+        while state is not None:
+            path.append(state)
+            state = parents[state]
+        path.reverse()
+        
+        return {
+            'path': path,
+            'cost': cost,
+            'nodes_explored': nodes_explored
+        }
+    
+    @staticmethod
+    def _record(stats, pops, stale_pops, pushes, max_frontier):
+        stats.expansions = pops - stale_pops
+        stats.stale_pops = stale_pops
+        stats.pushes = pushes
+        stats.max_frontier = max_frontier
     
     def reconstruct_path(self, node):
         path = []
@@ -37,167 +262,974 @@ class SearchAlgorithms:
     
     
     def bfs(self, initial_state, goal_state):
-        print("\n=== BFS ===")
-        self.nodes_explored = 0
-        
-        frontier = deque([Node(initial_state)])
-        explored = set()
-        in_frontier = {initial_state}
+        self._header("BFS")
+        return self._search('bfs', self._bfs, self._bfs_indexed,
+                            initial_state, goal_state)
+    
+    
+    def _bfs(self, initial_state, goal_state, stats):
+        get_neighbors = self.graph.get_neighbors
+        on_expand, on_push = self.on_expand, self.on_push
+        parents = {initial_state: None}     # also the explored-or-in-frontier set
+        costs = {initial_state: 0}
+        frontier = deque([initial_state])
+        pops = 0
+        pushes = max_frontier = 1
         
         while frontier:
-            current_node = frontier.popleft()
-            in_frontier.remove(current_node.state)
-            self.nodes_explored += 1
-            
-            if current_node.state == goal_state:
-                path, cost = self.reconstruct_path(current_node)
-                return {
-                    'path': path,
-                    'cost': cost,
-                    'nodes_explored': self.nodes_explored
-                }
-            
-            explored.add(current_node.state)
-            
-            neighbors = self.graph.get_neighbors(current_node.state)
-            for neighbor, distance in neighbors.items():
-                if neighbor not in explored and neighbor not in in_frontier:
-                    new_node = Node(
-                        state=neighbor,
-                        parent=current_node,
-                        action=f"Go to {neighbor}",
-                        cost=current_node.cost + distance
-                    )
-                    frontier.append(new_node)
-                    in_frontier.add(neighbor)
+            current = frontier.popleft()
+            pops += 1
+            current_cost = costs[current]
+            if on_expand is not None:
+                on_expand(current, current_cost)
+            
+            if current == goal_state:
+                self._record(stats, pops, 0, pushes, max_frontier)
+                return self._result(parents, goal_state, current_cost, pops)
+            
+            for neighbor, distance in get_neighbors(current).items():
+                if neighbor not in parents:
+                    parents[neighbor] = current
+                    costs[neighbor] = current_cost + distance
+                    frontier.append(neighbor)
+                    pushes += 1
+                    if on_push is not None:
+                        on_push(neighbor, costs[neighbor])
+            if len(frontier) > max_frontier:
+                max_frontier = len(frontier)
         
+        self._record(stats, pops, 0, pushes, max_frontier)
         return None
     
     
     def dfs(self, initial_state, goal_state):
-        print("\n=== DFS ===")
-        self.nodes_explored = 0
-        
-        frontier = [Node(initial_state)]
-        explored = set()
+        self._header("DFS")
+        return self._search('dfs', self._dfs, self._dfs_indexed,
+                            initial_state, goal_state)
+    
+    
+    def _dfs(self, initial_state, goal_state, stats):
+        get_neighbors = self.graph.get_neighbors
+        on_expand, on_push = self.on_expand, self.on_push
+        # Stack entries are (state, parent, cost); a state's parent is fixed
+        # when it is expanded, so duplicates on the stack are harmless
+        frontier = [(initial_state, None, 0)]
+        parents = {}
+        pops = stale_pops = 0
+        pushes = max_frontier = 1
         
         while frontier:
-            current_node = frontier.pop()
-            self.nodes_explored += 1
-            
-            if current_node.state == goal_state:
-                path, cost = self.reconstruct_path(current_node)
-                return {
-                    'path': path,
-                    'cost': cost,
-                    'nodes_explored': self.nodes_explored
-                }
-            
-            if current_node.state not in explored:
-                explored.add(current_node.state)
-                
-                neighbors = self.graph.get_neighbors(current_node.state)
-                neighbor_list = list(neighbors.items())
-                for neighbor, distance in reversed(neighbor_list):
-                    if neighbor not in explored:
-                        new_node = Node(
-                            state=neighbor,
-                            parent=current_node,
-                            action=f"Go to {neighbor}",
-                            cost=current_node.cost + distance
-                        )
-                        frontier.append(new_node)
+            current, parent, current_cost = frontier.pop()
+            pops += 1
+            
+            if current == goal_state:
+                parents[current] = parent
+                if on_expand is not None:
+                    on_expand(current, current_cost)
+                self._record(stats, pops, stale_pops, pushes, max_frontier)
+                return self._result(parents, goal_state, current_cost, pops)
+            
+            if current in parents:
+                stale_pops += 1
+                continue
+            parents[current] = parent
+            if on_expand is not None:
+                on_expand(current, current_cost)
+            
+            neighbor_list = list(get_neighbors(current).items())
+            for neighbor, distance in reversed(neighbor_list):
+                if neighbor not in parents:
+                    frontier.append((neighbor, current, current_cost + distance))
+                    pushes += 1
+                    if on_push is not None:
+                        on_push(neighbor, current_cost + distance)
+            if len(frontier) > max_frontier:
+                max_frontier = len(frontier)
         
+        self._record(stats, pops, stale_pops, pushes, max_frontier)
         return None
     
     
     def ucs(self, initial_state, goal_state):
-        print("\n=== UCS ===")
-        self.nodes_explored = 0
-        
-        frontier = []
-        heapq.heappush(frontier, (0, Node(initial_state)))
-        explored = set()
+        self._header("UCS")
+        return self._search('ucs', self._ucs, self._ucs_indexed,
+                            initial_state, goal_state)
+    
+    
+    def _ucs(self, initial_state, goal_state, stats):
+        return self._a_star(initial_state, goal_state, None, stats=stats)
+    
+    
+    def a_star(self, initial_state, goal_state, heuristic):
+        self._header("A*")
+        return self._search('a_star', self._a_star, self._a_star_indexed,
+                            initial_state, goal_state, heuristic)
+    
+    
+    def _a_star(self, initial_state, goal_state, heuristic, stats):
+        """Shared UCS / A* core (heuristic=None gives UCS)"""
+        get_neighbors = self.graph.get_neighbors
+        on_expand, on_push = self.on_expand, self.on_push
+        h = heuristic.get if heuristic is not None else None
+        # Heap entries are (f, tie-breaker, state): no Node objects and
+        # no Node comparisons; g-costs and parents live in flat dicts
+        counter = count(1)
+        frontier = [(h(initial_state, 0) if h else 0, 0, initial_state)]
         best_cost = {initial_state: 0}
+        parents = {initial_state: None}
+        explored = set()
+        pops = stale_pops = 0
+        pushes = max_frontier = 1
         
         while frontier:
-            current_cost, current_node = heapq.heappop(frontier)
-            self.nodes_explored += 1
+            _, _, current = heapq.heappop(frontier)
+            pops += 1
             
-            if current_node.state in explored:
+            if current in explored:
+                stale_pops += 1
                 continue
             
-            if current_node.state == goal_state:
-                path, cost = self.reconstruct_path(current_node)
-                return {
-                    'path': path,
-                    'cost': cost,
-                    'nodes_explored': self.nodes_explored
-                }
+            g_current = best_cost[current]
+            if on_expand is not None:
+                on_expand(current, g_current)
             
-            explored.add(current_node.state)
+            if current == goal_state:
+                self._record(stats, pops, stale_pops, pushes, max_frontier)
+                return self._result(parents, goal_state, g_current, pops)
             
-            neighbors = self.graph.get_neighbors(current_node.state)
-            for neighbor, distance in neighbors.items():
+            explored.add(current)
+            
+            for neighbor, distance in get_neighbors(current).items():
                 if neighbor not in explored:
-                    new_cost = current_node.cost + distance
+                    g_new = g_current + distance
                     
-                    if neighbor not in best_cost or new_cost < best_cost[neighbor]:
-                        best_cost[neighbor] = new_cost
-                        new_node = Node(
-                            state=neighbor,
-                            parent=current_node,
-                            action=f"Go to {neighbor}",
-                            cost=new_cost
-                        )
-                        heapq.heappush(frontier, (new_cost, new_node))
+                    old = best_cost.get(neighbor)
+                    if old is None or g_new < old:
+                        best_cost[neighbor] = g_new
+                        parents[neighbor] = current
+                        f_new = g_new + h(neighbor, 0) if h else g_new
+                        heapq.heappush(frontier, (f_new, next(counter), neighbor))
+                        pushes += 1
+                        if on_push is not None:
+                            on_push(neighbor, g_new)
+            if len(frontier) > max_frontier:
+                max_frontier = len(frontier)
         
+        self._record(stats, pops, stale_pops, pushes, max_frontier)
         return None
     
     
-    def a_star(self, initial_state, goal_state, heuristic):
-        print("\n=== A* ===")
-        self.nodes_explored = 0
+    def weighted_a_star(self, initial_state, goal_state, heuristic, epsilon=1.5):
+        """
+        A* on f = g + epsilon * h: expands far fewer states than A*, and
+        with a consistent heuristic the route costs at most epsilon times
+        the optimum. result['bound'] is the bound actually proven (often
+        well below epsilon).
+        """
+        self._header("WEIGHTED A*")
+        return self._run('weighted_a_star', self._anytime,
+                         initial_state, goal_state, heuristic, epsilon, None, 0)
+    
+    
+    def anytime_a_star(self, initial_state, goal_state, heuristic, deadline_ms,
+                       epsilon=None, epsilon_step=0.5):
+        """
+        ARA*: a first weighted-A* route (epsilon, default 3) as fast as
+        possible, then repeated searches with a smaller epsilon, reusing
+        the previous search's work, until the route is proven optimal or
+        deadline_ms has passed. The first route is always completed; after
+        that the best route found before the deadline is returned.
+        result has 'bound' (cost <= bound * optimum), 'epsilon' and
+        'iterations'.
+        """
+        self._header("ANYTIME A*")
+        return self._run('anytime_a_star', self._anytime, initial_state, goal_state, heuristic,
+                         3.0 if epsilon is None else epsilon, deadline_ms, epsilon_step)
+    
+    
+    def _anytime(self, initial_state, goal_state, heuristic, epsilon, deadline_ms, epsilon_step, stats):
+        """Shared weighted / anytime A* core (one improvement pass per epsilon)"""
+        deadline = time.perf_counter() + deadline_ms / 1000 if deadline_ms is not None else None
+        get_neighbors = self.graph.get_neighbors
+        on_expand, on_push = self.on_expand, self.on_push
+        h = heuristic.get if heuristic is not None else (lambda state, default=0: 0)
+        counter = count(1)
+        best_cost = {initial_state: 0}
+        parents = {initial_state: None}
+        # OPEN: states waiting in the frontier; INCONS: states whose cost
+        # improved after they were expanded in the current pass (they go
+        # back into OPEN for the next, less inflated pass)
+        in_open = {initial_state}
+        incons = set()
+        frontier = [(epsilon * h(initial_state, 0), 0, initial_state)]
+        solution = None
+        iterations = 0
+        pops = stale_pops = 0
+        pushes = max_frontier = 1
         
-        frontier = []
-        h_initial = heuristic.get(initial_state, 0)
-        heapq.heappush(frontier, (h_initial, Node(initial_state)))
-        explored = set()
+        while True:
+            explored = set()
+            interrupted = False
+            while frontier:
+                goal_cost = best_cost.get(goal_state)
+                if goal_cost is not None and goal_cost <= frontier[0][0]:
+                    break
+                _, _, current = heapq.heappop(frontier)
+                pops += 1
+                if current not in in_open:
+                    stale_pops += 1
+                    continue
+                in_open.discard(current)
+                explored.add(current)
+                
+                g_current = best_cost[current]
+                if on_expand is not None:
+                    on_expand(current, g_current)
+                
+                for neighbor, distance in get_neighbors(current).items():
+                    g_new = g_current + distance
+                    old = best_cost.get(neighbor)
+                    if old is None or g_new < old:
+                        best_cost[neighbor] = g_new
+                        parents[neighbor] = current
+                        if neighbor in explored:
+                            incons.add(neighbor)
+                            continue
+                        in_open.add(neighbor)
+                        heapq.heappush(frontier, (g_new + epsilon * h(neighbor, 0), next(counter), neighbor))
+                        pushes += 1
+                        if on_push is not None:
+                            on_push(neighbor, g_new)
+                if len(frontier) > max_frontier:
+                    max_frontier = len(frontier)
+                if (solution is not None and not pops & 63
+                        and time.perf_counter() > deadline):
+                    interrupted = True
+                    break
+            
+            if interrupted:
+                break
+            if goal_state not in best_cost:
+                self._record(stats, pops, stale_pops, pushes, max_frontier)
+                return None
+            
+            iterations += 1
+            solution = self._result(parents, goal_state, None, pops)
+            path = solution['path']
+            cost = sum(get_neighbors(a)[b] for a, b in zip(path, path[1:]))
+            # Every state left in OPEN / INCONS bounds the optimum from below
+            lower = min((best_cost[state] + h(state, 0) for state in in_open | incons), default=cost)
+            lower = min(lower, cost)
+            bound = min(epsilon, cost / lower) if lower > 0 else 1.0
+            solution.update(cost=cost, bound=bound, epsilon=epsilon, iterations=iterations)
+            
+            if deadline is None or bound <= 1 or time.perf_counter() > deadline:
+                break
+            next_epsilon = max(1.0, min(epsilon - epsilon_step, bound))
+            if next_epsilon >= epsilon:
+                break
+            epsilon = next_epsilon
+            in_open |= incons
+            incons = set()
+            frontier = [(best_cost[state] + epsilon * h(state, 0), next(counter), state) for state in in_open]
+            heapq.heapify(frontier)
+        
+        solution['nodes_explored'] = pops
+        self._record(stats, pops, stale_pops, pushes, max_frontier)
+        return solution
+    
+    
+    def ucs_multi(self, initial_state, goal_states):
+        """
+        One Dijkstra sweep from initial_state that stops once every goal is
+        settled. Returns {goal: result dict or None if unreachable}; each
+        result's nodes_explored is the count when that goal was settled,
+        i.e. exactly what ucs() would report for it. All results share the
+        sweep's SearchStats.
+        """
+        self._header("UCS MULTI")
+        start = time.perf_counter()
+        checkpoint = memory_checkpoint()
+        stats = SearchStats('ucs_multi')
+        get_neighbors = self.graph.get_neighbors
+        on_expand, on_push = self.on_expand, self.on_push
+        remaining = set(goal_states)
+        results = {}
+        
+        counter = count(1)
+        frontier = [(0, 0, initial_state)]
         best_cost = {initial_state: 0}
+        parents = {initial_state: None}
+        explored = set()
+        pops = stale_pops = 0
+        pushes = max_frontier = 1
+        
+        while frontier and remaining:
+            _, _, current = heapq.heappop(frontier)
+            pops += 1
+            
+            if current in explored:
+                stale_pops += 1
+                continue
+            
+            g_current = best_cost[current]
+            if on_expand is not None:
+                on_expand(current, g_current)
+            
+            if current in remaining:
+                remaining.discard(current)
+                results[current] = self._result(parents, current, g_current, pops)
+            
+            explored.add(current)
+            
+            for neighbor, distance in get_neighbors(current).items():
+                if neighbor not in explored:
+                    g_new = g_current + distance
+                    old = best_cost.get(neighbor)
+                    if old is None or g_new < old:
+                        best_cost[neighbor] = g_new
+                        parents[neighbor] = current
+                        heapq.heappush(frontier, (g_new, next(counter), neighbor))
+                        pushes += 1
+                        if on_push is not None:
+                            on_push(neighbor, g_new)
+            if len(frontier) > max_frontier:
+                max_frontier = len(frontier)
+        
+        self._record(stats, pops, stale_pops, pushes, max_frontier)
+        self._finish(stats, start, checkpoint, None)
+        for goal in remaining:
+            results[goal] = None
+        
+        version = getattr(self.graph, 'version', 0)
+        for goal, result in results.items():
+            # Same answers ucs() would give: seed the route cache with them
+            if self.cache is not None:
+                cached = dict(result, path=list(result['path'])) if result else None
+                self.cache.put(('ucs', initial_state, goal, version), cached)
+            if result is not None:
+                result['time'] = stats.wall_time
+                result['stats'] = stats
+        
+        return results
+    
+    
+    def k_shortest_paths(self, initial_state, goal_state, k=3):
+        """
+        Yen's k shortest loopless paths, cheapest first: a list of result
+        dicts (fewer than k when no more routes exist, [] when the goal is
+        unreachable). Each result's nodes_explored is the count when that
+        route was found; all results share the call's SearchStats.
+        """
+        self._header("K SHORTEST PATHS")
+        start = time.perf_counter()
+        checkpoint = memory_checkpoint()
+        stats = SearchStats('k_shortest_paths')
+        results = self._k_shortest(initial_state, goal_state, k, stats)
+        self._finish(stats, start, checkpoint, None)
+        for result in results:
+            result['time'] = stats.wall_time
+            result['stats'] = stats
+        self.nodes_explored = stats.nodes_explored
+        return results
+    
+    
+    def _k_shortest(self, initial_state, goal_state, k, stats):
+        """
+        Every spur search reuses one shortest-path tree grown backwards
+        from the goal, resumed only as far as the spur searches need it
+        (corridors are symmetric). Its distances are an exact A* heuristic
+        on the full graph and stay admissible with corridors removed, and
+        when the tree route from a spur node avoids everything removed it
+        is the spur path, with no search at all. Spur nodes before a
+        path's deviation point are skipped (Lawler).
+        """
+        get_neighbors = self.graph.get_neighbors
+        on_expand, on_push = self.on_expand, self.on_push
+        counter = count(1)
+        to_goal = {}                       # settled: distance to the goal
+        next_hop = {goal_state: None}      # toward the goal
+        tentative = {goal_state: 0}
+        reverse = [(0, 0, goal_state)]
+        pops = stale_pops = pushes = max_frontier = 0
+        
+        def distance_to_goal(state):
+            """Resume the backward search until state is settled (None if unreachable)"""
+            nonlocal pops, stale_pops, pushes
+            while state not in to_goal and reverse:
+                d, _, current = heapq.heappop(reverse)
+                pops += 1
+                if current in to_goal:
+                    stale_pops += 1
+                    continue
+                to_goal[current] = d
+                for neighbor, distance in get_neighbors(current).items():
+                    nd = d + distance
+                    if neighbor not in to_goal and nd < tentative.get(neighbor, INFINITY):
+                        tentative[neighbor] = nd
+                        next_hop[neighbor] = current
+                        heapq.heappush(reverse, (nd, next(counter), neighbor))
+                        pushes += 1
+            return to_goal.get(state)
+        
+        def spur_path(spur, banned_nodes, banned_next):
+            """Cheapest spur -> goal route avoiding banned nodes and first hops"""
+            nonlocal pops, stale_pops, pushes, max_frontier
+            if distance_to_goal(spur) is None:
+                return None, INFINITY
+            # The tree route, when nothing on it was removed
+            path = [spur]
+            state = next_hop[spur]
+            if state not in banned_next:
+                while state is not None and state not in banned_nodes:
+                    path.append(state)
+                    state = next_hop[state]
+                if state is None:
+                    return path, to_goal[spur]
+            
+            best_cost = {spur: 0}
+            parents = {spur: None}
+            explored = set()
+            frontier = [(to_goal[spur], 0, spur)]
+            while frontier:
+                _, _, current = heapq.heappop(frontier)
+                pops += 1
+                if current in explored:
+                    stale_pops += 1
+                    continue
+                g_current = best_cost[current]
+                if on_expand is not None:
+                    on_expand(current, g_current)
+                if current == goal_state:
+                    return self._result(parents, goal_state, g_current, 0)['path'], g_current
+                explored.add(current)
+                for neighbor, distance in get_neighbors(current).items():
+                    if neighbor in explored or neighbor in banned_nodes:
+                        continue
+                    if current == spur and neighbor in banned_next:
+                        continue
+                    h = distance_to_goal(neighbor)
+                    if h is None:
+                        continue
+                    g_new = g_current + distance
+                    old = best_cost.get(neighbor)
+                    if old is None or g_new < old:
+                        best_cost[neighbor] = g_new
+                        parents[neighbor] = current
+                        heapq.heappush(frontier, (g_new + h, next(counter), neighbor))
+                        pushes += 1
+                        if on_push is not None:
+                            on_push(neighbor, g_new)
+                if len(frontier) > max_frontier:
+                    max_frontier = len(frontier)
+            return None, INFINITY
+        
+        first, cost = spur_path(initial_state, (), ())
+        if first is None:
+            self._record(stats, pops, stale_pops, pushes, max_frontier)
+            return []
+        
+        found = [(first, 0)]               # (path, deviation index)
+        results = [{'path': first, 'cost': cost, 'nodes_explored': pops}]
+        candidates = []
+        seen = {tuple(first)}
+        
+        while len(found) < k:
+            path, deviation = found[-1]
+            root_cost = 0
+            for j in range(len(path) - 1):
+                if j >= deviation:
+                    spur = path[j]
+                    root = path[:j + 1]
+                    banned_next = {p[j + 1] for p, _ in found if len(p) > j + 1 and p[:j + 1] == root}
+                    tail, tail_cost = spur_path(spur, set(root[:-1]), banned_next)
+                    if tail is not None:
+                        candidate = root[:-1] + tail
+                        key = tuple(candidate)
+                        if key not in seen:
+                            seen.add(key)
+                            heapq.heappush(candidates, (root_cost + tail_cost, next(counter), candidate, j))
+                root_cost += get_neighbors(path[j])[path[j + 1]]
+            
+            if not candidates:
+                break
+            cost, _, path, deviation = heapq.heappop(candidates)
+            found.append((path, deviation))
+            results.append({'path': path, 'cost': cost, 'nodes_explored': pops})
+        
+        self._record(stats, pops, stale_pops, pushes, max_frontier)
+        return results
+    
+    
+    def td_ucs(self, initial_state, goal_state, departure_time):
+        """Time-dependent Dijkstra: edge costs follow the graph's congestion profiles"""
+        self._header("TIME-DEPENDENT UCS")
+        return self._run('td_ucs', self._time_dependent,
+                         initial_state, goal_state, departure_time, None)
+    
+    
+    def td_a_star(self, initial_state, goal_state, departure_time, heuristic):
+        """
+        Time-dependent A*. The heuristic must not exceed the remaining travel
+        time at any hour, e.g. a static-distance heuristic when every profile
+        stays at or above the static distance (congestion factors >= 1).
+        """
+        self._header("TIME-DEPENDENT A*")
+        return self._run('td_a_star', self._time_dependent,
+                         initial_state, goal_state, departure_time, heuristic)
+    
+    
+    def _time_dependent(self, initial_state, goal_state, departure_time, heuristic, stats):
+        """
+        Labels are arrival times. With FIFO profiles, settling the earliest
+        arrival first is exact, just like static Dijkstra.
+        Result: path, cost (travel duration), nodes_explored, departure,
+        arrival, time, stats.
+        """
+        get_neighbors = self.graph.get_neighbors
+        on_expand, on_push = self.on_expand, self.on_push
+        profiles = getattr(self.graph, 'profiles', {})
+        h = heuristic.get if heuristic is not None else None
+        
+        counter = count(1)
+        frontier = [(departure_time + (h(initial_state, 0) if h else 0), 0, initial_state)]
+        arrival = {initial_state: departure_time}
+        parents = {initial_state: None}
+        explored = set()
+        pops = stale_pops = 0
+        pushes = max_frontier = 1
         
         while frontier:
-            f_current, current_node = heapq.heappop(frontier)
-            self.nodes_explored += 1
+            _, _, current = heapq.heappop(frontier)
+            pops += 1
             
-            if current_node.state in explored:
+            if current in explored:
+                stale_pops += 1
                 continue
             
-            if current_node.state == goal_state:
-                path, cost = self.reconstruct_path(current_node)
-                return {
-                    'path': path,
-                    'cost': cost,
-                    'nodes_explored': self.nodes_explored
-                }
+            t_current = arrival[current]
+            if on_expand is not None:
+                on_expand(current, t_current)
+            
+            if current == goal_state:
+                self._record(stats, pops, stale_pops, pushes, max_frontier)
+                result = self._result(parents, goal_state, t_current - departure_time, pops)
+                result['departure'] = departure_time
+                result['arrival'] = t_current
+                return result
             
-            explored.add(current_node.state)
+            explored.add(current)
             
-            neighbors = self.graph.get_neighbors(current_node.state)
-            for neighbor, distance in neighbors.items():
+            for neighbor, distance in get_neighbors(current).items():
                 if neighbor not in explored:
-                    g_new = current_node.cost + distance
+                    profile = profiles.get((current, neighbor))
+                    t_new = t_current + (profile.travel_time(t_current) if profile else distance)
                     
-                    if neighbor not in best_cost or g_new < best_cost[neighbor]:
-                        best_cost[neighbor] = g_new
-                        h_new = heuristic.get(neighbor, 0)
-                        f_new = g_new + h_new
-                        
-                        new_node = Node(
-                            state=neighbor,
-                            parent=current_node,
-                            action=f"Go to {neighbor}",
-                            cost=g_new
-                        )
-                        heapq.heappush(frontier, (f_new, new_node))
+                    old = arrival.get(neighbor)
+                    if old is None or t_new < old:
+                        arrival[neighbor] = t_new
+                        parents[neighbor] = current
+                        f_new = t_new + h(neighbor, 0) if h else t_new
+                        heapq.heappush(frontier, (f_new, next(counter), neighbor))
+                        pushes += 1
+                        if on_push is not None:
+                            on_push(neighbor, t_new)
+            if len(frontier) > max_frontier:
+                max_frontier = len(frontier)
         
+        self._record(stats, pops, stale_pops, pushes, max_frontier)
         return None
+    
+    
+    def bidirectional_ucs(self, initial_state, goal_state):
+        self._header("BIDIRECTIONAL UCS")
+        return self._search('bidirectional_ucs', self._bidirectional_ucs, None,
+                            initial_state, goal_state)
+    
+    
+    def bidirectional_a_star(self, initial_state, goal_state, heuristic, reverse_heuristic):
+        """
+        heuristic estimates the distance to goal_state, reverse_heuristic the
+        distance to initial_state. Both sides use the average potential
+        (h_goal - h_start) / 2, which keeps the result optimal as long as
+        both heuristics are consistent.
+        """
+        self._header("BIDIRECTIONAL A*")
+        return self._search('bidirectional_a_star', self._bidirectional_a_star, None,
+                            initial_state, goal_state, heuristic, reverse_heuristic)
+    
+    
+    def _bidirectional_ucs(self, initial_state, goal_state, stats):
+        return self._bidirectional(initial_state, goal_state, None, stats)
+    
+    
+    def _bidirectional_a_star(self, initial_state, goal_state, heuristic, reverse_heuristic, stats):
+        def potential(state):
+            return (heuristic.get(state, 0) - reverse_heuristic.get(state, 0)) / 2
+        return self._bidirectional(initial_state, goal_state, potential, stats)
+    
+    
+    def _bidirectional(self, initial_state, goal_state, potential, stats):
+        """
+        Forward search from initial_state and backward search from goal_state,
+        always expanding the side with the smaller key. Corridors are
+        symmetric, so the backward search follows the same neighbor lists.
+        
+        Keys are g + p(v) forward and g - p(v) backward; with p = 0 this is
+        plain bidirectional Dijkstra. The search stops once the two smallest
+        keys add up to at least the best meeting cost found so far.
+        """
+        if initial_state == goal_state:
+            self._record(stats, 1, 0, 1, 1)
+            return {'path': [initial_state], 'cost': 0, 'nodes_explored': 1}
+        
+        on_expand, on_push = self.on_expand, self.on_push
+        p_start = potential(initial_state) if potential else 0
+        p_goal = potential(goal_state) if potential else 0
+        best_cost = ({initial_state: 0}, {goal_state: 0})
+        parents = ({initial_state: None}, {goal_state: None})
+        explored = (set(), set())
+        frontiers = ([(p_start, 0, initial_state)], [(-p_goal, 0, goal_state)])
+        signs = (1, -1)
+        counter = 1
+        pops = stale_pops = 0
+        pushes = max_frontier = 2
+        
+        best_total = None
+        meeting = None
+        
+        while frontiers[0] and frontiers[1]:
+            top_forward = frontiers[0][0][0]
+            top_backward = frontiers[1][0][0]
+            if best_total is not None and top_forward + top_backward >= best_total:
+                break
+            
+            side = 0 if top_forward <= top_backward else 1
+            other = 1 - side
+            _, _, current = heapq.heappop(frontiers[side])
+            pops += 1
+            
+            if current in explored[side]:
+                stale_pops += 1
+                continue
+            explored[side].add(current)
+            
+            costs = best_cost[side]
+            other_costs = best_cost[other]
+            g_current = costs[current]
+            if on_expand is not None:
+                on_expand(current, g_current)
+            
+            for neighbor, distance in self.graph.get_neighbors(current).items():
+                g_new = g_current + distance
+                if neighbor not in costs or g_new < costs[neighbor]:
+                    costs[neighbor] = g_new
+                    parents[side][neighbor] = current
+                    key = g_new + signs[side] * potential(neighbor) if potential else g_new
+                    heapq.heappush(frontiers[side], (key, counter, neighbor))
+                    counter += 1
+                    pushes += 1
+                    if on_push is not None:
+                        on_push(neighbor, g_new)
+                    
+                    if neighbor in other_costs:
+                        total = g_new + other_costs[neighbor]
+                        if best_total is None or total < best_total:
+                            best_total = total
+                            meeting = neighbor
+            
+            frontier_size = len(frontiers[0]) + len(frontiers[1])
+            if frontier_size > max_frontier:
+                max_frontier = frontier_size
+        
+        self._record(stats, pops, stale_pops, pushes, max_frontier)
+        if meeting is None:
+            return None
+        
+        path = []
+        state = meeting
+        while state is not None:
+            path.append(state)
+            state = parents[0][state]
+        path.reverse()
+        state = parents[1][meeting]
+        while state is not None:
+            path.append(state)
+            state = parents[1][state]
+        
+        return {
+            'path': path,
+            'cost': best_total,
+            'nodes_explored': pops
+        }
+    
+    
+    def ch_query(self, initial_state, goal_state):
+        """Contraction-hierarchy query (preprocesses once, again after graph edits)"""
+        self._header("CONTRACTION HIERARCHY")
+        return self._search('ch', self._ch_query, None, initial_state, goal_state)
+    
+    
+    def _ch_query(self, initial_state, goal_state, stats):
+        if self.hierarchy is None:
+            # Snapshots carry a ready-made hierarchy
+            self.hierarchy = getattr(self.graph, 'hierarchy', None) or ContractionHierarchy(self.graph)
+        result = self.hierarchy.query(initial_state, goal_state)
+        if result is not None:
+            stats.expansions = result['nodes_explored']
+        return result
+    
+    
+    def hpa_query(self, initial_state, goal_state):
+        """Hierarchical (cluster-level) query (preprocesses once, again after graph edits)"""
+        self._header("HIERARCHICAL SEARCH")
+        return self._search('hpa', self._hpa_query, None, initial_state, goal_state)
+    
+    
+    def _hpa_query(self, initial_state, goal_state, stats):
+        if self.clusters is None:
+            self.clusters = HierarchicalGraph(self.graph)
+        result = self.clusters.query(initial_state, goal_state)
+        if result is not None:
+            stats.expansions = result['nodes_explored']
+        return result
+    
+    
+    # ----------------------------------------
+    # Integer-id searches on a CompactGraph
+    # ----------------------------------------
+    
+    def _workspace(self):
+        """
+        (parent, cost, flags, touched) arrays for one id-based search, taken
+        from a pool so concurrent searches never share them. parent is -1,
+        cost None and flags 0 everywhere; searches append every id they set
+        to touched, and _release resets only those entries, so a query
+        costs what it visits, not the size of the graph.
+        """
+        try:
+            return self.workspaces.pop()
+        except IndexError:
+            n = len(self.graph)
+            return [-1] * n, [None] * n, bytearray(n), []
+    
+    
+    def _release(self, workspace):
+        parent, cost, flags, touched = workspace
+        for i in touched:
+            parent[i] = -1
+            cost[i] = None
+            flags[i] = 0
+        touched.clear()
+        self.workspaces.append(workspace)
+    
+    
+    def _indexed_result(self, parent, cost, start, goal, nodes_explored):
+        names = self.graph.names
+        path = []
+        current = goal
+        while current != start:
+            path.append(names[current])
+            current = parent[current]
+        path.append(names[start])
+        path.reverse()
+        
+        return {
+            'path': path,
+            'cost': cost,
+            'nodes_explored': nodes_explored
+        }
+    
+    
+    def _bfs_indexed(self, initial_state, goal_state, stats):
+        g = self.graph
+        start = g.ids.get(initial_state)
+        goal = g.ids.get(goal_state, -1)
+        if start is None:
+            return None
+        offsets, targets, weights, names = g.offsets, g.targets, g.weights, g.names
+        on_expand, on_push = self.on_expand, self.on_push
+        
+        workspace = self._workspace()
+        parent, cost, seen, touched = workspace   # seen: explored or already in the frontier
+        try:
+            cost[start] = 0
+            seen[start] = 1
+            touched.append(start)
+            frontier = deque([start])
+            pops = 0
+            pushes = max_frontier = 1
+            
+            while frontier:
+                current = frontier.popleft()
+                pops += 1
+                if on_expand is not None:
+                    on_expand(names[current], cost[current])
+                
+                if current == goal:
+                    self._record(stats, pops, 0, pushes, max_frontier)
+                    return self._indexed_result(parent, cost[goal], start, goal, pops)
+                
+                for k in range(offsets[current], offsets[current + 1]):
+                    neighbor = targets[k]
+                    if not seen[neighbor]:
+                        seen[neighbor] = 1
+                        touched.append(neighbor)
+                        parent[neighbor] = current
+                        cost[neighbor] = cost[current] + weights[k]
+                        frontier.append(neighbor)
+                        pushes += 1
+                        if on_push is not None:
+                            on_push(names[neighbor], cost[neighbor])
+                if len(frontier) > max_frontier:
+                    max_frontier = len(frontier)
+            
+            self._record(stats, pops, 0, pushes, max_frontier)
+            return None
+        finally:
+            self._release(workspace)
+    
+    
+    def _dfs_indexed(self, initial_state, goal_state, stats):
+        g = self.graph
+        start = g.ids.get(initial_state)
+        goal = g.ids.get(goal_state, -1)
+        if start is None:
+            return None
+        offsets, targets, weights, names = g.offsets, g.targets, g.weights, g.names
+        on_expand, on_push = self.on_expand, self.on_push
+        
+        workspace = self._workspace()
+        parent, _, explored, touched = workspace
+        try:
+            frontier = [(start, -1, 0)]
+            pops = stale_pops = 0
+            pushes = max_frontier = 1
+            
+            while frontier:
+                current, came_from, current_cost = frontier.pop()
+                pops += 1
+                
+                if current == goal:
+                    parent[current] = came_from
+                    touched.append(current)
+                    if on_expand is not None:
+                        on_expand(names[current], current_cost)
+                    self._record(stats, pops, stale_pops, pushes, max_frontier)
+                    return self._indexed_result(parent, current_cost, start, goal, pops)
+                
+                if explored[current]:
+                    stale_pops += 1
+                    continue
+                explored[current] = 1
+                touched.append(current)
+                parent[current] = came_from
+                if on_expand is not None:
+                    on_expand(names[current], current_cost)
+                
+                for k in range(offsets[current + 1] - 1, offsets[current] - 1, -1):
+                    neighbor = targets[k]
+                    if not explored[neighbor]:
+                        frontier.append((neighbor, current, current_cost + weights[k]))
+                        pushes += 1
+                        if on_push is not None:
+                            on_push(names[neighbor], current_cost + weights[k])
+                if len(frontier) > max_frontier:
+                    max_frontier = len(frontier)
+            
+            self._record(stats, pops, stale_pops, pushes, max_frontier)
+            return None
+        finally:
+            self._release(workspace)
+    
+    
+    def _ucs_indexed(self, initial_state, goal_state, stats):
+        return self._a_star_indexed(initial_state, goal_state, None, stats=stats)
+    
+    
+    def _a_star_indexed(self, initial_state, goal_state, heuristic, stats):
+        g = self.graph
+        start = g.ids.get(initial_state)
+        goal = g.ids.get(goal_state, -1)
+        if start is None:
+            return None
+        offsets, targets, weights, names = g.offsets, g.targets, g.weights, g.names
+        on_expand, on_push = self.on_expand, self.on_push
+        
+        workspace = self._workspace()
+        parent, best_cost, explored, touched = workspace
+        try:
+            best_cost[start] = 0
+            touched.append(start)
+            h_initial = heuristic.get(initial_state, 0) if heuristic is not None else 0
+            frontier = [(h_initial, start)]
+            pops = stale_pops = 0
+            pushes = max_frontier = 1
+            
+            while frontier:
+                _, current = heapq.heappop(frontier)
+                pops += 1
+                
+                if explored[current]:
+                    stale_pops += 1
+                    continue
+                
+                g_current = best_cost[current]
+                if on_expand is not None:
+                    on_expand(names[current], g_current)
+                
+                if current == goal:
+                    self._record(stats, pops, stale_pops, pushes, max_frontier)
+                    return self._indexed_result(parent, g_current, start, goal, pops)
+                
+                explored[current] = 1
+                
+                for k in range(offsets[current], offsets[current + 1]):
+                    neighbor = targets[k]
+                    if not explored[neighbor]:
+                        g_new = g_current + weights[k]
+                        old = best_cost[neighbor]
+                        
+                        if old is None or g_new < old:
+                            if old is None:
+                                touched.append(neighbor)
+                            best_cost[neighbor] = g_new
+                            parent[neighbor] = current
+                            if heuristic is not None:
+                                f_new = g_new + heuristic.get(names[neighbor], 0)
+                            else:
+                                f_new = g_new
+                            heapq.heappush(frontier, (f_new, neighbor))
+                            pushes += 1
+                            if on_push is not None:
+                                on_push(names[neighbor], g_new)
+                if len(frontier) > max_frontier:
+                    max_frontier = len(frontier)
+            
+            self._record(stats, pops, stale_pops, pushes, max_frontier)
+            return None
+        finally:
+            self._release(workspace)
+    
+    
+    def table_lookup(self, initial_state, goal_state):
+        """Shortest-path table lookup (HospitalGraph or snapshot graphs only)"""
+        if not hasattr(self.graph, 'shortest_path'):
+            raise ValueError(f"{type(self.graph).__name__} has no shortest-path table; "
+                             "use a HospitalGraph or a snapshot")
+        self._header("TABLE")
+        return self._run('table', self._table_lookup, initial_state, goal_state)
+    
+    
+    def _table_lookup(self, initial_state, goal_state, stats):
+        route = self.graph.shortest_path(initial_state, goal_state)
+        if route is None:
+            return None
+        
+        path, cost = route
+        stats.expansions = len(path)
+        return {
+            'path': path,
+            'cost': cost,
+            'nodes_explored': len(path)
+        }
@@ -0,0 +1,95 @@
+# ============================================
+# BATCH MISSION PLANNING
+# ============================================
+# Plans many missions at once across a process pool
+# Where processes can fork, workers inherit the parent's graph
+# (copy-on-write) instead of unpickling a copy each; elsewhere every
+# worker receives the graph once at start-up. Pages a worker touches
+# still get copied (reference counts), so for graphs that must stay
+# shared use a snapshot (snapshot.py): its arrays are a mapped file.
+# Every worker keeps its own agent; jobs only carry the request lists
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import random
+import time
+
+from distribution_agent import DistributionAgent
+from hospital_graph import HospitalGraph
+
+
+# Per-process agent, created by _init_worker
+_worker_agent = None
+# Graph handed to forked workers without pickling (set while a pool runs)
+_shared_graph = None
+
+
+def _init_worker(graph=None):
+    global _worker_agent
+    _worker_agent = DistributionAgent(graph if graph is not None else _shared_graph, verbose=False)
+
+
+def _plan_one(job):
+    requests, algorithm, tour = job
+    result = _worker_agent.execute_mission(list(requests), algorithm=algorithm, tour=tour)
+    # Per-leg details stay in the worker, only the summary is sent back
+    del result['legs']
+    return result
+
+
+def plan_missions(batch, algorithm='ucs', workers=None, tour=None, graph=None, chunksize=None):
+    """
+    Plan every request list in `batch` and return one result per mission
+    (same order as the input): requests, route, distance, deliveries,
+    delivered, nodes_explored, planning_time.
+
+    workers: number of processes (None = os.cpu_count(), 1 = run in-process)
+    graph: HospitalGraph, or a SnapshotGraph (snapshot.py). Forked workers
+    inherit the graph copy-on-write; without fork a HospitalGraph is
+    pickled to every worker, while a snapshot is mapped from its file
+    """
+    if graph is None:
+        graph = HospitalGraph()
+    # Build derived tables once here so workers inherit them ready-made
+    if isinstance(graph, HospitalGraph):
+        graph.get_path_table()
+
+    jobs = [(requests, algorithm, tour) for requests in batch]
+
+    if workers == 1:
+        _init_worker(graph)
+        return [_plan_one(job) for job in jobs]
+
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (workers * 4))
+
+    global _shared_graph
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context, initargs = multiprocessing.get_context('fork'), ()
+        _shared_graph = graph
+    else:
+        context, initargs = None, (graph,)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=initargs) as executor:
+            return list(executor.map(_plan_one, jobs, chunksize=chunksize))
+    finally:
+        _shared_graph = None
+
+
+if __name__ == "__main__":
+    hospital = HospitalGraph()
+    destinations = [s for s in hospital.services if s != 'Pharmacy']
+
+    rng = random.Random(42)
+    batch = [rng.sample(destinations, rng.randint(1, 4)) for _ in range(5000)]
+
+    start = time.perf_counter()
+    results = plan_missions(batch, algorithm='ucs', graph=hospital)
+    elapsed = time.perf_counter() - start
+
+    print(f"Missions planned: {len(results)}")
+    print(f"Total distance: {sum(r['distance'] for r in results)} units")
+    print(f"Elapsed: {elapsed:.2f} s ({len(results) / elapsed:.0f} missions/s)")
@@ -0,0 +1,280 @@
+# ============================================
+# BENCHMARK SUITE
+# ============================================
+# Non-interactive benchmark of the search engines on synthetic hospital
+# graphs (same adjacency format as HospitalGraph):
+# - grid wards, multi-floor buildings with elevator shafts,
+#   random geometric graphs, from 10 up to 1M nodes
+# Latencies are measured with perf_counter over repeated runs and
+# reported as percentiles in a JSON file for regression tracking.
+#
+# Example:
+#   python benchmark.py --sizes 100,10000 --kinds grid,geometric --output bench.json
+
+import argparse
+from datetime import datetime, timezone
+import json
+import math
+import platform
+import random
+import sys
+import time
+
+from algorithms import SearchAlgorithms
+from heuristics import make_heuristic
+from hospital_graph import HospitalGraph
+
+
+# ----------------------------------------
+# Synthetic graph generators
+# ----------------------------------------
+
+def _connect(graph, a, b, distance):
+    graph.setdefault(a, {})[b] = distance
+    graph.setdefault(b, {})[a] = distance
+
+
+def grid_ward(rows, cols, seed=0):
+    """rows x cols corridor grid, rooms 'W<r>-<c>' with distances 1-5"""
+    rng = random.Random(seed)
+    graph = {}
+    coordinates = {}
+    for r in range(rows):
+        for c in range(cols):
+            name = f"W{r}-{c}"
+            graph.setdefault(name, {})
+            coordinates[name] = (r, c)
+            if r + 1 < rows:
+                _connect(graph, name, f"W{r + 1}-{c}", rng.randint(1, 5))
+            if c + 1 < cols:
+                _connect(graph, name, f"W{r}-{c + 1}", rng.randint(1, 5))
+    return _hospital(graph, coordinates)
+
+
+def multi_floor(floors, rows, cols, elevators=2, elevator_cost=4, seed=0):
+    """Stacked grid floors 'F<f>-<r>-<c>' linked by elevator shafts"""
+    rng = random.Random(seed)
+    graph = {}
+    coordinates = {}
+    shafts = [(rng.randrange(rows), rng.randrange(cols)) for _ in range(elevators)]
+
+    for f in range(floors):
+        for r in range(rows):
+            for c in range(cols):
+                name = f"F{f}-{r}-{c}"
+                graph.setdefault(name, {})
+                coordinates[name] = (r, c, f)
+                if r + 1 < rows:
+                    _connect(graph, name, f"F{f}-{r + 1}-{c}", rng.randint(1, 5))
+                if c + 1 < cols:
+                    _connect(graph, name, f"F{f}-{r}-{c + 1}", rng.randint(1, 5))
+        if f + 1 < floors:
+            for r, c in shafts:
+                _connect(graph, f"F{f}-{r}-{c}", f"F{f + 1}-{r}-{c}", elevator_cost)
+
+    return _hospital(graph, coordinates)
+
+
+def random_geometric(n, radius=None, seed=0):
+    """
+    n rooms at random points of the unit square, connected when closer
+    than radius (default just above the connectivity threshold).
+    Distance = 1 + 100 * straight-line length, rounded.
+    """
+    rng = random.Random(seed)
+    if radius is None:
+        radius = math.sqrt(3 * math.log(max(n, 2)) / (math.pi * max(n, 2)))
+    points = [(rng.random(), rng.random()) for _ in range(n)]
+
+    # Bucket points into radius-sized cells so only nearby cells are compared
+    cells = {}
+    for i, (x, y) in enumerate(points):
+        cells.setdefault((int(x / radius), int(y / radius)), []).append(i)
+
+    graph = {f"G{i}": {} for i in range(n)}
+    for (cx, cy), members in cells.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in cells.get((cx + dx, cy + dy), ()):
+                    for i in members:
+                        if i < j:
+                            d = math.dist(points[i], points[j])
+                            if d <= radius:
+                                _connect(graph, f"G{i}", f"G{j}", 1 + round(100 * d))
+
+    coordinates = {f"G{i}": (100 * x, 100 * y) for i, (x, y) in enumerate(points)}
+    return _hospital(graph, coordinates)
+
+
+def _hospital(graph, coordinates):
+    return HospitalGraph(graph, precompute_paths=False, coordinates=coordinates)
+
+
+def generate(kind, n, seed=0):
+    """Graph of the given kind with roughly n nodes"""
+    if kind == 'grid':
+        side = max(2, math.isqrt(n))
+        return grid_ward(side, max(2, n // side), seed)
+    if kind == 'floors':
+        floors = max(1, min(10, n // 1000 + 1))
+        side = max(2, math.isqrt(max(4, n // floors)))
+        return multi_floor(floors, side, side, seed=seed)
+    if kind == 'geometric':
+        return random_geometric(n, seed=seed)
+    raise ValueError(f"Unknown graph kind: {kind}")
+
+
+# ----------------------------------------
+# Engines
+# ----------------------------------------
+
+# Engines whose preprocessing is too heavy beyond this many nodes
+SIZE_LIMITS = {'table': 2000, 'ch': 20000, 'hpa': 50000, 'dfs': 200000}
+ENGINES = ['bfs', 'dfs', 'ucs', 'astar', 'bi_ucs', 'bi_astar', 'ucs_compact', 'ch', 'hpa', 'table']
+
+
+def prepare(engine, hospital):
+    """Return a query function (source, goal) -> result dict for engine"""
+    if engine == 'ucs_compact':
+        search = SearchAlgorithms(hospital.compile(), verbose=False)
+        return search.ucs
+
+    search = SearchAlgorithms(hospital, verbose=False)
+    if engine == 'bfs':
+        return search.bfs
+    if engine == 'dfs':
+        return search.dfs
+    if engine == 'ucs':
+        return search.ucs
+    if engine == 'bi_ucs':
+        return search.bidirectional_ucs
+    if engine in ('astar', 'bi_astar'):
+        heuristics = make_heuristic(hospital)
+        if engine == 'astar':
+            return lambda s, g: search.a_star(s, g, heuristics.for_goal(g))
+        return lambda s, g: search.bidirectional_a_star(
+            s, g, heuristics.for_goal(g), heuristics.for_goal(s))
+    if engine == 'ch':
+        search.ch_query(hospital.services[0], hospital.services[0])
+        return search.ch_query
+    if engine == 'hpa':
+        search.hpa_query(hospital.services[0], hospital.services[0])
+        return search.hpa_query
+    if engine == 'table':
+        hospital.build_path_table()
+        return search.table_lookup
+    raise ValueError(f"Unknown engine: {engine}")
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_engine(engine, hospital, queries, repeats):
+    setup_start = time.perf_counter()
+    query = prepare(engine, hospital)
+    setup_time = time.perf_counter() - setup_start
+
+    # One warm-up pass so lazy structures are not billed to the first query
+    query(*queries[0])
+
+    latencies = []
+    nodes = []
+    unreachable = 0
+    for _ in range(repeats):
+        for source, goal in queries:
+            start = time.perf_counter()
+            result = query(source, goal)
+            latencies.append(time.perf_counter() - start)
+            if result is None:
+                unreachable += 1
+            else:
+                nodes.append(result['nodes_explored'])
+
+    latencies.sort()
+    return {
+        'engine': engine,
+        'setup_s': setup_time,
+        'runs': len(latencies),
+        'unreachable': unreachable,
+        'mean_s': sum(latencies) / len(latencies),
+        'min_s': latencies[0],
+        'p50_s': percentile(latencies, 50),
+        'p90_s': percentile(latencies, 90),
+        'p95_s': percentile(latencies, 95),
+        'p99_s': percentile(latencies, 99),
+        'max_s': latencies[-1],
+        'mean_nodes_explored': sum(nodes) / len(nodes) if nodes else None
+    }
+
+
+def run_benchmark(kinds, sizes, engines, queries=50, repeats=3, seed=0, log=print):
+    results = []
+    for kind in kinds:
+        for size in sizes:
+            start = time.perf_counter()
+            hospital = generate(kind, size, seed)
+            build_time = time.perf_counter() - start
+            stats = hospital.get_statistics()
+
+            rng = random.Random(seed)
+            pairs = [(rng.choice(hospital.services), rng.choice(hospital.services))
+                     for _ in range(queries)]
+
+            for engine in engines:
+                if stats['nodes'] > SIZE_LIMITS.get(engine, math.inf):
+                    log(f"{kind:<10} n={stats['nodes']:<8} {engine:<12} skipped (too large)")
+                    continue
+                entry = run_engine(engine, hospital, pairs, repeats)
+                entry.update({
+                    'kind': kind,
+                    'size': size,
+                    'nodes': stats['nodes'],
+                    'edges': stats['edges'],
+                    'build_s': build_time
+                })
+                results.append(entry)
+                log(f"{kind:<10} n={stats['nodes']:<8} {engine:<12} "
+                    f"p50 {entry['p50_s'] * 1e3:9.3f} ms  p99 {entry['p99_s'] * 1e3:9.3f} ms  "
+                    f"nodes {entry['mean_nodes_explored'] or 0:10.1f}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark search engines on synthetic hospital graphs")
+    parser.add_argument('--kinds', default='grid,floors,geometric')
+    parser.add_argument('--sizes', default='10,100,1000,10000')
+    parser.add_argument('--engines', default=','.join(ENGINES))
+    parser.add_argument('--queries', type=int, default=50, help="random (source, goal) pairs per graph")
+    parser.add_argument('--repeats', type=int, default=3, help="passes over the query set")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(
+        kinds=args.kinds.split(','),
+        sizes=[int(s) for s in args.sizes.split(',')],
+        engines=args.engines.split(','),
+        queries=args.queries,
+        repeats=args.repeats,
+        seed=args.seed
+    )
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'settings': vars(args),
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# ============================================
+# COMPACT GRAPH
+# ============================================
+# Integer-indexed, array-backed (CSR) form of HospitalGraph
+# Services are interned to ids 0..n-1 and the adjacency is stored in
+# three flat arrays instead of nested dicts
+
+from array import array
+
+
+class CompactGraph:
+    """
+    Compressed sparse row graph
+
+    - names[i]: service name of id i, ids[name]: id of a service
+    - neighbors of i: targets[offsets[i]:offsets[i + 1]]
+    - matching corridor distances: weights[offsets[i]:offsets[i + 1]]
+    """
+
+    def __init__(self, names, offsets, targets, weights, version=0):
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.version = version
+        self.services = self.names
+
+    @classmethod
+    def from_graph(cls, hospital_graph):
+        """Compile a HospitalGraph (or any dict-of-dicts adjacency)"""
+        adjacency = getattr(hospital_graph, 'graph', hospital_graph)
+        version = getattr(hospital_graph, 'version', 0)
+
+        names = list(adjacency)
+        ids = {name: i for i, name in enumerate(names)}
+        # Neighbors that only appear as edge targets still get an id
+        for neighbors in adjacency.values():
+            for neighbor in neighbors:
+                if neighbor not in ids:
+                    ids[neighbor] = len(names)
+                    names.append(neighbor)
+
+        all_int = all(
+            isinstance(d, int) for neighbors in adjacency.values() for d in neighbors.values()
+        )
+        offsets = array('l', [0])
+        targets = array('l')
+        weights = array('l' if all_int else 'd')
+
+        for name in names:
+            neighbors = adjacency.get(name, {})
+            targets.extend(ids[n] for n in neighbors)
+            weights.extend(neighbors.values())
+            offsets.append(len(targets))
+
+        return cls(names, offsets, targets, weights, version)
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_neighbors(self, service):
+        """Same contract as HospitalGraph.get_neighbors (name -> distance)"""
+        i = self.ids.get(service)
+        if i is None:
+            return {}
+        names = self.names
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return {names[t]: w for t, w in zip(self.targets[start:end], self.weights[start:end])}
+
+    def get_distance(self, service1, service2):
+        """Get distance between two connected services"""
+        return self.get_neighbors(service1).get(service2)
+
+    def edge_count(self):
+        """Number of stored directed arcs"""
+        return len(self.targets)
+
+    def adjacency(self):
+        """Dict-of-dicts copy of the arrays ({name: {neighbor: distance}})"""
+        return {name: self.get_neighbors(name) for name in self.names}
+
+
+def adjacency_of(graph):
+    """
+    {service: {neighbor: distance}} of a HospitalGraph (its own dict, not
+    a copy) or a CompactGraph / SnapshotGraph (decoded from the arrays)
+    """
+    if isinstance(graph, CompactGraph):
+        return graph.adjacency()
+    return getattr(graph, 'graph', graph)
@@ -0,0 +1,91 @@
+# ============================================
+# TIME-DEPENDENT EDGE COSTS
+# ============================================
+# Corridor / elevator travel times that change over the day
+# (shift changes, visiting hours). A profile is piecewise linear over a
+# 24h period (minutes) and is evaluated with a binary search over its
+# breakpoints, so a lookup costs O(log k) for k breakpoints.
+
+from bisect import bisect_right
+
+DAY = 1440   # minutes
+
+
+class CongestionProfile:
+    """
+    Travel time as a function of departure time.
+
+    points: [(minute, travel_time), ...]; values between breakpoints are
+    interpolated linearly and the profile repeats every `period` minutes.
+    Slopes must be >= -1 (FIFO): leaving later never arrives earlier,
+    which keeps time-dependent Dijkstra exact.
+    """
+
+    def __init__(self, points, period=DAY):
+        if not points:
+            raise ValueError("A profile needs at least one breakpoint")
+        points = sorted((t % period, v) for t, v in points)
+        self.period = period
+        self.times = [t for t, _ in points]
+        self.values = [v for _, v in points]
+
+        # Closing point at t = period repeats the first value (periodicity)
+        self.times.append(self.times[0] + period)
+        self.values.append(self.values[0])
+        # Wrap the evening segment back to midnight
+        if self.times[0] > 0:
+            self.times.insert(0, self.times[-2] - period)
+            self.values.insert(0, self.values[-2])
+
+        self.slopes = []
+        for i in range(len(self.times) - 1):
+            span = self.times[i + 1] - self.times[i]
+            slope = (self.values[i + 1] - self.values[i]) / span if span else 0.0
+            if slope < -1:
+                raise ValueError("Profile violates FIFO (slope below -1)")
+            self.slopes.append(slope)
+
+        self.min_value = min(self.values)
+        self.max_value = max(self.values)
+
+    @classmethod
+    def from_factors(cls, base, factors, period=DAY):
+        """Profile = base travel time scaled by [(minute, factor), ...]"""
+        return cls([(t, base * f) for t, f in factors], period)
+
+    def travel_time(self, departure):
+        t = departure % self.period
+        i = bisect_right(self.times, t) - 1
+        if i >= len(self.slopes):
+            i = len(self.slopes) - 1
+        return self.values[i] + self.slopes[i] * (t - self.times[i])
+
+    __call__ = travel_time
+
+
+# Typical hospital day: slower at the 7:00 / 15:00 / 23:00 shift changes
+# and during afternoon visiting hours (factor 1 = static distance)
+HOSPITAL_DAY = [
+    (0, 1.0), (390, 1.0), (420, 1.8), (450, 1.0),
+    (840, 1.0), (900, 1.9), (930, 1.3),
+    (1080, 1.5), (1200, 1.0),
+    (1350, 1.0), (1380, 1.4), (1410, 1.0)
+]
+
+
+def apply_congestion(graph, factors=HOSPITAL_DAY, edges=None):
+    """
+    Give every corridor (or only `edges`) a profile scaling its static
+    distance by `factors`. With all factors >= 1 static-distance
+    heuristics stay admissible for time-dependent A*.
+    """
+    if edges is None:
+        seen = set()
+        edges = []
+        for a, neighbors in graph.graph.items():
+            for b in neighbors:
+                if (b, a) not in seen:
+                    seen.add((a, b))
+                    edges.append((a, b))
+    for a, b in edges:
+        graph.set_profile(a, b, CongestionProfile.from_factors(graph.graph[a][b], factors))
@@ -0,0 +1,263 @@
+# ============================================
+# CONTRACTION HIERARCHIES
+# ============================================
+# Optional preprocessing for fast point-to-point queries on large maps
+# 1. Order services by importance (edge difference, lazy updates)
+# 2. Contract them one by one, adding shortcut edges that preserve
+#    shortest distances between the remaining services
+# 3. Query = bidirectional Dijkstra that only goes "upward" in the order
+# Shortcuts remember the service they bypass, so paths unpack back into
+# the real corridor sequence.
+
+import heapq
+from itertools import count
+import time
+
+from compact_graph import adjacency_of
+
+
+class ContractionHierarchy:
+
+    def __init__(self, graph, witness_limit=50):
+        """
+        graph: HospitalGraph or CompactGraph (symmetric corridors)
+        witness_limit: max settled nodes per witness search; smaller is
+        faster to preprocess but may add a few unnecessary shortcuts
+        """
+        self.graph = graph
+        self.witness_limit = witness_limit
+        self.rank = {}
+        self.upward = {}
+        self.middle = {}
+        self.version = None
+        self.preprocess_time = 0
+        self.shortcuts = 0
+        self.preprocess()
+
+
+    @classmethod
+    def restore(cls, graph, rank, upward, middle, witness_limit=50):
+        """
+        Hierarchy from saved preprocessing results (see snapshot.py),
+        skipping contraction. rank/upward/middle as built by preprocess().
+        """
+        hierarchy = cls.__new__(cls)
+        hierarchy.graph = graph
+        hierarchy.witness_limit = witness_limit
+        hierarchy.rank = rank
+        hierarchy.upward = upward
+        hierarchy.middle = middle
+        hierarchy.version = getattr(graph, 'version', 0)
+        hierarchy.preprocess_time = 0
+        hierarchy.shortcuts = len(middle) // 2
+        return hierarchy
+
+
+    def preprocess(self):
+        start = time.perf_counter()
+
+        # Working copy of the remaining (not yet contracted) graph
+        remaining = {s: dict(n) for s, n in adjacency_of(self.graph).items()}
+        for s, neighbors in list(remaining.items()):
+            for n in neighbors:
+                remaining.setdefault(n, {})
+        # Every edge ever present (original + shortcuts), for the upward graph
+        self._all_edges = {s: dict(n) for s, n in remaining.items()}
+        self.middle = {}
+        self.rank = {}
+        self.shortcuts = 0
+        contracted_neighbors = {s: 0 for s in remaining}
+
+        # Heap entries carry a counter so services are never compared
+        tie = count()
+        queue = [(self._priority(remaining, contracted_neighbors, s)[0], next(tie), s)
+                 for s in remaining]
+        heapq.heapify(queue)
+        order = 0
+
+        while queue:
+            _, _, node = heapq.heappop(queue)
+            if node in self.rank:
+                continue
+            # Lazy update: re-evaluate and push back if no longer the minimum
+            priority, shortcuts = self._priority(remaining, contracted_neighbors, node)
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, next(tie), node))
+                continue
+
+            self.rank[node] = order
+            order += 1
+            self._contract(remaining, node, shortcuts)
+            for neighbor in remaining.pop(node):
+                contracted_neighbors[neighbor] += 1
+
+        # Upward graph: every edge (original or shortcut) kept at its lower end
+        self.upward = {s: {} for s in self.rank}
+        for u, neighbors in self._all_edges.items():
+            for v, w in neighbors.items():
+                if self.rank[u] < self.rank[v]:
+                    if v not in self.upward[u] or w < self.upward[u][v]:
+                        self.upward[u][v] = w
+
+        del self._all_edges
+        self.version = getattr(self.graph, 'version', 0)
+        self.preprocess_time = time.perf_counter() - start
+
+
+    def _shortcuts_needed(self, remaining, node):
+        """Shortcuts (u, v, w) required if node is contracted now"""
+        neighbors = remaining[node]
+        needed = []
+        items = list(neighbors.items())
+
+        for i, (u, w_u) in enumerate(items):
+            targets = {v: w_u + w_v for v, w_v in items[i + 1:]}
+            if not targets:
+                continue
+            max_cost = max(targets.values())
+            witness = self._witness_search(remaining, u, node, max_cost, targets)
+            for v, via_cost in targets.items():
+                if witness.get(v, float('inf')) > via_cost:
+                    needed.append((u, v, via_cost))
+
+        return needed
+
+
+    def _witness_search(self, remaining, source, excluded, max_cost, targets):
+        """Dijkstra from source avoiding excluded, bounded by cost and settle count"""
+        tie = count()
+        dist = {source: 0}
+        heap = [(0, next(tie), source)]
+        settled = 0
+        pending = set(targets)
+
+        while heap and pending and settled < self.witness_limit:
+            d, _, current = heapq.heappop(heap)
+            if d > dist.get(current, float('inf')):
+                continue
+            if d > max_cost:
+                break
+            settled += 1
+            pending.discard(current)
+
+            for neighbor, w in remaining[current].items():
+                if neighbor == excluded:
+                    continue
+                nd = d + w
+                if nd < dist.get(neighbor, float('inf')):
+                    dist[neighbor] = nd
+                    heapq.heappush(heap, (nd, next(tie), neighbor))
+
+        return dist
+
+
+    def _priority(self, remaining, contracted_neighbors, node):
+        """
+        Edge difference plus number of already-contracted neighbors;
+        also returns the shortcuts so contraction does not redo the witness searches
+        """
+        shortcuts = self._shortcuts_needed(remaining, node)
+        priority = len(shortcuts) - len(remaining[node]) + contracted_neighbors[node]
+        return priority, shortcuts
+
+
+    def _contract(self, remaining, node, shortcuts):
+        for u, v, w in shortcuts:
+            if w < remaining[u].get(v, float('inf')):
+                remaining[u][v] = w
+                remaining[v][u] = w
+                self._all_edges[u][v] = w
+                self._all_edges[v][u] = w
+                self.middle[(u, v)] = node
+                self.middle[(v, u)] = node
+                self.shortcuts += 1
+
+        for neighbor in remaining[node]:
+            del remaining[neighbor][node]
+
+
+    def query(self, initial_state, goal_state):
+        """
+        Same result format as SearchAlgorithms.ucs:
+        {'path': [...], 'cost': ..., 'nodes_explored': ...}
+        """
+        if self.version != getattr(self.graph, 'version', 0):
+            self.preprocess()
+
+        if initial_state not in self.rank or goal_state not in self.rank:
+            return None
+        if initial_state == goal_state:
+            return {'path': [initial_state], 'cost': 0, 'nodes_explored': 1}
+
+        dist = ({initial_state: 0}, {goal_state: 0})
+        parents = ({initial_state: None}, {goal_state: None})
+        tie = count()
+        frontiers = ([(0, next(tie), initial_state)], [(0, next(tie), goal_state)])
+        done = (set(), set())
+        nodes_explored = 0
+        best = float('inf')
+        meeting = None
+
+        while frontiers[0] or frontiers[1]:
+            for side in (0, 1):
+                frontier = frontiers[side]
+                if not frontier:
+                    continue
+                d, _, current = heapq.heappop(frontier)
+                if d >= best:
+                    # Nothing cheaper can come from this side any more
+                    frontier.clear()
+                    continue
+                if current in done[side]:
+                    continue
+                done[side].add(current)
+                nodes_explored += 1
+
+                other = dist[1 - side].get(current)
+                if other is not None and d + other < best:
+                    best = d + other
+                    meeting = current
+
+                for neighbor, w in self.upward[current].items():
+                    nd = d + w
+                    if nd < dist[side].get(neighbor, float('inf')):
+                        dist[side][neighbor] = nd
+                        parents[side][neighbor] = current
+                        heapq.heappush(frontier, (nd, next(tie), neighbor))
+
+        if meeting is None:
+            return None
+
+        up_path = []
+        state = meeting
+        while state is not None:
+            up_path.append(state)
+            state = parents[0][state]
+        up_path.reverse()
+        state = parents[1][meeting]
+        while state is not None:
+            up_path.append(state)
+            state = parents[1][state]
+
+        path = [up_path[0]]
+        for u, v in zip(up_path, up_path[1:]):
+            self._unpack(u, v, path)
+
+        return {
+            'path': path,
+            'cost': best,
+            'nodes_explored': nodes_explored
+        }
+
+
+    def _unpack(self, u, v, path):
+        """Append the real corridor sequence for edge u -> v (without u)"""
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            mid = self.middle.get((a, b))
+            if mid is None:
+                path.append(b)
+            else:
+                stack.append((mid, b))
+                stack.append((a, mid))
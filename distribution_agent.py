@@ -3,48 +3,141 @@
 # ============================================
 
 from hospital_graph import HospitalGraph
-from algorithms import SearchAlgorithms
+from algorithms import SearchAlgorithms, logger
+from heuristics import make_heuristic
+from incremental_search import DStarLite
+from scheduler import DeliveryScheduler
+from tour_planner import TourPlanner
 
 
 class DistributionAgent:
     
-    def __init__(self):
-        self.graph = HospitalGraph()
+    def __init__(self, graph=None, verbose=True):
+        self.graph = graph if graph is not None else HospitalGraph()
+        self.verbose = verbose
         self.current_position = 'Pharmacy'
+        self.route = ['Pharmacy']
         self.services_to_serve = []
         self.medications_delivered = []
         self.possible_actions = ['move', 'deliver_medications']
-        self.algorithms = SearchAlgorithms(self.graph)
+        self.algorithms = SearchAlgorithms(self.graph, cache_size=1024, verbose=verbose)
+        self.heuristics = make_heuristic(self.graph)
+        self.tour_planner = TourPlanner(self.graph, search=self.algorithms)
         self.total_distance = 0
         self.number_of_deliveries = 0
+        self.replans = 0
+        # Optional callback(agent) run before every move, e.g. to inject
+        # corridor closures while the agent is travelling
+        self.on_step = None
+    
+    
+    def log(self, message, *args):
+        """Send progress output to the logger unless the agent is quiet"""
+        if self.verbose:
+            logger.info(message, *args)
     
     
     def perceive_requests(self, services):
-        self.services_to_serve = services
-        print(f"\nRequests: {', '.join(services)}")
+        self.services_to_serve = list(services)
+        if self.verbose:
+            self.log("\nRequests: %s", ', '.join(services))
     
     
     def move(self, destination_service):
         distance = self.graph.get_distance(self.current_position, destination_service)
-        if distance:
+        if distance is not None:
             self.current_position = destination_service
+            self.route.append(destination_service)
             self.total_distance += distance
-            print(f"  Moving to {destination_service} (distance: {distance})")
+            self.log("  Moving to %s (distance: %s)", destination_service, distance)
             return True
         return False
     
+    
+    def follow_path(self, path, goal):
+        """
+        Walk a planned path. If the next corridor has been closed since
+        planning, switch to D* Lite from the current position; it keeps
+        repairing the route as further closures come in.
+        Returns False if goal became unreachable or a move failed.
+        """
+        for _ in self.walk(path, goal):
+            pass
+        return self.current_position == goal
+    
+    
+    def walk(self, path, goal):
+        """
+        follow_path one corridor at a time: yields the length of every
+        corridor travelled, so callers can let simulated time pass
+        between moves. Stops early when goal becomes unreachable.
+        """
+        steps = iter(path[1:])
+        replanner = None
+        try:
+            while self.current_position != goal:
+                if self.on_step is not None:
+                    self.on_step(self)
+                if replanner is None:
+                    next_service = next(steps, None)
+                    if next_service is None:
+                        self.log("  Path ends before %s", goal)
+                        return
+                    if self.graph.get_distance(self.current_position, next_service) is None:
+                        self.log("  Corridor %s -> %s blocked, replanning",
+                                 self.current_position, next_service)
+                        self.replans += 1
+                        replanner = DStarLite(self.graph, self.current_position, goal)
+                if replanner is not None:
+                    replanner.update()
+                    next_service = replanner.next_step()
+                    if next_service is None:
+                        self.log("  %s is cut off", goal)
+                        return
+                    replanner.move_to(next_service)
+                distance = self.graph.get_distance(self.current_position, next_service)
+                if not self.move(next_service):
+                    self.log("  No corridor %s -> %s", self.current_position, next_service)
+                    return
+                yield distance
+        finally:
+            if replanner is not None:
+                replanner.close()
+    
+    
     def deliver_medications(self, service):
         if service in self.services_to_serve:
             self.medications_delivered.append(service)
             self.services_to_serve.remove(service)
             self.number_of_deliveries += 1
-            print(f"  Delivered to {service}")
+            self.log("  Delivered to %s", service)
             return True
         return False
     
     
-    def plan_route(self, goal_service, algorithm='ucs'):
-        print(f"\nPlanning: {self.current_position} -> {goal_service}")
+    def plan_route(self, goal_service, algorithm='ucs', departure_time=None,
+                   epsilon=None, deadline_ms=None):
+        """
+        departure_time (minutes since midnight): plan with the graph's
+        congestion profiles ('ucs' or 'astar'); cost is then travel time
+        epsilon / deadline_ms ('astar' only): weighted A* (route at most
+        epsilon times the optimum), or with deadline_ms anytime A* that
+        improves its route until the deadline; the result then has the
+        achieved 'bound'
+        """
+        self.log("\nPlanning: %s -> %s", self.current_position, goal_service)
+        if (epsilon is not None or deadline_ms is not None) and algorithm != 'astar':
+            logger.warning("epsilon / deadline_ms only apply to 'astar' (ignored for %s)", algorithm)
+        if departure_time is not None and algorithm not in ('ucs', 'astar'):
+            logger.warning("departure_time only applies to 'ucs' and 'astar' "
+                           "(%s plans on static distances)", algorithm)
+
+        if departure_time is not None and algorithm in ('ucs', 'astar'):
+            if algorithm == 'ucs':
+                return self.algorithms.td_ucs(self.current_position, goal_service, departure_time)
+            heuristic = self.create_heuristic(goal_service)
+            return self.algorithms.td_a_star(
+                self.current_position, goal_service, departure_time, heuristic)
         
         if algorithm == 'bfs':
             result = self.algorithms.bfs(self.current_position, goal_service)
@@ -54,107 +147,184 @@ class DistributionAgent:
             result = self.algorithms.ucs(self.current_position, goal_service)
         elif algorithm == 'astar':
             heuristic = self.create_heuristic(goal_service)
-            result = self.algorithms.a_star(self.current_position, goal_service, heuristic)
+            if deadline_ms is not None:
+                result = self.algorithms.anytime_a_star(
+                    self.current_position, goal_service, heuristic, deadline_ms, epsilon)
+            elif epsilon is not None and epsilon > 1:
+                result = self.algorithms.weighted_a_star(
+                    self.current_position, goal_service, heuristic, epsilon)
+            else:
+                result = self.algorithms.a_star(self.current_position, goal_service, heuristic)
+        elif algorithm == 'bi_ucs':
+            result = self.algorithms.bidirectional_ucs(self.current_position, goal_service)
+        elif algorithm == 'bi_astar':
+            heuristic = self.create_heuristic(goal_service)
+            reverse_heuristic = self.create_heuristic(self.current_position)
+            result = self.algorithms.bidirectional_a_star(
+                self.current_position, goal_service, heuristic, reverse_heuristic)
+        elif algorithm == 'ch':
+            result = self.algorithms.ch_query(self.current_position, goal_service)
+        elif algorithm == 'hpa':
+            result = self.algorithms.hpa_query(self.current_position, goal_service)
+        elif algorithm == 'table':
+            result = self.algorithms.table_lookup(self.current_position, goal_service)
         else:
-            print("Unknown algorithm")
+            logger.warning("Unknown algorithm: %s", algorithm)
             return None
         
         return result
     
     
+    def plan_alternatives(self, goal_service, k=3):
+        """
+        Up to k loopless routes to goal_service, cheapest first (Yen's
+        algorithm), as fallbacks when a corridor or elevator is busy
+        """
+        self.log("\nAlternatives: %s -> %s (k=%s)", self.current_position, goal_service, k)
+        routes = self.algorithms.k_shortest_paths(self.current_position, goal_service, k)
+        for number, route in enumerate(routes, 1):
+            self.log("  %s. %s (cost %s)", number, ' -> '.join(route['path']), route['cost'])
+        return routes
+    
+    
     def create_heuristic(self, goal):
-        heuristiques = {
-            'Pharmacy': {
-                'Pharmacy': 0, 'Emergency': 4, 'Surgery': 3, 'Pediatrics': 6,
-                'Cardiology': 8, 'ICU': 5, 'Radiology': 7, 'Consultation': 9, 'Laboratory': 8
-            },
-            'Emergency': {
-                'Pharmacy': 4, 'Emergency': 0, 'Surgery': 6, 'Pediatrics': 2,
-                'Cardiology': 5, 'ICU': 8, 'Radiology': 10, 'Consultation': 4, 'Laboratory': 10
-            },
-            'Surgery': {
-                'Pharmacy': 3, 'Emergency': 6, 'Surgery': 0, 'Pediatrics': 8,
-                'Cardiology': 10, 'ICU': 2, 'Radiology': 4, 'Consultation': 11, 'Laboratory': 4
-            },
-            'Pediatrics': {
-                'Pharmacy': 6, 'Emergency': 2, 'Surgery': 8, 'Pediatrics': 0,
-                'Cardiology': 5, 'ICU': 10, 'Radiology': 12, 'Consultation': 3, 'Laboratory': 12
-            },
-            'Cardiology': {
-                'Pharmacy': 8, 'Emergency': 5, 'Surgery': 10, 'Pediatrics': 5,
-                'Cardiology': 0, 'ICU': 12, 'Radiology': 14, 'Consultation': 2, 'Laboratory': 14
-            },
-            'ICU': {
-                'Pharmacy': 5, 'Emergency': 8, 'Surgery': 2, 'Pediatrics': 10,
-                'Cardiology': 12, 'ICU': 0, 'Radiology': 6, 'Consultation': 13, 'Laboratory': 3
-            },
-            'Radiology': {
-                'Pharmacy': 7, 'Emergency': 10, 'Surgery': 4, 'Pediatrics': 12,
-                'Cardiology': 14, 'ICU': 6, 'Radiology': 0, 'Consultation': 15, 'Laboratory': 3
-            },
-            'Consultation': {
-                'Pharmacy': 9, 'Emergency': 4, 'Surgery': 11, 'Pediatrics': 3,
-                'Cardiology': 2, 'ICU': 13, 'Radiology': 15, 'Consultation': 0, 'Laboratory': 15
-            },
-            'Laboratory': {
-                'Pharmacy': 8, 'Emergency': 10, 'Surgery': 4, 'Pediatrics': 12,
-                'Cardiology': 14, 'ICU': 3, 'Radiology': 3, 'Consultation': 15, 'Laboratory': 0
-            }
-        }
-        
-        return heuristiques.get(goal, {s: 0 for s in self.graph.services})
+        """Admissible A* estimates toward goal, computed from the graph (ALT landmarks or coordinates)"""
+        return self.heuristics.for_goal(goal)
     
     
-    def execute_mission(self, requested_services, algorithm='ucs'):
-        print("\n" + "="*60)
-        print("MISSION START")
-        print("="*60)
-        
-        self.current_position = 'Pharmacy'
+    def reset_mission(self, position='Pharmacy'):
+        """Clear the per-mission counters and place the agent at position"""
+        self.current_position = position
+        self.route = [position]
         self.total_distance = 0
         self.number_of_deliveries = 0
+        self.replans = 0
         self.medications_delivered = []
+    
+    
+    def distance_matrix(self, services):
+        """
+        Shortest distances between all given services: one ucs_multi sweep
+        per service instead of one search per pair (also warms the route cache)
+        """
+        return self.tour_planner.distance_matrix(services)
+    
+    
+    def plan_tour(self, requested_services, method='auto'):
+        """Order the requested services to minimise the round trip from the current position"""
+        distances = self.distance_matrix([self.current_position] + list(requested_services))
+        order, cost = self.tour_planner.plan(self.current_position, requested_services, method, distances)
+        if self.verbose:
+            self.log("Tour (%s): %s (estimated %s)", method,
+                     ' -> '.join([self.current_position] + order), cost)
+        return order
+    
+    
+    def schedule_deliveries(self, orders, capacity=4, time_budget=0.5, **options):
+        """
+        Multi-trip Pharmacy -> ... -> Pharmacy plan for orders with item
+        counts, priorities and time windows (see scheduler.py); options
+        are passed on to DeliveryScheduler (speed, service_time, ...)
+        """
+        scheduler = DeliveryScheduler(self.graph, capacity, search=self.algorithms, **options)
+        plan = scheduler.schedule(orders, time_budget=time_budget)
+        if self.verbose:
+            for number, trip in enumerate(plan['trips'], 1):
+                self.log("Trip %s (load %s): %s", number, trip['load'],
+                         ' -> '.join(stop['service'] for stop in trip['stops']))
+            self.log("On time: %s, late: %s", plan['on_time'], plan['late'])
+        return plan
+    
+    
+    def execute_mission(self, requested_services, algorithm='ucs', tour=None, departure_time=None,
+                        epsilon=None, deadline_ms=None):
+        """
+        Deliver to every requested service and return to Pharmacy.
         
+        tour: None keeps the request order; 'auto', 'exact' or 'heuristic'
+        reorders the stops with the TourPlanner first.
+        departure_time: plan every leg with congestion profiles, starting at
+        this minute of the day; each leg departs when the previous one arrives.
+        epsilon / deadline_ms: bounded-suboptimal / anytime A* per leg (see
+        plan_route).
+        
+        Returns a mission result dict (route, distance, deliveries,
+        delivered, nodes_explored, planning_time, replans, legs, and with a
+        departure_time also departure and arrival).
+        """
+        self.log("\n" + "="*60)
+        self.log("MISSION START")
+        self.log("="*60)
+        
+        self.reset_mission()
+        
+        original_requests = list(requested_services)
         self.perceive_requests(requested_services)
+        legs = []
+        clock = departure_time
+        
+        if tour is not None:
+            requested_services = self.plan_tour(requested_services, tour)
         
         for service in requested_services:
-            print(f"\n--- Delivery to {service} ---")
+            self.log("\n--- Delivery to %s ---", service)
             
-            plan = self.plan_route(service, algorithm)
+            plan = self.plan_route(service, algorithm, clock, epsilon, deadline_ms)
             
             if plan:
+                legs.append(plan)
+                clock = plan.get('arrival', clock)
                 path = plan['path']
-                print(f"Path: {' -> '.join(path)}")
-                print(f"Cost: {plan['cost']}, Nodes explored: {plan['nodes_explored']}")
+                if self.verbose:
+                    self.log("Path: %s", ' -> '.join(path))
+                    self.log("Cost: %s, Nodes explored: %s", plan['cost'], plan['nodes_explored'])
                 
-                for i in range(len(path) - 1):
-                    self.move(path[i + 1])
-                
-                self.deliver_medications(service)
+                if self.follow_path(path, service):
+                    self.deliver_medications(service)
             else:
-                print(f"Cannot reach {service}")
+                self.log("Cannot reach %s", service)
         
         if self.current_position != 'Pharmacy':
-            print(f"\n--- Returning to Pharmacy ---")
-            return_plan = self.plan_route('Pharmacy', algorithm)
+            self.log("\n--- Returning to Pharmacy ---")
+            return_plan = self.plan_route('Pharmacy', algorithm, clock, epsilon, deadline_ms)
             if return_plan:
+                legs.append(return_plan)
+                clock = return_plan.get('arrival', clock)
                 path = return_plan['path']
-                print(f"Return path: {' -> '.join(path)}")
-                for i in range(len(path) - 1):
-                    self.move(path[i + 1])
+                if self.verbose:
+                    self.log("Return path: %s", ' -> '.join(path))
+                self.follow_path(path, 'Pharmacy')
         
         self.display_report()
+        
+        result = {
+            'requests': original_requests,
+            'route': list(self.route),
+            'distance': self.total_distance,
+            'deliveries': self.number_of_deliveries,
+            'delivered': list(self.medications_delivered),
+            'nodes_explored': sum(leg['nodes_explored'] for leg in legs),
+            'planning_time': sum(leg.get('time', 0) for leg in legs),
+            'replans': self.replans,
+            'legs': legs
+        }
+        if departure_time is not None:
+            result['departure'] = departure_time
+            result['arrival'] = clock
+        return result
     
     
     def display_report(self):
-        print("\n" + "="*60)
-        print("REPORT")
-        print("="*60)
-        print(f"Deliveries: {self.number_of_deliveries}")
-        print(f"Services: {', '.join(self.medications_delivered)}")
-        print(f"Total distance: {self.total_distance} units")
-        print(f"Final position: {self.current_position}")
-        print("="*60)
+        if not self.verbose:
+            return
+        self.log("\n" + "="*60)
+        self.log("REPORT")
+        self.log("="*60)
+        self.log("Deliveries: %s", self.number_of_deliveries)
+        self.log("Services: %s", ', '.join(self.medications_delivered))
+        self.log("Total distance: %s units", self.total_distance)
+        self.log("Final position: %s", self.current_position)
+        self.log("="*60)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,219 @@
+# ============================================
+# FLEET DISPATCHER
+# ============================================
+# Several DistributionAgents (couriers / robots) sharing one graph
+# - Requests are assigned by estimated travel cost with the Hungarian
+#   algorithm, one round of at most one request per agent at a time
+# - Agents then run their missions concurrently with asyncio; travel
+#   takes simulated time proportional to corridor distance
+
+import asyncio
+import random
+import time
+
+from algorithms import SearchAlgorithms
+from distribution_agent import DistributionAgent
+from hospital_graph import HospitalGraph
+
+INFINITY = float('inf')
+# Stand-in for unreachable pairs so the assignment stays finite
+UNREACHABLE_COST = 10 ** 12
+
+
+def hungarian(cost):
+    """
+    Minimum-cost assignment for a rows x cols matrix with rows <= cols.
+    Returns assignment[row] = col. O(rows^2 * cols).
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    # 1-indexed potentials; p[j] = row matched to column j (0 = free)
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        min_v = [INFINITY] * (m + 1)
+        used = [False] * (m + 1)
+
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = INFINITY
+            j1 = 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    current = row[j - 1] - u[i0] - v[j]
+                    if current < min_v[j]:
+                        min_v[j] = current
+                        way[j] = j0
+                    if min_v[j] < delta:
+                        delta = min_v[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_v[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = [0] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            assignment[p[j] - 1] = j - 1
+    return assignment
+
+
+class FleetDispatcher:
+
+    def __init__(self, num_agents=3, graph=None, algorithm='ucs', depot='Pharmacy', time_scale=0.0):
+        """
+        time_scale: real seconds slept per distance unit while an agent
+        travels (0 still interleaves the agents, it just does not wait)
+        """
+        if num_agents < 1:
+            raise ValueError(f"num_agents must be at least 1, got {num_agents}")
+        self.graph = graph if graph is not None else HospitalGraph()
+        self.algorithm = algorithm
+        self.depot = depot
+        self.time_scale = time_scale
+        self.agents = [DistributionAgent(self.graph, verbose=False) for _ in range(num_agents)]
+        # Travel estimates on graphs without a path table (plain CompactGraph)
+        self.search = SearchAlgorithms(self.graph, cache_size=1024, verbose=False)
+
+
+    def travel_cost(self, service1, service2):
+        if hasattr(self.graph, 'shortest_distance'):
+            d = self.graph.shortest_distance(service1, service2)
+        else:
+            result = self.search.ucs(service1, service2)
+            d = result['cost'] if result else None
+        return UNREACHABLE_COST if d is None else d
+
+
+    def assign(self, requests):
+        """
+        Split requests between agents. Each round gives every agent at most
+        one new request, minimising the sum of (time the agent becomes free
+        + travel from its last stop) over the round.
+        """
+        pending = list(requests)
+        n = len(self.agents)
+        positions = [self.depot] * n
+        ready = [0] * n
+        plans = [[] for _ in range(n)]
+
+        while pending:
+            cost = [[ready[i] + self.travel_cost(positions[i], r) for r in pending]
+                    for i in range(n)]
+
+            if n <= len(pending):
+                pairs = list(enumerate(hungarian(cost)))
+            else:
+                transposed = [list(column) for column in zip(*cost)]
+                pairs = [(agent, j) for j, agent in enumerate(hungarian(transposed))]
+
+            for i, j in pairs:
+                plans[i].append(pending[j])
+                ready[i] = cost[i][j]
+                positions[i] = pending[j]
+            for j in sorted((j for _, j in pairs), reverse=True):
+                del pending[j]
+
+        return plans
+
+
+    async def _run_agent(self, agent, services):
+        """Deliver services in order, then return to the depot"""
+        agent.reset_mission(self.depot)
+        agent.perceive_requests(services)
+        nodes_explored = 0
+
+        for goal in list(services) + [self.depot]:
+            if goal == agent.current_position:
+                agent.deliver_medications(goal)
+                continue
+            plan = agent.plan_route(goal, self.algorithm)
+            if plan is None:
+                continue
+            nodes_explored += plan['nodes_explored']
+
+            # walk() replans around corridors closed while travelling
+            for distance in agent.walk(plan['path'], goal):
+                await asyncio.sleep(distance * self.time_scale)
+
+            if agent.current_position == goal:
+                agent.deliver_medications(goal)
+
+        return {
+            'assigned': list(services),
+            'route': list(agent.route),
+            'distance': agent.total_distance,
+            'deliveries': agent.number_of_deliveries,
+            'nodes_explored': nodes_explored
+        }
+
+
+    async def dispatch(self, requests):
+        """Assign requests and run every agent's mission concurrently"""
+        start = time.perf_counter()
+        plans = self.assign(requests)
+        agent_results = await asyncio.gather(
+            *(self._run_agent(agent, plan) for agent, plan in zip(self.agents, plans))
+        )
+
+        deliveries = sum(r['deliveries'] for r in agent_results)
+        makespan = max((r['distance'] for r in agent_results), default=0)
+        return {
+            'agents': agent_results,
+            'requests': len(requests),
+            'deliveries': deliveries,
+            'total_distance': sum(r['distance'] for r in agent_results),
+            'makespan': makespan,
+            # Deliveries per distance unit of fleet time (agents work in parallel)
+            'throughput': deliveries / makespan if makespan else 0.0,
+            'wall_time': time.perf_counter() - start
+        }
+
+
+    def run(self, requests):
+        return asyncio.run(self.dispatch(requests))
+
+
+    def display_report(self, report):
+        print("\n" + "="*60)
+        print("FLEET REPORT")
+        print("="*60)
+        for i, agent in enumerate(report['agents']):
+            print(f"Agent {i + 1}: {agent['deliveries']} deliveries, "
+                  f"distance {agent['distance']} ({', '.join(agent['assigned']) or '-'})")
+        print("-"*60)
+        print(f"Requests: {report['requests']}")
+        print(f"Deliveries: {report['deliveries']}")
+        print(f"Total distance: {report['total_distance']} units")
+        print(f"Makespan: {report['makespan']} units")
+        print(f"Fleet throughput: {report['throughput']:.3f} deliveries/unit")
+        print("="*60)
+
+
+if __name__ == "__main__":
+    dispatcher = FleetDispatcher(num_agents=3)
+    destinations = [s for s in dispatcher.graph.services if s != dispatcher.depot]
+
+    rng = random.Random(7)
+    requests = [rng.choice(destinations) for _ in range(12)]
+
+    report = dispatcher.run(requests)
+    dispatcher.display_report(report)
@@ -0,0 +1,339 @@
+# ============================================
+# GRAPH LOADERS
+# ============================================
+# Build a HospitalGraph from external floor-plan files instead of the
+# built-in 9-service layout:
+# - edge-list CSV (plus an optional node CSV with coordinates / floors /
+#   wings / buildings)
+# - JSON {"services": [...], "corridors": [...]}
+# - GeoJSON FeatureCollection (Point = service, LineString = corridor)
+# Files are parsed incrementally (one row / one array element at a time),
+# corridors are collected first and the adjacency is built once at the
+# end, so large multi-building maps never go through set_distance.
+#
+# Example:
+#   hospital = load_graph('campus.geojson')
+#   hospital = load_csv('corridors.csv', nodes='rooms.csv')
+
+import csv
+import json
+import math
+import os
+
+from algorithms import logger
+from hospital_graph import HospitalGraph
+
+FROM_KEYS = ('from', 'source', 'a', 'service1')
+TO_KEYS = ('to', 'target', 'b', 'service2')
+DISTANCE_KEYS = ('distance', 'weight', 'length', 'cost')
+ID_KEYS = ('id', 'name', 'service')
+# A decode error this close to the end of the buffer may just be a value
+# cut off by the chunk boundary (e.g. "tru", "-Infinit")
+TRUNCATION_MARGIN = 10
+
+
+def _pick(record, keys, default=None):
+    for key in keys:
+        value = record.get(key)
+        if value is not None and value != '':
+            return value
+    return default
+
+
+def _number(value):
+    """'3' -> 3, '2.5' -> 2.5 (distances stay ints when they are ints)"""
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+class GraphBuilder:
+    """
+    Collects services and corridors, checks that both directions of a
+    corridor agree, and builds the HospitalGraph in one go.
+
+    strict: raise ValueError on asymmetric or negative corridors
+    (otherwise log a warning and keep the shorter distance)
+    """
+
+    def __init__(self, strict=True):
+        self.strict = strict
+        self.corridors = {}        # (a, b) with a <= b -> distance
+        self.services = {}         # insertion-ordered set of names
+        self.descriptions = {}
+        self.coordinates = {}
+        self.floors = {}
+        self.wings = {}
+        self.buildings = {}
+
+
+    def add_service(self, name, description=None, coordinates=None, floor=None,
+                    wing=None, building=None):
+        self.services[name] = None
+        if description:
+            self.descriptions[name] = description
+        if coordinates is not None:
+            self.coordinates[name] = tuple(float(c) for c in coordinates)
+        if floor is not None:
+            self.floors[name] = floor
+        if wing is not None:
+            self.wings[name] = wing
+        if building is not None:
+            self.buildings[name] = building
+
+
+    def add_corridor(self, a, b, distance, where=''):
+        if distance < 0:
+            self._problem(f"Negative distance {a} - {b}{where}")
+            return
+        self.services[a] = None
+        self.services[b] = None
+        key = (a, b) if a <= b else (b, a)
+        known = self.corridors.get(key)
+        if known is not None and known != distance:
+            self._problem(f"Asymmetric corridor {a} - {b}: {known} vs {distance}{where}")
+            distance = min(known, distance)
+        self.corridors[key] = distance
+
+
+    def _problem(self, message):
+        if self.strict:
+            raise ValueError(message)
+        logger.warning("%s", message)
+
+
+    def build(self, precompute_paths=False):
+        adjacency = {name: {} for name in self.services}
+        for (a, b), distance in self.corridors.items():
+            adjacency[a][b] = distance
+            adjacency[b][a] = distance
+        return HospitalGraph(adjacency, self.descriptions, precompute_paths=precompute_paths,
+                             coordinates=self.coordinates, floors=self.floors,
+                             wings=self.wings, buildings=self.buildings)
+
+
+# ----------------------------------------
+# CSV
+# ----------------------------------------
+
+def load_csv(path, nodes=None, strict=True, delimiter=','):
+    """
+    Corridor CSV with a header row: from,to,distance
+    (aliases: source/target, weight/length/cost).
+    nodes: optional CSV with id[,x,y[,z]][,floor][,wing][,building][,description]
+    """
+    builder = GraphBuilder(strict)
+
+    if nodes is not None:
+        with open(nodes, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f, delimiter=delimiter):
+                axes = [row[k] for k in ('x', 'y', 'z') if row.get(k) not in (None, '')]
+                floor = row.get('floor')
+                builder.add_service(
+                    _pick(row, ID_KEYS),
+                    description=row.get('description'),
+                    coordinates=axes or None,
+                    floor=int(floor) if floor not in (None, '') else None,
+                    wing=row.get('wing') or None,
+                    building=row.get('building') or None)
+
+    with open(path, newline='', encoding='utf-8') as f:
+        for line, row in enumerate(csv.DictReader(f, delimiter=delimiter), 2):
+            a, b = _pick(row, FROM_KEYS), _pick(row, TO_KEYS)
+            distance = _pick(row, DISTANCE_KEYS)
+            if a is None or b is None or distance is None:
+                builder._problem(f"Incomplete corridor on line {line} of {path}")
+                continue
+            builder.add_corridor(a, b, _number(distance), f" (line {line})")
+
+    return builder.build()
+
+
+# ----------------------------------------
+# JSON / GeoJSON (streamed)
+# ----------------------------------------
+
+def iter_json_members(f, chunk_size=1 << 16):
+    """
+    Incrementally parse a top-level JSON object. Yields (key, value) for
+    plain members and (key, element) for every element of array members,
+    so a file with millions of corridors is never decoded in one piece.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill(size=chunk_size):
+        nonlocal buffer, pos, eof
+        chunk = f.read(size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip_space():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    def expect(chars):
+        nonlocal pos
+        skip_space()
+        if pos >= len(buffer) or buffer[pos] not in chars:
+            raise ValueError(f"Malformed JSON: expected one of {chars!r}")
+        pos += 1
+        return buffer[pos - 1]
+
+    def value():
+        nonlocal pos
+        size = chunk_size
+        while True:
+            skip_space()
+            try:
+                result, end = decoder.raw_decode(buffer, pos)
+                # A number at the very end of the buffer may continue in the
+                # next chunk, as may one cut after its '.', 'e' or sign
+                if eof or end < len(buffer) and not (
+                        type(result) in (int, float) and buffer[end] in '.eE+-'):
+                    pos = end
+                    return result
+            except json.JSONDecodeError as error:
+                # Reading more only helps when the value ran off the buffer
+                if eof or not (error.msg.startswith('Unterminated string')
+                               or error.pos >= len(buffer) - TRUNCATION_MARGIN):
+                    raise
+            # Each retry decodes the value from its start again, so read
+            # geometrically more to keep large values linear
+            fill(size)
+            size *= 2
+
+    expect('{')
+    skip_space()
+    if buffer[pos:pos + 1] == '}':
+        return
+    while True:
+        key = value()
+        expect(':')
+        skip_space()
+        if buffer[pos:pos + 1] == '[':
+            pos += 1
+            skip_space()
+            if buffer[pos:pos + 1] == ']':
+                pos += 1
+            else:
+                while True:
+                    yield key, value()
+                    if expect(',]') == ']':
+                        break
+        else:
+            yield key, value()
+        if expect(',}') == '}':
+            return
+
+
+def _corridor_record(item):
+    """{'from', 'to', 'distance'} or [from, to, distance]"""
+    if isinstance(item, (list, tuple)):
+        return item[0], item[1], item[2] if len(item) > 2 else None
+    return _pick(item, FROM_KEYS), _pick(item, TO_KEYS), _pick(item, DISTANCE_KEYS)
+
+
+def load_json(path, strict=True):
+    """
+    JSON floor plan:
+      {"services":  [{"id": "ICU", "coordinates": [x, y], "floor": 2, "wing": "...",
+                      "building": "...", "description": "..."}, ...],
+       "corridors": [{"from": "ICU", "to": "Surgery", "distance": 1}, ...]}
+    ("nodes" / "edges" are accepted too; corridors may be [from, to, distance] lists)
+    """
+    builder = GraphBuilder(strict)
+    with open(path, encoding='utf-8') as f:
+        for key, item in iter_json_members(f):
+            if key in ('services', 'nodes'):
+                if isinstance(item, str):
+                    builder.add_service(item)
+                else:
+                    builder.add_service(_pick(item, ID_KEYS), item.get('description'),
+                                        item.get('coordinates'), item.get('floor'),
+                                        item.get('wing'), item.get('building'))
+            elif key in ('corridors', 'edges'):
+                a, b, distance = _corridor_record(item)
+                if a is None or b is None or distance is None:
+                    builder._problem(f"Incomplete corridor in {path}: {item}")
+                    continue
+                builder.add_corridor(a, b, _number(distance))
+    return builder.build()
+
+
+def load_geojson(path, strict=True):
+    """
+    GeoJSON FeatureCollection:
+    - Point features are services (properties: id/name, floor, wing,
+      building, description)
+    - LineString features are corridors (properties: from, to and
+      optionally distance; without one the line length is used)
+    """
+    builder = GraphBuilder(strict)
+    with open(path, encoding='utf-8') as f:
+        for key, feature in iter_json_members(f):
+            if key != 'features':
+                continue
+            geometry = feature.get('geometry') or {}
+            properties = feature.get('properties') or {}
+            kind = geometry.get('type')
+
+            if kind == 'Point':
+                builder.add_service(
+                    _pick(properties, ID_KEYS, feature.get('id')),
+                    properties.get('description'),
+                    geometry.get('coordinates'),
+                    _pick(properties, ('floor', 'level')),
+                    properties.get('wing'),
+                    properties.get('building'))
+            elif kind == 'LineString':
+                a, b = _pick(properties, FROM_KEYS), _pick(properties, TO_KEYS)
+                if a is None or b is None:
+                    builder._problem(f"Corridor without from/to in {path}: {properties}")
+                    continue
+                distance = _pick(properties, DISTANCE_KEYS)
+                if distance is None:
+                    points = geometry.get('coordinates') or []
+                    distance = sum(math.dist(p, q) for p, q in zip(points, points[1:]))
+                builder.add_corridor(a, b, _number(distance))
+    return builder.build()
+
+
+def load_graph(path, **options):
+    """Pick the loader from the file extension (.csv, .json, .geojson)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return load_csv(path, **options)
+    if extension == '.geojson':
+        return load_geojson(path, **options)
+    if extension == '.json':
+        return load_json(path, **options)
+    raise ValueError(f"Unsupported graph file: {path}")
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) < 2:
+        print("Usage: python graph_loaders.py <file.csv|file.json|file.geojson>")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    hospital = load_graph(sys.argv[1])
+    elapsed = time.perf_counter() - start
+    stats = hospital.get_statistics()
+    print(f"Loaded {stats['nodes']} services, {stats['edges']} corridors in {elapsed:.2f} s")
+    print(f"Distance range: {stats['min_distance']} - {stats['max_distance']}")
@@ -0,0 +1,195 @@
+# ============================================
+# A* HEURISTICS
+# ============================================
+# Admissible estimates computed from the graph itself
+# - LandmarkHeuristic (ALT): triangle-inequality bounds from a few
+#   landmarks with precomputed shortest distances
+# - CoordinateHeuristic: calibrated straight-line distance when the
+#   graph provides service coordinates
+# Both are consistent, so A* and bidirectional A* stay optimal.
+
+import heapq
+import math
+
+
+def dijkstra_distances(graph, source):
+    """Shortest distance from source to every reachable service"""
+    dist = {source: 0}
+    done = set()
+    heap = [(0, source)]
+
+    while heap:
+        d, current = heapq.heappop(heap)
+        if current in done:
+            continue
+        done.add(current)
+
+        for neighbor, distance in graph.get_neighbors(current).items():
+            new_dist = d + distance
+            if neighbor not in dist or new_dist < dist[neighbor]:
+                dist[neighbor] = new_dist
+                heapq.heappush(heap, (new_dist, neighbor))
+
+    return dist
+
+
+class GoalHeuristic:
+    """
+    Heuristic toward one goal with the dict interface A* expects
+    (heuristic.get(state, default)); values are computed on demand.
+    """
+
+    def __init__(self, estimator, goal):
+        self.estimator = estimator
+        self.goal = goal
+
+    def get(self, state, default=0):
+        value = self.estimator.estimate(state, self.goal)
+        return default if value is None else value
+
+    def __getitem__(self, state):
+        return self.get(state)
+
+
+class LandmarkHeuristic:
+    """
+    ALT lower bounds: for every landmark L,
+        d(v, goal) >= |d(L, goal) - d(L, v)|
+    (corridors are symmetric). The heuristic is the max over landmarks.
+    """
+
+    def __init__(self, graph, num_landmarks=4, landmarks=None):
+        self.graph = graph
+        self.num_landmarks = num_landmarks
+        self.fixed_landmarks = landmarks
+        self.landmarks = []
+        self.tables = []
+        self._goals = {}
+        self._version = None
+        self.refresh()
+
+    def refresh(self):
+        """Recompute landmark tables if the graph changed since the last build"""
+        version = getattr(self.graph, 'version', 0)
+        if version == self._version:
+            return
+        self._version = version
+        self._goals = {}
+
+        if self.fixed_landmarks is not None:
+            self.landmarks = list(self.fixed_landmarks)
+            self.tables = [dijkstra_distances(self.graph, l) for l in self.landmarks]
+        else:
+            self.select_landmarks()
+
+    def select_landmarks(self):
+        """
+        Farthest-first selection: each new landmark is the service farthest
+        from all landmarks chosen so far (unreached services count as
+        infinitely far, so every connected component gets covered).
+        """
+        services = list(self.graph.services)
+        self.landmarks = []
+        self.tables = []
+        if not services:
+            return
+
+        # Start from the service farthest from an arbitrary one
+        seed = dijkstra_distances(self.graph, services[0])
+        candidate = max(seed, key=seed.get)
+        closest = {s: math.inf for s in services}
+
+        for _ in range(min(self.num_landmarks, len(services))):
+            table = dijkstra_distances(self.graph, candidate)
+            self.landmarks.append(candidate)
+            self.tables.append(table)
+
+            for s in services:
+                d = table.get(s, math.inf)
+                if d < closest[s]:
+                    closest[s] = d
+            candidate = max(services, key=closest.get)
+            if closest[candidate] == 0:
+                break
+
+    def estimate(self, state, goal):
+        best = 0
+        for table in self.tables:
+            d_state = table.get(state)
+            d_goal = table.get(goal)
+            if d_state is not None and d_goal is not None:
+                diff = abs(d_goal - d_state)
+                if diff > best:
+                    best = diff
+        return best
+
+    def for_goal(self, goal):
+        """Heuristic object toward goal (one shared instance per goal and graph version)"""
+        self.refresh()
+        heuristic = self._goals.get(goal)
+        if heuristic is None:
+            heuristic = self._goals[goal] = GoalHeuristic(self, goal)
+        return heuristic
+
+
+class CoordinateHeuristic:
+    """
+    Straight-line distance scaled by the smallest corridor-length /
+    straight-line ratio found on any edge. Every edge then costs at least
+    scale * its straight length, so by the triangle inequality the
+    estimate never exceeds the real route distance.
+    """
+
+    def __init__(self, graph, coordinates=None):
+        self.graph = graph
+        self.coordinates = coordinates if coordinates is not None else graph.coordinates
+        self._goals = {}
+        self._version = None
+        self.refresh()
+
+    def refresh(self):
+        version = getattr(self.graph, 'version', 0)
+        if version == self._version:
+            return
+        self._version = version
+        self._goals = {}
+
+        scale = math.inf
+        for service in self.graph.services:
+            for neighbor, distance in self.graph.get_neighbors(service).items():
+                straight = self.straight_line(service, neighbor)
+                if straight:
+                    scale = min(scale, distance / straight)
+        self.scale = 0 if scale == math.inf else scale
+
+    def straight_line(self, service1, service2):
+        a = self.coordinates.get(service1)
+        b = self.coordinates.get(service2)
+        if a is None or b is None:
+            return None
+        return math.dist(a, b)
+
+    def estimate(self, state, goal):
+        straight = self.straight_line(state, goal)
+        return 0 if straight is None else self.scale * straight
+
+    def for_goal(self, goal):
+        self.refresh()
+        heuristic = self._goals.get(goal)
+        if heuristic is None:
+            heuristic = self._goals[goal] = GoalHeuristic(self, goal)
+        return heuristic
+
+
+def make_heuristic(graph, num_landmarks=4):
+    """
+    Coordinates when every service has them, landmarks otherwise
+    (precomputed ones when the graph carries them, e.g. a snapshot)
+    """
+    coordinates = getattr(graph, 'coordinates', None)
+    if coordinates and all(s in coordinates for s in graph.services):
+        return CoordinateHeuristic(graph, coordinates)
+    preloaded = getattr(graph, 'landmark_heuristic', None)
+    if preloaded is not None:
+        return preloaded
+    return LandmarkHeuristic(graph, num_landmarks)
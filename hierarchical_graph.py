@@ -0,0 +1,393 @@
+# ============================================
+# HIERARCHICAL GRAPH (HPA*)
+# ============================================
+# Building -> floor / wing -> room abstraction for campus-scale maps
+# - every level partitions the rooms into clusters: (building, floor,
+#   wing) labels, coordinate cells of growing size, or BFS regions for
+#   maps without either
+# - portals: nodes of the level below with a corridor into another
+#   cluster. Portal-to-portal costs inside each cluster are precomputed
+#   (only for pairs whose shortest path passes no third portal); together
+#   with the corridors between clusters they form the (much smaller and
+#   still sparse) abstract graph of the level
+# - query (HPA*-style, exact): one Dijkstra that scans each node on the
+#   highest level whose cluster holds neither the source nor the goal,
+#   i.e. room corridors only near the endpoints and ever coarser
+#   abstract graphs in between; then only the abstract edges on the
+#   route are refined (one search inside one cluster each)
+# Query cost grows with the number of levels and clusters the route
+# crosses, not with the size of the campus.
+# Corridors are assumed symmetric (as everywhere in HospitalGraph).
+#
+# Example:
+#   hierarchy = HierarchicalGraph(hospital)
+#   hierarchy.query('Pharmacy', 'ICU')   # {'path', 'cost', 'nodes_explored'}
+
+import heapq
+from itertools import count
+import math
+import time
+
+from compact_graph import adjacency_of
+
+
+def _sweep(adjacency, source, cluster_of=None, cluster=None, target=None):
+    """
+    Dijkstra from source (restricted to one cluster when cluster_of is
+    given), stopping at target.
+    Returns (settled {node: distance}, parents {node: parent}).
+    """
+    dist = {source: 0}
+    parents = {source: None}
+    settled = {}
+    tie = count()
+    frontier = [(0, next(tie), source)]
+
+    while frontier:
+        d, _, node = heapq.heappop(frontier)
+        if node in settled:
+            continue
+        settled[node] = d
+        if node == target:
+            break
+        for neighbor, w in adjacency[node].items():
+            if neighbor in settled or (cluster_of is not None and cluster_of[neighbor] != cluster):
+                continue
+            nd = d + w
+            old = dist.get(neighbor)
+            if old is None or nd < old:
+                dist[neighbor] = nd
+                parents[neighbor] = node
+                heapq.heappush(frontier, (nd, next(tie), neighbor))
+
+    return settled, parents
+
+
+def _direct(settled, parents, source, portals):
+    """
+    Nodes whose shortest path from source passes no other portal. Only
+    their edges are kept: any other edge is the sum of kept ones, so the
+    abstract graphs stay sparse and distances do not change.
+    """
+    through = {source: False}
+    direct = []
+    for node in settled:          # settle order: parents come first
+        if node == source:
+            continue
+        parent = parents[node]
+        through[node] = through[parent] or (parent != source and parent in portals)
+        if not through[node]:
+            direct.append(node)
+    return direct
+
+
+# ----------------------------------------
+# Clustering
+# ----------------------------------------
+
+def _regions(adjacency, size):
+    """Partition into connected BFS regions of about `size` nodes"""
+    region = {}
+    number = 0
+    for seed in adjacency:
+        if seed in region:
+            continue
+        queue = [seed]
+        region[seed] = number
+        members = 1
+        for node in queue:
+            if members >= size:
+                break
+            for neighbor in adjacency[node]:
+                if neighbor not in region and members < size:
+                    region[neighbor] = number
+                    members += 1
+                    queue.append(neighbor)
+        number += 1
+    return region
+
+
+def default_levels(graph, cluster_size=64, rooms=None):
+    """
+    Cluster maps {room: key} from finest to coarsest:
+    coordinate cells of about cluster_size rooms growing 4x per side
+    (when every room has coordinates), then (building, floor, wing),
+    (building, floor) and (building,) labels. Tiers with a single cluster,
+    or no fewer clusters than the tier below, are dropped. Maps with
+    neither coordinates nor labels get BFS regions.
+    rooms: the graph's adjacency, when the caller already has it
+    """
+    if rooms is None:
+        rooms = adjacency_of(graph)
+    coordinates = getattr(graph, 'coordinates', None) or {}
+    buildings = getattr(graph, 'buildings', {})
+    floors = getattr(graph, 'floors', {})
+    wings = getattr(graph, 'wings', {})
+
+    def floor_of(room):
+        floor = floors.get(room)
+        if floor is None:
+            point = coordinates.get(room)
+            if point is not None and len(point) > 2:
+                floor = point[2]
+        return floor
+
+    labels = {room: (buildings.get(room), floor_of(room), wings.get(room)) for room in rooms}
+    tiers = []
+
+    if rooms and all(room in coordinates for room in rooms):
+        xs = [coordinates[room][0] for room in rooms]
+        ys = [coordinates[room][1] for room in rooms]
+        width = (max(xs) - min(xs)) or 1
+        height = (max(ys) - min(ys)) or 1
+        per_floor = len(rooms) / len(set(labels.values()))
+        side = math.sqrt(width * height * cluster_size / max(per_floor, 1))
+        while side < 2 * max(width, height):
+            tiers.append({
+                room: labels[room] + (math.floor(coordinates[room][0] / side),
+                                      math.floor(coordinates[room][1] / side))
+                for room in rooms
+            })
+            side *= 4
+
+    tiers.append(labels)
+    tiers.append({room: key[:2] for room, key in labels.items()})
+    tiers.append({room: key[:1] for room, key in labels.items()})
+
+    levels = []
+    previous = len(rooms)
+    for tier in tiers:
+        clusters = len(set(tier.values()))
+        if 1 < clusters < previous:
+            levels.append(tier)
+            previous = clusters
+    if not levels and len(rooms) > cluster_size:
+        levels.append(_regions(rooms, cluster_size))
+    return levels
+
+
+# ----------------------------------------
+# Hierarchy
+# ----------------------------------------
+
+class AbstractLevel:
+    """
+    One level of the hierarchy, built on the graph of the level below
+    (rooms for the first level, the previous level's abstract graph above)
+
+    cluster_of: {room: cluster key}
+    portals: nodes of the level below with an edge into another cluster
+    adjacency: abstract graph {portal: {portal: cost}}, in-cluster edges
+    (shortest distances) plus the corridors between clusters
+    """
+
+    def __init__(self, below, cluster_of):
+        self.cluster_of = cluster_of
+        self.portals = {
+            node for node, neighbors in below.items()
+            if any(cluster_of[n] != cluster_of[node] for n in neighbors)
+        }
+        self.adjacency = {portal: {} for portal in self.portals}
+        # The part of the graph below inside each cluster
+        inside = {}
+        for node, neighbors in below.items():
+            cluster = cluster_of[node]
+            inside.setdefault(cluster, {})[node] = {
+                n: d for n, d in neighbors.items() if cluster_of[n] == cluster}
+        self.clusters = len(inside)
+        self.settled = 0
+
+        for portal in self.portals:
+            cluster = cluster_of[portal]
+            edges = self.adjacency[portal]
+            settled, parents = _sweep(inside[cluster], portal)
+            self.settled += len(settled)
+            for node in _direct(settled, parents, portal, self.portals):
+                if node in self.portals:
+                    edges[node] = settled[node]
+            for neighbor, d in below[portal].items():
+                if cluster_of[neighbor] != cluster and d < edges.get(neighbor, math.inf):
+                    edges[neighbor] = d
+
+
+class HierarchicalGraph:
+    """
+    Multi-level search over a HospitalGraph or CompactGraph / SnapshotGraph
+    (clusters then come from saved coordinates, or BFS regions).
+
+    levels: optional list of {room: cluster key}, finest first, each
+    level nested in the next (default: default_levels(graph, cluster_size))
+    Rebuilt on the first query after the graph changes.
+    """
+
+    def __init__(self, graph, levels=None, cluster_size=64):
+        self.graph = graph
+        self.cluster_maps = levels
+        self.cluster_size = cluster_size
+        self.rooms = {}
+        self.levels = []
+        self.version = None
+        self.preprocess_time = 0
+        self.preprocess()
+
+
+    def preprocess(self):
+        start = time.perf_counter()
+        rooms = self.rooms = adjacency_of(self.graph)
+        cluster_maps = self.cluster_maps
+        if cluster_maps is None:
+            cluster_maps = default_levels(self.graph, self.cluster_size, rooms)
+
+        for number, cluster_of in enumerate(cluster_maps, 1):
+            missing = next((room for room in rooms if room not in cluster_of), None)
+            if missing is not None:
+                raise ValueError(f"Level {number} has no cluster for {missing}")
+        for number, (finer, coarser) in enumerate(zip(cluster_maps, cluster_maps[1:]), 1):
+            parent = {}
+            for room in rooms:
+                if parent.setdefault(finer[room], coarser[room]) != coarser[room]:
+                    raise ValueError(f"Level {number} clusters are not nested in level {number + 1}")
+
+        self.levels = []
+        below = rooms
+        for cluster_of in cluster_maps:
+            level = AbstractLevel(below, cluster_of)
+            self.levels.append(level)
+            below = level.adjacency
+
+        self.version = getattr(self.graph, 'version', 0)
+        self.preprocess_time = time.perf_counter() - start
+
+
+    def query(self, initial_state, goal_state):
+        """
+        Same result format as SearchAlgorithms.ucs:
+        {'path': [...], 'cost': ..., 'nodes_explored': ...}
+
+        Dijkstra that scans every node on the highest level whose cluster
+        holds neither the source nor the goal: room corridors near the
+        endpoints, ever coarser abstract graphs in between.
+        """
+        if self.version != getattr(self.graph, 'version', 0):
+            self.preprocess()
+
+        rooms = self.rooms
+        if initial_state not in rooms or goal_state not in rooms:
+            return None
+        if initial_state == goal_state:
+            return {'path': [initial_state], 'cost': 0, 'nodes_explored': 1}
+
+        graphs = [rooms] + [level.adjacency for level in self.levels]
+        # (level, cluster map, source cluster, goal cluster), coarsest first
+        endpoints = [(k, level.cluster_of, level.cluster_of[initial_state], level.cluster_of[goal_state])
+                     for k, level in reversed(list(enumerate(self.levels, 1)))]
+
+        dist = {initial_state: 0}
+        parents = {initial_state: None}
+        settled = set()
+        tie = count()
+        frontier = [(0, next(tie), initial_state)]
+        nodes_explored = 0
+
+        while frontier:
+            d, _, node = heapq.heappop(frontier)
+            if node in settled:
+                continue
+            settled.add(node)
+            nodes_explored += 1
+            if node == goal_state:
+                break
+
+            k = 0
+            for level, cluster_of, source_cluster, goal_cluster in endpoints:
+                cluster = cluster_of[node]
+                if cluster != source_cluster and cluster != goal_cluster:
+                    k = level
+                    break
+
+            for neighbor, w in graphs[k][node].items():
+                if neighbor in settled:
+                    continue
+                nd = d + w
+                old = dist.get(neighbor)
+                if old is None or nd < old:
+                    dist[neighbor] = nd
+                    parents[neighbor] = (node, k)
+                    heapq.heappush(frontier, (nd, next(tie), neighbor))
+
+        if goal_state not in settled:
+            return None
+
+        edges = []
+        node = goal_state
+        while node != initial_state:
+            parent, k = parents[node]
+            edges.append((k, parent, node))
+            node = parent
+        path = [initial_state]
+        for k, u, v in reversed(edges):
+            self._unpack(k, u, v, path)
+
+        return {
+            'path': path,
+            'cost': dist[goal_state],
+            'nodes_explored': nodes_explored
+        }
+
+
+    def _unpack(self, k, u, v, path):
+        """Append the rooms of the level-k edge u -> v (without u)"""
+        stack = [(k, u, v)]
+        while stack:
+            k, u, v = stack.pop()
+            if k == 0:
+                path.append(v)
+                continue
+            cluster_of = self.levels[k - 1].cluster_of
+            if cluster_of[u] != cluster_of[v]:
+                # Between clusters: a corridor (levels are nested)
+                path.append(v)
+                continue
+            # In-cluster edge: one search inside that cluster, one level down
+            below = self.rooms if k == 1 else self.levels[k - 2].adjacency
+            _, parents = _sweep(below, u, cluster_of, cluster_of[u], target=v)
+            chain = []
+            while v != u:
+                chain.append((k - 1, parents[v], v))
+                v = parents[v]
+            stack.extend(chain)
+
+
+    def describe(self):
+        """Clusters, portals and abstract edges per level"""
+        return {
+            'rooms': len(self.rooms),
+            'levels': [{
+                'clusters': level.clusters,
+                'portals': len(level.portals),
+                'edges': sum(len(edges) for edges in level.adjacency.values())
+            } for level in self.levels],
+            'preprocess_time': self.preprocess_time
+        }
+
+
+if __name__ == "__main__":
+    from benchmark import multi_floor
+    from hospital_graph import HospitalGraph
+
+    hierarchy = HierarchicalGraph(HospitalGraph())
+    print(hierarchy.describe())
+    print(hierarchy.query('Pharmacy', 'Laboratory'))
+
+    campus = multi_floor(4, 60, 60)
+    start = time.perf_counter()
+    hierarchy = HierarchicalGraph(campus)
+    print(f"\n{len(campus.graph)} rooms, preprocessing {time.perf_counter() - start:.2f} s")
+    for number, level in enumerate(hierarchy.describe()['levels'], 1):
+        print(f"  level {number}: {level['clusters']} clusters, {level['portals']} portals, "
+              f"{level['edges']} abstract edges")
+    for goal in ('F0-0-5', 'F0-30-30', 'F3-59-59'):
+        start = time.perf_counter()
+        result = hierarchy.query('F0-0-0', goal)
+        print(f"F0-0-0 -> {goal}: cost {result['cost']}, {len(result['path'])} rooms, "
+              f"{result['nodes_explored']} nodes explored, {1000 * (time.perf_counter() - start):.2f} ms")
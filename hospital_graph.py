@@ -4,6 +4,12 @@
 # More realistic hospital layout with balanced distances
 # Designed for optimal pathfinding
 
+import heapq
+import weakref
+
+from compact_graph import CompactGraph
+
+
 class HospitalGraph:
     """
     Improved Hospital Graph - 9 services
@@ -16,9 +22,21 @@ class HospitalGraph:
     - Outpatient: Cardiology, Consultations
     """
     
-    def __init__(self):
+    def __init__(self, graph=None, descriptions=None, precompute_paths=True,
+                 coordinates=None, floors=None, wings=None, buildings=None):
+        """
+        graph: optional adjacency dict {service: {neighbor: distance}} to use
+        instead of the built-in 9-service layout (see graph_loaders.py to
+        read one from CSV / JSON / GeoJSON files)
+        precompute_paths: build the all-pairs table now (turn off for large
+        maps; it is then built on first lookup)
+        coordinates: optional {service: (x, y[, z])}, used by A* heuristics
+        floors: optional {service: floor number}
+        wings / buildings: optional {service: name}, used to cluster the
+        map for hierarchical search (hierarchical_graph.py)
+        """
         # Symmetric, realistic hospital graph
-        self.graph = {
+        self.graph = graph if graph is not None else {
             # PHARMACY - Central Hub
             'Pharmacy': {
                 'Emergency': 3,      # Quick access to emergency
@@ -93,7 +111,40 @@ class HospitalGraph:
             'Laboratory': 'Medical tests and analysis',
             'Radiology': 'X-ray and imaging',
             'Consultations': 'Outpatient consultations'
-        }
+        } if graph is None else dict(descriptions or {})
+        self.coordinates = coordinates if coordinates is not None else {}
+        self.floors = floors if floors is not None else {}
+        self.wings = wings if wings is not None else {
+            'Pharmacy': 'Central',
+            'Emergency': 'Emergency Wing',
+            'Pediatrics': 'Emergency Wing',
+            'Surgery': 'Surgical Wing',
+            'ICU': 'Surgical Wing',
+            'Laboratory': 'Diagnostic Wing',
+            'Radiology': 'Diagnostic Wing',
+            'Cardiology': 'Outpatient',
+            'Consultations': 'Outpatient'
+        } if graph is None else {}
+        self.buildings = buildings if buildings is not None else {}
+        
+        # All-pairs shortest-path table (distance + next hop), rebuilt
+        # lazily whenever the graph version changes
+        self.version = 0
+        self._path_table = None
+        self._path_table_version = None
+        self._compiled = None
+        # Optional time-dependent travel times: {(service1, service2): profile}.
+        # Profiles leave the static distances alone, so editing them bumps
+        # profile_version, not version (tables and caches stay valid)
+        self.profiles = {}
+        self.profile_version = 0
+        # Closed corridors {(service1, service2): distance}, both directions,
+        # kept aside so unblock_edge can restore them
+        self.blocked = {}
+        # Callbacks notified of every single-corridor change (see add_listener)
+        self.listeners = []
+        if precompute_paths:
+            self.build_path_table()
     
     def get_neighbors(self, service):
         """Get neighboring services and distances"""
@@ -105,6 +156,224 @@ class HospitalGraph:
             return self.graph[service1][service2]
         return None
     
+    def set_distance(self, service1, service2, distance):
+        """Add or update a bidirectional corridor between two services"""
+        for service in (service1, service2):
+            if service not in self.graph:
+                self.graph[service] = {}
+                self.services.append(service)
+        old = self.graph[service1].get(service2)
+        self.graph[service1][service2] = distance
+        self.graph[service2][service1] = distance
+        self._edge_changed(service1, service2, old, distance)
+    
+    def remove_connection(self, service1, service2):
+        """Remove the corridor between two services (both directions)"""
+        old = self.graph.get(service1, {}).pop(service2, None)
+        self.graph.get(service2, {}).pop(service1, None)
+        self._edge_changed(service1, service2, old, None)
+    
+    def block_edge(self, service1, service2):
+        """Close a corridor (incident); it keeps its distance for unblock_edge"""
+        distance = self.get_distance(service1, service2)
+        if distance is None:
+            return False
+        self.blocked[(service1, service2)] = distance
+        self.blocked[(service2, service1)] = distance
+        self.remove_connection(service1, service2)
+        return True
+    
+    def unblock_edge(self, service1, service2):
+        """Reopen a corridor closed with block_edge"""
+        distance = self.blocked.pop((service1, service2), None)
+        self.blocked.pop((service2, service1), None)
+        if distance is None:
+            return False
+        self.set_distance(service1, service2, distance)
+        return True
+    
+    def reweight_edge(self, service1, service2, distance):
+        """Change the distance of an existing (or blocked) corridor"""
+        if (service1, service2) in self.blocked:
+            self.blocked[(service1, service2)] = distance
+            self.blocked[(service2, service1)] = distance
+            return True
+        if self.get_distance(service1, service2) is None:
+            return False
+        self.set_distance(service1, service2, distance)
+        return True
+    
+    def is_blocked(self, service1, service2):
+        return (service1, service2) in self.blocked
+    
+    def add_listener(self, callback):
+        """
+        Call callback(service1, service2, old, new, old_version, new_version)
+        after every corridor change (old/new distance None = no corridor).
+        Bound methods are held weakly so listeners die with their owner.
+        """
+        try:
+            self.listeners.append(weakref.WeakMethod(callback))
+        except TypeError:
+            self.listeners.append(lambda: callback)
+    
+    def remove_listener(self, callback):
+        self.listeners = [ref for ref in self.listeners if ref() not in (None, callback)]
+    
+    def _edge_changed(self, service1, service2, old, new):
+        """Bump the version, repair the path table and notify listeners"""
+        old_version = self.version
+        table_current = self._path_table_version == old_version
+        self.mark_changed()
+        if old == new:
+            if table_current:
+                self._path_table_version = self.version
+        elif table_current and service1 in self._path_table[0] and service2 in self._path_table[0]:
+            self._repair_path_table(service1, service2, old, new)
+        
+        alive = []
+        for ref in self.listeners:
+            callback = ref()
+            if callback is not None:
+                alive.append(ref)
+                callback(service1, service2, old, new, old_version, self.version)
+        self.listeners = alive
+    
+    def __getstate__(self):
+        # Listeners are process-local (weak references cannot be pickled)
+        state = self.__dict__.copy()
+        state['listeners'] = []
+        return state
+    
+    def set_profile(self, service1, service2, profile, both_directions=True):
+        """Attach a CongestionProfile (or None to remove it) to a corridor"""
+        for key in ((service1, service2), (service2, service1)) if both_directions else ((service1, service2),):
+            if profile is None:
+                self.profiles.pop(key, None)
+            else:
+                self.profiles[key] = profile
+        self.profile_version += 1
+    
+    def travel_time(self, service1, service2, departure):
+        """Travel time of a corridor when leaving at `departure` (static distance if no profile)"""
+        profile = self.profiles.get((service1, service2))
+        if profile is None:
+            return self.get_distance(service1, service2)
+        return profile.travel_time(departure)
+    
+    def mark_changed(self):
+        """Bump the graph version after editing self.graph directly"""
+        self.version += 1
+    
+    def build_path_table(self):
+        """
+        Build the all-pairs shortest-path table with one Dijkstra per source.
+        
+        distances[a][b] is the shortest distance from a to b and
+        next_hop[a][b] the first service to visit on that route.
+        """
+        distances = {}
+        next_hop = {}
+        
+        for source in self.graph:
+            distances[source], next_hop[source] = self._shortest_path_tree(source)
+        
+        self._path_table = (distances, next_hop)
+        self._path_table_version = self.version
+        return self._path_table
+    
+    def _shortest_path_tree(self, source):
+        """Dijkstra from source: (distances, first hop) dicts"""
+        dist = {source: 0}
+        first = {}
+        done = set()
+        heap = [(0, source)]
+        
+        while heap:
+            d, current = heapq.heappop(heap)
+            if current in done:
+                continue
+            done.add(current)
+            
+            for neighbor, distance in self.graph[current].items():
+                new_dist = d + distance
+                if neighbor not in dist or new_dist < dist[neighbor]:
+                    dist[neighbor] = new_dist
+                    first[neighbor] = neighbor if current == source else first[current]
+                    heapq.heappush(heap, (new_dist, neighbor))
+        
+        return dist, first
+    
+    def _repair_path_table(self, service1, service2, old, new):
+        """
+        Update the path table in place after one corridor changed, instead
+        of rebuilding all n Dijkstra trees.
+        
+        - Shorter / new corridor: every route can only improve by going
+          through it, so relax all pairs via it (O(n^2), no searches).
+        - Longer / removed corridor: only sources whose shortest-path tree
+          used it are affected; just those rows are recomputed.
+        """
+        distances, next_hop = self._path_table
+        
+        if old is None or (new is not None and new < old):
+            for source, row in distances.items():
+                hops = next_hop[source]
+                for a, b in ((service1, service2), (service2, service1)):
+                    to_a = row.get(a)
+                    if to_a is None:
+                        continue
+                    via = to_a + new
+                    hop = b if source == a else hops[a]
+                    for target, from_b in list(distances[b].items()):
+                        d = via + from_b
+                        current = row.get(target)
+                        if current is None or d < current:
+                            row[target] = d
+                            hops[target] = hop
+        else:
+            for source, row in distances.items():
+                d1 = row.get(service1)
+                d2 = row.get(service2)
+                if d1 is None or d2 is None:
+                    continue
+                if d1 + old <= d2 + 1e-9 or d2 + old <= d1 + 1e-9:
+                    distances[source], next_hop[source] = self._shortest_path_tree(source)
+        
+        self._path_table_version = self.version
+    
+    def get_path_table(self):
+        """Return (distances, next_hop), rebuilding it if the graph changed"""
+        if self._path_table_version != self.version:
+            self.build_path_table()
+        return self._path_table
+    
+    def shortest_distance(self, service1, service2):
+        """Shortest route distance between any two services (None if unreachable)"""
+        distances, _ = self.get_path_table()
+        return distances.get(service1, {}).get(service2)
+    
+    def shortest_path(self, service1, service2):
+        """Walk the next-hop table from service1 to service2"""
+        distances, next_hop = self.get_path_table()
+        cost = distances.get(service1, {}).get(service2)
+        if cost is None:
+            return None
+        
+        path = [service1]
+        current = service1
+        while current != service2:
+            current = next_hop[current][service2]
+            path.append(current)
+        
+        return path, cost
+    
+    def compile(self):
+        """Integer-indexed CSR copy of the graph, recompiled when the graph changes"""
+        if self._compiled is None or self._compiled.version != self.version:
+            self._compiled = CompactGraph.from_graph(self)
+        return self._compiled
+    
     def display_graph(self):
         """Display the complete graph structure"""
         print("\n" + "="*70)
@@ -123,20 +392,31 @@ class HospitalGraph:
         print("="*70)
     
     def get_statistics(self):
-        """Get graph statistics"""
-        distances = []
+        """Get graph statistics (one pass over the adjacency, no temporary lists)"""
+        arcs = 0
+        total = 0
+        lowest = None
+        highest = None
         for neighbors in self.graph.values():
-            distances.extend(neighbors.values())
+            if not neighbors:
+                continue
+            distances = neighbors.values()
+            arcs += len(neighbors)
+            total += sum(distances)
+            low, high = min(distances), max(distances)
+            if lowest is None or low < lowest:
+                lowest = low
+            if highest is None or high > highest:
+                highest = high
         
         return {
             'nodes': len(self.services),
-            'edges': len(distances) // 2,  # Bidirectional
-            'min_distance': min(distances),
-            'max_distance': max(distances),
-            'avg_distance': sum(distances) / len(distances)
+            'edges': arcs // 2,  # Bidirectional
+            'min_distance': lowest,
+            'max_distance': highest,
+            'avg_distance': total / arcs if arcs else 0
         }
 
-
 if __name__ == "__main__":
     hospital = HospitalGraph()
     hospital.display_graph()
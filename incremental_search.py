@@ -0,0 +1,214 @@
+# ============================================
+# INCREMENTAL SEARCH (D* LITE)
+# ============================================
+# Replanning for an agent that is already on its way when corridors
+# close, reopen or change length. D* Lite searches backwards from the
+# goal and keeps g/rhs values between calls: after an edge change only
+# the vertices whose distance-to-goal actually changed are re-expanded,
+# instead of running a new search from scratch.
+# (Koenig & Likhachev, "D* Lite", AAAI 2002)
+
+from collections import deque
+import heapq
+
+INFINITY = float('inf')
+
+
+class DStarLite:
+    """
+    Incremental shortest route from a moving start to a fixed goal.
+
+    The planner subscribes to the HospitalGraph it routes on: every
+    corridor change is queued and applied on the next update() call.
+
+    heuristic: optional h(a, b) lower bound on the distance between two
+    services (must stay valid when corridors get longer); 0 by default.
+    """
+
+    def __init__(self, graph, start, goal, heuristic=None):
+        self.graph = graph
+        self.start = start
+        self.goal = goal
+        self.last = start
+        self.h = heuristic or (lambda a, b: 0)
+        self.km = 0
+        self.g = {}
+        self.rhs = {goal: 0}
+        self.queue = []
+        self.keys = {}           # vertex -> key it is queued with (lazy deletion)
+        self.changes = []
+        self.nodes_explored = 0
+        self._push(goal)
+        graph.add_listener(self._edge_changed)
+
+
+    def _edge_changed(self, service1, service2, old, new, old_version, new_version):
+        self.changes.append((service1, service2))
+
+
+    def close(self):
+        """Stop listening to graph changes"""
+        self.graph.remove_listener(self._edge_changed)
+
+
+    def _key(self, state):
+        m = min(self.g.get(state, INFINITY), self.rhs.get(state, INFINITY))
+        return (m + self.h(self.start, state) + self.km, m)
+
+
+    def _push(self, state):
+        key = self._key(state)
+        self.keys[state] = key
+        heapq.heappush(self.queue, (key, state))
+
+
+    def _top_key(self):
+        while self.queue:
+            key, state = self.queue[0]
+            if self.keys.get(state) == key:
+                return key
+            heapq.heappop(self.queue)
+        return (INFINITY, INFINITY)
+
+
+    def _update_vertex(self, state):
+        if state != self.goal:
+            self.rhs[state] = min(
+                (distance + self.g.get(neighbor, INFINITY)
+                 for neighbor, distance in self.graph.get_neighbors(state).items()),
+                default=INFINITY)
+        self.keys.pop(state, None)
+        if self.g.get(state, INFINITY) != self.rhs.get(state, INFINITY):
+            self._push(state)
+
+
+    def compute_shortest_path(self):
+        """Expand vertices until the start's distance-to-goal is settled"""
+        while (self._top_key() < self._key(self.start)
+               or self.rhs.get(self.start, INFINITY) != self.g.get(self.start, INFINITY)):
+            if not self.queue:
+                break
+            key_old, state = heapq.heappop(self.queue)
+            del self.keys[state]
+            self.nodes_explored += 1
+
+            key_new = self._key(state)
+            g = self.g.get(state, INFINITY)
+            rhs = self.rhs.get(state, INFINITY)
+            if key_old < key_new:
+                self._push(state)
+            elif g > rhs:
+                self.g[state] = rhs
+                for neighbor in self.graph.get_neighbors(state):
+                    self._update_vertex(neighbor)
+            else:
+                self.g[state] = INFINITY
+                self._update_vertex(state)
+                for neighbor in self.graph.get_neighbors(state):
+                    self._update_vertex(neighbor)
+
+
+    def update(self):
+        """Apply the corridor changes seen since the last call and replan"""
+        changes, self.changes = self.changes, []
+        for service1, service2 in changes:
+            self._update_vertex(service1)
+            self._update_vertex(service2)
+        self.compute_shortest_path()
+
+
+    def move_to(self, state):
+        """The agent reached state: it becomes the new start"""
+        self.km += self.h(self.last, state)
+        self.last = state
+        self.start = state
+
+
+    def cost(self):
+        """Current shortest distance from start to goal (inf if cut off)"""
+        return self.g.get(self.start, INFINITY)
+
+
+    def next_step(self):
+        """Best neighbor to move to from start (None at the goal or if unreachable)"""
+        if self.start == self.goal or self.cost() == INFINITY:
+            return None
+        rooms = self._descent(self.start)
+        return rooms[0] if rooms else None
+
+
+    def _descent(self, state):
+        """
+        Rooms after state up to the next one strictly closer to the goal:
+        usually a single corridor. Rooms joined by zero-length corridors
+        share the same g, so picking by w + g alone could bounce between
+        them forever; across such a plateau take the fewest corridors to
+        a room that leads further down. None if no such room exists.
+        """
+        parents = {state: None}
+        queue = deque([state])
+        while queue:
+            current = queue.popleft()
+            neighbors = self.graph.get_neighbors(current)
+            best = min((distance + self.g.get(neighbor, INFINITY)
+                        for neighbor, distance in neighbors.items()), default=INFINITY)
+            if best == INFINITY:
+                continue
+            for neighbor, distance in neighbors.items():
+                if distance + self.g.get(neighbor, INFINITY) != best:
+                    continue
+                if distance > 0 or neighbor == self.goal:
+                    rooms = [neighbor]
+                    while current != state:
+                        rooms.append(current)
+                        current = parents[current]
+                    rooms.reverse()
+                    return rooms
+                if neighbor not in parents:
+                    parents[neighbor] = current
+                    queue.append(neighbor)
+        return None
+
+
+    def path(self):
+        """Route start -> goal following the current g values (None if unreachable)"""
+        if self.cost() == INFINITY:
+            return None
+        path = [self.start]
+        visited = {self.start}
+        while path[-1] != self.goal:
+            rooms = self._descent(path[-1])
+            if rooms is None or not visited.isdisjoint(rooms):
+                return None
+            path.extend(rooms)
+            visited.update(rooms)
+        return path
+
+
+    def plan(self):
+        """update() and return a result dict like the other searches (or None)"""
+        self.update()
+        path = self.path()
+        if path is None:
+            return None
+        return {
+            'path': path,
+            'cost': self.cost(),
+            'nodes_explored': self.nodes_explored
+        }
+
+
+if __name__ == "__main__":
+    from hospital_graph import HospitalGraph
+
+    hospital = HospitalGraph()
+    planner = DStarLite(hospital, 'Pharmacy', 'Laboratory')
+    print("Initial:", planner.plan())
+
+    planner.move_to('Surgery')
+    hospital.block_edge('Surgery', 'ICU')
+    print("Surgery-ICU closed:", planner.plan())
+
+    hospital.unblock_edge('Surgery', 'ICU')
+    print("Reopened:", planner.plan())
+    planner.close()
@@ -0,0 +1,273 @@
+# ============================================
+# SEARCH INSTRUMENTATION
+# ============================================
+# Per-call statistics for the searches in algorithms.py, aggregation of
+# those statistics into histograms across many calls / missions, and an
+# opt-in profiler around DistributionAgent.execute_mission.
+# - SearchStats: one object per search call (returned as result['stats'])
+# - StatsAggregator: thread-safe log2-bucket histograms per algorithm
+# - profile_mission(): cProfile + tracemalloc around one mission
+
+import cProfile
+import io
+import math
+import pstats
+import threading
+import tracemalloc
+import weakref
+
+
+# tracemalloc keeps a single global peak. A search resets it only when no
+# other search is being measured, so overlapping searches (threads,
+# executors) never wipe each other's readings; each of them then reports
+# the peak of the whole overlap, an upper bound on its own. The highest
+# peak seen so far is remembered here (profile_mission reads it to report
+# the mission-wide peak).
+_highest_peak = 0
+_measuring = weakref.WeakSet()      # checkpoints of calls still running
+_lock = threading.Lock()
+
+
+class _Checkpoint:
+    """Traced bytes when a call started (dropped from _measuring with the call)"""
+    __slots__ = ('current', '__weakref__')
+
+    def __init__(self, current):
+        self.current = current
+
+
+def memory_checkpoint():
+    """Start measuring a call's peak memory (None when tracemalloc is off)"""
+    global _highest_peak
+    if not tracemalloc.is_tracing():
+        return None
+    with _lock:
+        current, peak = tracemalloc.get_traced_memory()
+        _highest_peak = max(_highest_peak, peak)
+        if not _measuring:
+            tracemalloc.reset_peak()
+        checkpoint = _Checkpoint(current)
+        _measuring.add(checkpoint)
+    return checkpoint
+
+
+def peak_since(checkpoint):
+    """Peak bytes allocated on top of the checkpoint (None if not measured)"""
+    global _highest_peak
+    if checkpoint is None:
+        return None
+    with _lock:
+        _measuring.discard(checkpoint)
+        if not tracemalloc.is_tracing():
+            return None
+        peak = tracemalloc.get_traced_memory()[1]
+        _highest_peak = max(_highest_peak, peak)
+    return peak - checkpoint.current
+
+
+class SearchStats:
+    """
+    Counters of one search call.
+
+    expansions: states actually expanded (stale heap entries excluded)
+    pushes: frontier insertions
+    stale_pops: heap entries popped for an already settled state
+    max_frontier: largest frontier size seen
+    wall_time: seconds spent in the call
+    peak_memory: bytes allocated at the peak of the call (only measured
+    while tracemalloc is tracing, None otherwise); exact for calls that
+    run alone, an upper bound for calls overlapping other searches
+    cache_hit: answered from the route cache (counters are then 0)
+    """
+    __slots__ = ('algorithm', 'expansions', 'pushes', 'stale_pops', 'max_frontier',
+                 'wall_time', 'peak_memory', 'cache_hit')
+
+    FIELDS = ('expansions', 'pushes', 'stale_pops', 'max_frontier', 'wall_time', 'peak_memory')
+
+    def __init__(self, algorithm=''):
+        self.algorithm = algorithm
+        self.expansions = 0
+        self.pushes = 0
+        self.stale_pops = 0
+        self.max_frontier = 0
+        self.wall_time = 0.0
+        self.peak_memory = None
+        self.cache_hit = False
+
+    @property
+    def nodes_explored(self):
+        """Frontier pops, stale ones included (the historical nodes_explored)"""
+        return self.expansions + self.stale_pops
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"SearchStats({fields})"
+
+
+def _bucket_limit(bucket):
+    """Upper bound of a Histogram bucket"""
+    return 0 if bucket == -math.inf else math.ldexp(1, bucket)
+
+
+class Histogram:
+    """
+    Count / sum / min / max plus power-of-two buckets: bucket k holds
+    values in [2**(k-1), 2**k), bucket -inf values <= 0
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        bucket = math.frexp(value)[1] if value > 0 else -math.inf
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(_bucket_limit(bucket), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': {_bucket_limit(b): n for b, n in sorted(self.buckets.items())}
+        }
+
+
+class StatsAggregator:
+    """
+    Collects SearchStats into one Histogram per (algorithm, field).
+    Attach it with SearchAlgorithms.collector (or pass mission results to
+    add_mission); add() takes a lock, so searches may run in threads.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.calls = {}
+        self.cache_hits = {}
+        self._lock = threading.Lock()
+
+    def add(self, stats):
+        with self._lock:
+            name = stats.algorithm
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if stats.cache_hit:
+                self.cache_hits[name] = self.cache_hits.get(name, 0) + 1
+            fields = self.histograms.setdefault(name, {})
+            # Cache hits did no search work: only their latency is recorded
+            for field in ('wall_time',) if stats.cache_hit else SearchStats.FIELDS:
+                value = getattr(stats, field)
+                if value is not None:
+                    fields.setdefault(field, Histogram()).add(value)
+
+    def add_mission(self, result):
+        """Add the stats of every leg of an execute_mission result"""
+        for leg in result.get('legs', ()):
+            stats = leg.get('stats')
+            if stats is not None:
+                self.add(stats)
+
+    def report(self):
+        """{algorithm: {'calls', 'cache_hits', field: histogram summary}}"""
+        with self._lock:
+            return {
+                name: dict(
+                    {'calls': self.calls[name], 'cache_hits': self.cache_hits.get(name, 0)},
+                    **{field: h.summary() for field, h in fields.items()})
+                for name, fields in self.histograms.items()
+            }
+
+    def display(self, log=print):
+        for name, entry in self.report().items():
+            log(f"{name}: {entry['calls']} calls, {entry['cache_hits']} cache hits")
+            for field in SearchStats.FIELDS:
+                summary = entry.get(field)
+                if summary:
+                    log(f"  {field:<13} mean {summary['mean']:12.6g}  p50 {summary['p50']:10.6g}  "
+                        f"p95 {summary['p95']:10.6g}  p99 {summary['p99']:10.6g}  max {summary['max']:10.6g}")
+
+
+def profile_mission(agent, requested_services, profile=True, trace_memory=True, top=20, **options):
+    """
+    Run agent.execute_mission(requested_services, **options) under
+    cProfile and/or tracemalloc.
+
+    Returns (result, report): report has 'profile' (pstats text of the
+    `top` most expensive functions by cumulative time) and 'peak_memory'
+    (bytes); with trace_memory every leg's stats also get peak_memory.
+    """
+    global _highest_peak
+    report = {}
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_memory:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        _highest_peak = 0
+    profiler = cProfile.Profile() if profile else None
+
+    try:
+        if profiler is not None:
+            profiler.enable()
+        result = agent.execute_mission(requested_services, **options)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if trace_memory:
+            peak = max(_highest_peak, tracemalloc.get_traced_memory()[1])
+            report['peak_memory'] = peak - baseline
+        if started_tracing:
+            tracemalloc.stop()
+
+    if profiler is not None:
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(top)
+        report['profile'] = text.getvalue()
+    return result, report
+
+
+if __name__ == "__main__":
+    import random
+
+    from distribution_agent import DistributionAgent
+
+    agent = DistributionAgent(verbose=False)
+    aggregator = StatsAggregator()
+    agent.algorithms.collector = aggregator
+
+    destinations = [s for s in agent.graph.services if s != 'Pharmacy']
+    rng = random.Random(0)
+    for _ in range(200):
+        agent.execute_mission(rng.sample(destinations, 3), algorithm=rng.choice(['ucs', 'astar', 'bfs']))
+    aggregator.display()
+
+    result, report = profile_mission(agent, ['ICU', 'Laboratory', 'Emergency'], algorithm='astar', top=8)
+    print(f"\nPeak memory: {report['peak_memory']} bytes")
+    print(report['profile'])
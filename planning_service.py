@@ -0,0 +1,352 @@
+# ============================================
+# PLANNING SERVICE
+# ============================================
+# Local asyncio HTTP/JSON service around DistributionAgent.plan_route, for
+# ward terminals that submit bursts of near-identical requests:
+# - coalescing: identical in-flight (source, goal, algorithm) queries
+#   share one computation
+# - micro-batching: queries arriving within `batch_window` seconds are
+#   planned together; several UCS goals from one source are answered by
+#   a single ucs_multi sweep
+# - searches run in an executor, so the event loop keeps accepting
+#   connections while a batch is being planned
+#
+# Endpoints (localhost TCP or a Unix socket):
+#   GET  /plan?source=Pharmacy&goal=ICU&algorithm=astar
+#   POST /plan   {"source": ..., "goal": ..., "algorithm": ...}
+#                or {"queries": [{...}, ...]}
+#   GET  /stats
+#
+# Example:
+#   python planning_service.py --port 8765
+#   curl 'http://127.0.0.1:8765/plan?source=Pharmacy&goal=ICU'
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+from urllib.parse import parse_qsl, urlsplit
+
+from algorithms import logger
+from compact_graph import CompactGraph
+from distribution_agent import DistributionAgent
+from hospital_graph import HospitalGraph
+
+ALGORITHMS = ('bfs', 'dfs', 'ucs', 'astar', 'bi_ucs', 'bi_astar', 'ch', 'hpa', 'table')
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+MAX_BODY = 1 << 20
+
+
+class QueryError(ValueError):
+    """Invalid query (reported to the client as 400 / 404)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _serialize(result):
+    """Search result dict -> JSON-ready dict (SearchStats as a dict)"""
+    if result is None:
+        return {'path': None, 'cost': None}
+    result = dict(result)
+    stats = result.get('stats')
+    if stats is not None and not isinstance(stats, dict):
+        result['stats'] = stats.to_dict()
+    return result
+
+
+class PlanningService:
+    """
+    graph: HospitalGraph, CompactGraph or SnapshotGraph served (default:
+    the built-in layout)
+    batch_window: seconds to wait for more queries before planning a batch
+    max_batch: queries that trigger planning without waiting
+    executor: where batches are planned; the default single worker thread
+    keeps the agent's search state and route cache free of races
+    """
+
+    def __init__(self, graph=None, batch_window=0.002, max_batch=64, executor=None):
+        self.graph = graph if graph is not None else HospitalGraph()
+        # Service names to validate against (CompactGraph / SnapshotGraph: ids)
+        self.known = self.graph.ids if isinstance(self.graph, CompactGraph) else self.graph.graph
+        self.agent = DistributionAgent(self.graph, verbose=False)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.executor = executor if executor is not None else ThreadPoolExecutor(max_workers=1)
+        self.inflight = {}         # (source, goal, algorithm) -> asyncio.Future
+        self.queue = []
+        self.flush_handle = None
+        self.servers = []
+        self.connections = {}      # writer -> handler task
+        self.stats = {'queries': 0, 'coalesced': 0, 'batches': 0, 'searches': 0,
+                      'multi_sweeps': 0, 'largest_batch': 0}
+
+
+    # ----------------------------------------
+    # Planning
+    # ----------------------------------------
+
+    def _validate(self, source, goal, algorithm):
+        if algorithm not in ALGORITHMS:
+            raise QueryError(f"Unknown algorithm: {algorithm}")
+        for name, service in (('source', source), ('goal', goal)):
+            if not isinstance(service, str):
+                raise QueryError(f"Missing or invalid {name}")
+            if service not in self.known:
+                raise QueryError(f"Unknown service: {service}", 404)
+
+
+    async def plan(self, source, goal, algorithm='ucs'):
+        """Plan source -> goal; returns the search result dict (None if unreachable)"""
+        self._validate(source, goal, algorithm)
+        self.stats['queries'] += 1
+        key = (source, goal, algorithm)
+        future = self.inflight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self.inflight[key] = future
+            self.queue.append(key)
+            self._schedule_flush()
+        # shield: one cancelled client must not cancel the shared computation
+        return await asyncio.shield(future)
+
+
+    def _schedule_flush(self):
+        loop = asyncio.get_running_loop()
+        if len(self.queue) >= self.max_batch:
+            if self.flush_handle is not None:
+                self.flush_handle.cancel()
+            self.flush_handle = None
+            loop.create_task(self._flush())
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(
+                self.batch_window, lambda: loop.create_task(self._flush()))
+
+
+    async def _flush(self):
+        self.flush_handle = None
+        batch, self.queue = self.queue, []
+        if not batch:
+            return
+        self.stats['batches'] += 1
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+
+        loop = asyncio.get_running_loop()
+        try:
+            results, searches, multi_sweeps = await loop.run_in_executor(
+                self.executor, self._solve_batch, batch)
+        except Exception as error:
+            logger.exception("Planning batch failed")
+            results = {key: error for key in batch}
+        else:
+            # Counters are only touched here, on the event loop
+            self.stats['searches'] += searches
+            self.stats['multi_sweeps'] += multi_sweeps
+
+        for key in batch:
+            future = self.inflight.pop(key)
+            if future.done():
+                continue
+            outcome = results.get(key)
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+
+    def _solve_batch(self, batch):
+        """
+        Runs in the executor. UCS queries sharing a source are answered
+        by one ucs_multi sweep; everything else goes through plan_route.
+        Returns (results by key, searches run, ucs_multi sweeps).
+        """
+        agent = self.agent
+        results = {}
+        searches = multi_sweeps = 0
+        ucs_goals = {}
+        for source, goal, algorithm in batch:
+            if algorithm == 'ucs':
+                ucs_goals.setdefault(source, []).append(goal)
+
+        for source, goals in ucs_goals.items():
+            if len(goals) < 2:
+                continue
+            searches += 1
+            multi_sweeps += 1
+            for goal, result in agent.algorithms.ucs_multi(source, goals).items():
+                results[(source, goal, 'ucs')] = _serialize(result)
+
+        for key in batch:
+            if key in results:
+                continue
+            source, goal, algorithm = key
+            searches += 1
+            agent.current_position = source
+            try:
+                results[key] = _serialize(agent.plan_route(goal, algorithm))
+            except Exception as error:
+                results[key] = error
+        return results, searches, multi_sweeps
+
+
+    # ----------------------------------------
+    # HTTP
+    # ----------------------------------------
+
+    async def _answer(self, query):
+        if not isinstance(query, dict):
+            raise QueryError("A query is a JSON object with source and goal")
+        return await self.plan(query.get('source'), query.get('goal'),
+                               query.get('algorithm', 'ucs'))
+
+
+    async def _route(self, method, target, body):
+        """(status, JSON-ready payload) for one HTTP request"""
+        url = urlsplit(target)
+        if url.path == '/stats':
+            return 200, dict(self.stats, inflight=len(self.inflight), graph_version=self.graph.version)
+        if url.path != '/plan':
+            return 404, {'error': f"No such endpoint: {url.path}"}
+
+        if method == 'GET':
+            query = dict(parse_qsl(url.query))
+        elif method == 'POST':
+            try:
+                query = json.loads(body or b'{}')
+            except ValueError:
+                return 400, {'error': "Body is not valid JSON"}
+        else:
+            return 405, {'error': f"Method not allowed: {method}"}
+
+        try:
+            if isinstance(query, dict) and 'queries' in query:
+                outcomes = await asyncio.gather(
+                    *(self._answer(q) for q in query['queries']), return_exceptions=True)
+                results = []
+                for outcome in outcomes:
+                    if isinstance(outcome, QueryError):
+                        results.append({'error': str(outcome)})
+                    elif isinstance(outcome, Exception):
+                        raise outcome
+                    else:
+                        results.append(outcome)
+                return 200, {'results': results}
+            return 200, await self._answer(query)
+        except QueryError as error:
+            return error.status, {'error': str(error)}
+
+
+    async def handle_connection(self, reader, writer):
+        """HTTP/1.1 with keep-alive: one JSON response per request"""
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': "Invalid Content-Length"}, False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 400, {'error': "Body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version != 'HTTP/1.0'
+                try:
+                    status, payload = await self._route(method.upper(), target, body)
+                except Exception as error:
+                    logger.exception("Request failed: %s %s", method, target)
+                    status, payload = 500, {'error': f"Internal error: {type(error).__name__}"}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.pop(writer, None)
+            writer.close()
+
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        """Start listening (a Unix socket when unix_path is given); returns the server"""
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        self.servers.append(server)
+        return server
+
+
+    async def serve_forever(self, host='127.0.0.1', port=8765, unix_path=None):
+        server = await self.start(host, port, unix_path)
+        where = unix_path or '%s:%s' % server.sockets[0].getsockname()[:2]
+        logger.info("Planning service listening on %s", where)
+        async with server:
+            await server.serve_forever()
+
+
+    async def close(self):
+        for server in self.servers:
+            server.close()
+        # Idle keep-alive connections would otherwise outlive the servers
+        handlers = list(self.connections.values())
+        for writer in list(self.connections):
+            writer.close()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        for server in self.servers:
+            await server.wait_closed()
+        self.servers = []
+        self.executor.shutdown(wait=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local route planning service (HTTP/JSON)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('--batch-window', type=float, default=0.002, help="seconds")
+    args = parser.parse_args(argv)
+
+    service = PlanningService(batch_window=args.batch_window)
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# ============================================
+# STREAMING REQUEST INGESTION
+# ============================================
+# Reads delivery requests lazily from JSONL (file or stdin), merges them
+# into the agent's pending stops with cheapest insertion (the current
+# route is repaired, never replanned from scratch) and writes every
+# delivery as one JSONL line. Memory stays bounded by the number of
+# outstanding stops, not by the size of the log.
+#
+# Accepted input lines:
+#   {"id": "r1", "services": ["ICU", "Laboratory"]}
+#   {"id": "r2", "service": "Emergency"}
+#   ["Cardiology", "Radiology"]
+
+import argparse
+import json
+import logging
+import sys
+
+from algorithms import logger
+from compact_graph import CompactGraph
+from distribution_agent import DistributionAgent
+
+
+def read_requests(source):
+    """
+    Yield {'id': ..., 'services': [...]} one line at a time.
+    source: path, '-' for stdin, or an open text file.
+    """
+    if source == '-':
+        yield from _parse_lines(sys.stdin)
+    elif hasattr(source, 'read'):
+        yield from _parse_lines(source)
+    else:
+        with open(source, encoding='utf-8') as f:
+            yield from _parse_lines(f)
+
+
+def _parse_lines(lines):
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as error:
+            logger.warning("Skipping line %d: %s", number, error)
+            continue
+
+        services = None
+        request_id = number
+        if isinstance(data, list):
+            services = data
+        elif isinstance(data, dict):
+            services = data.get('services')
+            if not services and data.get('service'):
+                services = [data['service']]
+            request_id = data.get('id', number)
+        if isinstance(services, str):
+            services = [services]
+
+        if not services or not isinstance(services, list) \
+                or not all(isinstance(service, str) for service in services):
+            logger.warning("Skipping line %d: no services", number)
+            continue
+        yield {'id': request_id, 'services': services}
+
+
+class StreamingPlanner:
+    """
+    Keeps an ordered list of pending stops for one agent:
+    current position -> stops... -> depot.
+    New services are inserted where they add the least distance.
+    """
+
+    def __init__(self, agent=None, algorithm='ucs', depot='Pharmacy'):
+        self.agent = agent if agent is not None else DistributionAgent(verbose=False)
+        self.graph = self.agent.graph
+        # Service names to validate against (CompactGraph / SnapshotGraph: ids)
+        self.known = self.graph.ids if isinstance(self.graph, CompactGraph) else self.graph.graph
+        self.algorithm = algorithm
+        self.depot = depot
+        self.stops = []          # [service, [request ids]]
+        self.agent.reset_mission(depot)
+
+
+    def forget_history(self):
+        """
+        Drop the agent's route and delivery log once their events are
+        written, so a long stream runs in constant memory
+        """
+        self.agent.route = [self.agent.current_position]
+        self.agent.medications_delivered.clear()
+
+
+    def distance(self, service1, service2):
+        if hasattr(self.graph, 'shortest_distance'):
+            d = self.graph.shortest_distance(service1, service2)
+        else:
+            # Plain CompactGraph: no path table, search (the agent caches routes)
+            result = self.agent.algorithms.ucs(service1, service2)
+            d = result['cost'] if result else None
+        return float('inf') if d is None else d
+
+
+    def add_request(self, request):
+        """Merge a request into the pending stops (cheapest insertion)"""
+        rejected = []
+        for service in request['services']:
+            if service not in self.known:
+                rejected.append(service)
+                continue
+
+            existing = next((stop for stop in self.stops if stop[0] == service), None)
+            if existing is not None:
+                existing[1].append(request['id'])
+                continue
+
+            route = [self.agent.current_position] + [stop[0] for stop in self.stops] + [self.depot]
+            best_position = 0
+            best_delta = float('inf')
+            for i in range(len(route) - 1):
+                a, b = route[i], route[i + 1]
+                delta = self.distance(a, service) + self.distance(service, b) - self.distance(a, b)
+                if delta < best_delta:
+                    best_delta = delta
+                    best_position = i
+            self.stops.insert(best_position, [service, [request['id']]])
+
+        return rejected
+
+
+    def step(self):
+        """Travel to the next pending stop and deliver; returns the event dict"""
+        if not self.stops:
+            return None
+        service, request_ids = self.stops.pop(0)
+        start = self.agent.current_position
+        distance_before = self.agent.total_distance
+
+        plan = self.agent.plan_route(service, self.algorithm)
+        if plan is None:
+            return {'event': 'unreachable', 'service': service, 'requests': request_ids}
+
+        route_start = len(self.agent.route) - 1
+        if not self.agent.follow_path(plan['path'], service):
+            return {'event': 'unreachable', 'service': service, 'requests': request_ids}
+        self.agent.services_to_serve.append(service)
+        self.agent.deliver_medications(service)
+
+        return {
+            'event': 'delivered',
+            'service': service,
+            'requests': request_ids,
+            'from': start,
+            'path': self.agent.route[route_start:],
+            'distance': self.agent.total_distance - distance_before,
+            'total_distance': self.agent.total_distance,
+            'pending': len(self.stops)
+        }
+
+
+    def return_to_depot(self):
+        if self.agent.current_position == self.depot:
+            return None
+        start = self.agent.current_position
+        plan = self.agent.plan_route(self.depot, self.algorithm)
+        if plan is None:
+            return None
+        route_start = len(self.agent.route) - 1
+        self.agent.follow_path(plan['path'], self.depot)
+        return {
+            'event': 'returned',
+            'service': self.depot,
+            'from': start,
+            'path': self.agent.route[route_start:],
+            'total_distance': self.agent.total_distance
+        }
+
+
+def process_stream(requests, output, planner=None, steps_per_request=1):
+    """
+    Feed requests (any iterable) through a StreamingPlanner, advancing the
+    agent steps_per_request stops after each arrival, then drain the rest.
+    Each event is written to output as one JSON line.
+    Returns the number of deliveries.
+    """
+    planner = planner if planner is not None else StreamingPlanner()
+    deliveries = 0
+
+    def emit(event):
+        output.write(json.dumps(event) + "\n")
+        planner.forget_history()
+
+    for request in requests:
+        rejected = planner.add_request(request)
+        if rejected:
+            emit({'event': 'rejected', 'request': request['id'], 'services': rejected})
+        for _ in range(steps_per_request):
+            event = planner.step()
+            if event is None:
+                break
+            deliveries += event['event'] == 'delivered'
+            emit(event)
+
+    while planner.stops:
+        event = planner.step()
+        deliveries += event['event'] == 'delivered'
+        emit(event)
+
+    event = planner.return_to_depot()
+    if event is not None:
+        emit(event)
+    return deliveries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream delivery requests from JSONL")
+    parser.add_argument('input', nargs='?', default='-', help="JSONL file ('-' = stdin)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL output file ('-' = stdout)")
+    parser.add_argument('-a', '--algorithm', default='ucs')
+    parser.add_argument('--steps', type=int, default=1, help="stops travelled per incoming request")
+    args = parser.parse_args(argv)
+
+    # Keep stdout clean for the JSONL stream, diagnostics go to stderr
+    for handler in logger.handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(sys.stderr)
+
+    planner = StreamingPlanner(algorithm=args.algorithm)
+    requests = read_requests(args.input)
+
+    if args.output == '-':
+        process_stream(requests, sys.stdout, planner, args.steps)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            process_stream(requests, out, planner, args.steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+# ============================================
+# DELIVERY SCHEDULER
+# ============================================
+# Capacitated vehicle routing with time windows and priorities for one
+# medication cart:
+# - every order has a service, a number of items, a priority and an
+#   optional time window (ready / deadline, minutes since the start)
+# - the cart carries at most `capacity` items, so the plan is a sequence
+#   of trips that each start and end at Pharmacy (restocking in between)
+# - construction: priority-first cheapest insertion
+# - improvement: relocate / swap / 2-opt local search within a time budget
+# Lateness is penalised by priority instead of forbidden, so an
+# overloaded shift still gets a plan (and a report of what will be late).
+
+import time
+
+from algorithms import SearchAlgorithms
+from tour_planner import TourPlanner
+
+INFINITY = float('inf')
+
+# Default priority per service (higher = more urgent), used when an
+# order does not set one
+DEFAULT_PRIORITIES = {'Emergency': 3, 'ICU': 3, 'Surgery': 2}
+
+
+def normalize_orders(orders):
+    """
+    Accept service names or dicts and return order dicts with
+    id, service, items, priority, ready and deadline filled in
+    """
+    normalized = []
+    for number, order in enumerate(orders, 1):
+        if isinstance(order, str):
+            order = {'service': order}
+        service = order['service']
+        normalized.append({
+            'id': order.get('id', number),
+            'service': service,
+            'items': order.get('items', 1),
+            'priority': order.get('priority', DEFAULT_PRIORITIES.get(service, 1)),
+            'ready': order.get('ready', 0),
+            'deadline': order.get('deadline')
+        })
+    return normalized
+
+
+class DeliveryScheduler:
+    """
+    Multi-trip schedule for one cart.
+
+    capacity: items per trip
+    speed: distance units per minute
+    service_time: minutes spent at each delivery stop
+    restock_time: minutes spent at the depot between trips
+    lateness_weight: cost of one minute of lateness (times the priority)
+    relative to one unit of distance
+    """
+
+    def __init__(self, graph, capacity=4, depot='Pharmacy', speed=1.0, service_time=1.0,
+                 restock_time=5.0, lateness_weight=100.0, search=None):
+        self.graph = graph
+        self.capacity = capacity
+        self.depot = depot
+        self.speed = speed
+        self.service_time = service_time
+        self.restock_time = restock_time
+        self.lateness_weight = lateness_weight
+        self.search = search if search is not None else SearchAlgorithms(graph, cache_size=4096, verbose=False)
+        self.tour_planner = TourPlanner(graph, search=self.search)
+        self.orders = []
+        self.matrix = {}
+        self.evaluations = 0
+
+
+    def distance(self, service1, service2):
+        if service1 == service2:
+            return 0
+        d = self.matrix.get(service1, {}).get(service2)
+        return INFINITY if d is None else d
+
+
+    # ----------------------------------------
+    # Evaluation
+    # ----------------------------------------
+
+    def simulate_trip(self, trip, start):
+        """(end time, distance, weighted lateness) of one depot -> trip -> depot run"""
+        return self._simulate(trip, start)[:3]
+
+
+    def _simulate(self, trip, start):
+        """simulate_trip plus the summed priority of the trip's late orders"""
+        orders = self.orders
+        clock = start
+        distance = 0
+        penalty = 0
+        late_priority = 0
+        position = self.depot
+
+        for i in trip:
+            order = orders[i]
+            leg = self.distance(position, order['service'])
+            distance += leg
+            clock += leg / self.speed
+            if clock < order['ready']:
+                clock = order['ready']
+            deadline = order['deadline']
+            if deadline is not None and clock > deadline:
+                penalty += (clock - deadline) * order['priority']
+                late_priority += order['priority']
+            clock += self.service_time
+            position = order['service']
+
+        leg = self.distance(position, self.depot)
+        return clock + leg / self.speed, distance + leg, penalty, late_priority
+
+
+    def plan_cost(self, trips, start=0):
+        """Total distance + lateness_weight * priority-weighted lateness"""
+        self.evaluations += 1
+        clock = start
+        total = 0
+        for k, trip in enumerate(trips):
+            if k:
+                clock += self.restock_time
+            clock, distance, penalty = self.simulate_trip(trip, clock)
+            total += distance + self.lateness_weight * penalty
+        return total
+
+
+    def load(self, trip):
+        orders = self.orders
+        return sum(orders[i]['items'] for i in trip)
+
+
+    # ----------------------------------------
+    # Construction and improvement
+    # ----------------------------------------
+
+    def insert_all(self, order_ids, start=0, deadline=None):
+        """
+        Cheapest insertion, most urgent orders first (priority, then deadline).
+
+        A candidate position is priced within the trip it changes: that
+        trip is re-simulated from its cached start, and the trips after it
+        are charged the delay for each order that is already late there
+        (the local search afterwards uses the exact plan cost). Once
+        deadline (a time.perf_counter() value) has passed, the remaining
+        orders are simply appended to the last trip or a new one.
+        """
+        orders = self.orders
+        weight = self.lateness_weight
+        queue = sorted(order_ids, key=lambda i: (
+            -orders[i]['priority'],
+            INFINITY if orders[i]['deadline'] is None else orders[i]['deadline'],
+            orders[i]['ready']))
+        trips = []
+        loads = []
+        states = []       # per trip: (start, end, distance, penalty, late priority)
+
+        for number, i in enumerate(queue):
+            items = orders[i]['items']
+            if deadline is not None and time.perf_counter() > deadline:
+                for rest in queue[number:]:
+                    items = orders[rest]['items']
+                    if trips and loads[-1] + items <= self.capacity:
+                        trips[-1].append(rest)
+                        loads[-1] += items
+                    else:
+                        trips.append([rest])
+                        loads.append(items)
+                break
+
+            # Priority of late orders in the trips after each trip
+            late_after = [0] * (len(trips) + 1)
+            for k in range(len(trips) - 1, -1, -1):
+                late_after[k] = late_after[k + 1] + states[k][4]
+
+            best_cost = INFINITY
+            best = None
+            for k, trip in enumerate(trips):
+                if loads[k] + items > self.capacity:
+                    continue
+                trip_start, end, distance, penalty, _ = states[k]
+                for position in range(len(trip) + 1):
+                    trip.insert(position, i)
+                    new_end, new_distance, new_penalty, _ = self._simulate(trip, trip_start)
+                    del trip[position]
+                    self.evaluations += 1
+                    cost = (new_distance - distance + weight * (new_penalty - penalty)
+                            + weight * (new_end - end) * late_after[k + 1])
+                    if cost < best_cost:
+                        best_cost, best = cost, (k, position)
+            # A new trip, at any point of the trip sequence
+            for k in range(len(trips) + 1):
+                trip_start = start if k == 0 else states[k - 1][1] + self.restock_time
+                end, distance, penalty, _ = self._simulate([i], trip_start)
+                self.evaluations += 1
+                cost = distance + weight * penalty
+                if k < len(trips):
+                    cost += weight * (end + self.restock_time - states[k][0]) * late_after[k]
+                if cost < best_cost:
+                    best_cost, best = cost, (k, None)
+
+            k, position = best
+            if position is None:
+                trips.insert(k, [i])
+                loads.insert(k, items)
+                states.insert(k, None)
+            else:
+                trips[k].insert(position, i)
+                loads[k] += items
+            # Trips from k on start later now
+            clock = start if k == 0 else states[k - 1][1] + self.restock_time
+            for j in range(k, len(trips)):
+                if j > k:
+                    clock += self.restock_time
+                states[j] = (clock,) + self._simulate(trips[j], clock)
+                clock = states[j][1]
+
+        return trips
+
+
+    def improve(self, trips, start=0, time_budget=0.5):
+        """
+        First-improvement local search (relocate, swap, 2-opt within a
+        trip) until no move helps or time_budget seconds have passed
+        """
+        deadline = time.perf_counter() + time_budget
+        best_cost = self.plan_cost(trips, start)
+        improved = True
+
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for move in (self._relocate, self._swap, self._two_opt):
+                cost = move(trips, start, best_cost, deadline)
+                if cost < best_cost:
+                    best_cost = cost
+                    improved = True
+            trips[:] = [trip for trip in trips if trip]
+
+        return trips
+
+
+    def _relocate(self, trips, start, best_cost, deadline):
+        """Move one order to its best other position (possibly a new trip)"""
+        for k in range(len(trips)):
+            for position in range(len(trips[k])):
+                if time.perf_counter() > deadline:
+                    return best_cost
+                if position >= len(trips[k]):
+                    break
+                i = trips[k].pop(position)
+                items = self.orders[i]['items']
+                best = None
+                for k2 in range(len(trips)):
+                    if k2 != k and self.load(trips[k2]) + items > self.capacity:
+                        continue
+                    for p2 in range(len(trips[k2]) + 1):
+                        if (k2, p2) == (k, position):
+                            continue
+                        trips[k2].insert(p2, i)
+                        cost = self.plan_cost(trips, start)
+                        del trips[k2][p2]
+                        if cost < best_cost:
+                            best_cost, best = cost, (k2, p2)
+                trips.append([i])
+                cost = self.plan_cost(trips, start)
+                trips.pop()
+                if cost < best_cost:
+                    best_cost, best = cost, (len(trips), None)
+
+                if best is None:
+                    trips[k].insert(position, i)
+                elif best[1] is None:
+                    trips.append([i])
+                else:
+                    trips[best[0]].insert(best[1], i)
+        return best_cost
+
+
+    def _swap(self, trips, start, best_cost, deadline):
+        """Exchange two orders of different trips (capacity permitting)"""
+        orders = self.orders
+        for k in range(len(trips)):
+            for k2 in range(k + 1, len(trips)):
+                if time.perf_counter() > deadline:
+                    return best_cost
+                for p in range(len(trips[k])):
+                    for p2 in range(len(trips[k2])):
+                        a, b = trips[k][p], trips[k2][p2]
+                        shift = orders[b]['items'] - orders[a]['items']
+                        if (self.load(trips[k]) + shift > self.capacity
+                                or self.load(trips[k2]) - shift > self.capacity):
+                            continue
+                        trips[k][p], trips[k2][p2] = b, a
+                        cost = self.plan_cost(trips, start)
+                        if cost < best_cost:
+                            best_cost = cost
+                        else:
+                            trips[k][p], trips[k2][p2] = a, b
+        return best_cost
+
+
+    def _two_opt(self, trips, start, best_cost, deadline):
+        """Reverse a segment of a trip"""
+        for trip in trips:
+            for i in range(len(trip) - 1):
+                if time.perf_counter() > deadline:
+                    return best_cost
+                for j in range(i + 1, len(trip)):
+                    trip[i:j + 1] = reversed(trip[i:j + 1])
+                    cost = self.plan_cost(trips, start)
+                    if cost < best_cost:
+                        best_cost = cost
+                    else:
+                        trip[i:j + 1] = reversed(trip[i:j + 1])
+        return best_cost
+
+
+    # ----------------------------------------
+    # Entry point
+    # ----------------------------------------
+
+    def schedule(self, orders, start=0, time_budget=0.5):
+        """
+        Plan deliveries for orders (service names or dicts with id,
+        service, items, priority, ready, deadline).
+
+        Returns a plan dict: trips (stops with arrival times and lateness,
+        load, start, end, distance, route), unreachable orders, distance,
+        late / on_time counts, makespan and orders_per_hour.
+        """
+        began = time.perf_counter()
+        self.evaluations = 0
+        self.orders = normalize_orders(orders)
+        services = [self.depot] + [o['service'] for o in self.orders]
+        self.matrix = self.tour_planner.distance_matrix(services)
+
+        unreachable = []
+        servable = []
+        for i, order in enumerate(self.orders):
+            if order['items'] > self.capacity or (
+                    self.distance(self.depot, order['service']) == INFINITY):
+                unreachable.append(order)
+            else:
+                servable.append(i)
+
+        trips = self.insert_all(servable, start, began + time_budget)
+        remaining = time_budget - (time.perf_counter() - began)
+        if remaining > 0:
+            trips = self.improve(trips, start, remaining)
+
+        plan = self.describe(trips, start)
+        plan['unreachable'] = unreachable
+        plan['evaluations'] = self.evaluations
+        plan['planning_time'] = time.perf_counter() - began
+        return plan
+
+
+    def describe(self, trips, start=0):
+        """Expand trip index lists into the reported plan"""
+        clock = start
+        plan_trips = []
+        late = 0
+        total_distance = 0
+
+        for k, trip in enumerate(trips):
+            if k:
+                clock += self.restock_time
+            trip_start = clock
+            position = self.depot
+            route = [self.depot]
+            stops = []
+            for i in trip:
+                order = self.orders[i]
+                clock += self.distance(position, order['service']) / self.speed
+                clock = max(clock, order['ready'])
+                lateness = 0
+                if order['deadline'] is not None and clock > order['deadline']:
+                    lateness = clock - order['deadline']
+                    late += 1
+                stops.append(dict(order, arrival=clock, lateness=lateness))
+                route.extend(self._leg(position, order['service']))
+                clock += self.service_time
+                position = order['service']
+            clock += self.distance(position, self.depot) / self.speed
+            route.extend(self._leg(position, self.depot))
+
+            _, distance, _ = self.simulate_trip(trip, trip_start)
+            total_distance += distance
+            plan_trips.append({
+                'stops': stops,
+                'load': self.load(trip),
+                'start': trip_start,
+                'end': clock,
+                'distance': distance,
+                'route': route
+            })
+
+        delivered = sum(len(trip) for trip in trips)
+        makespan = clock - start
+        return {
+            'trips': plan_trips,
+            'distance': total_distance,
+            'cost': self.plan_cost(trips, start),
+            'late': late,
+            'on_time': delivered - late,
+            'makespan': makespan,
+            'orders_per_hour': 60 * delivered / makespan if makespan else 0.0
+        }
+
+
+    def _leg(self, service1, service2):
+        """Corridor sequence service1 -> service2 without service1"""
+        if service1 == service2:
+            return []
+        result = self.search.ucs(service1, service2)
+        return result['path'][1:] if result else []
+
+
+if __name__ == "__main__":
+    from hospital_graph import HospitalGraph
+
+    scheduler = DeliveryScheduler(HospitalGraph(), capacity=3)
+    plan = scheduler.schedule([
+        {'id': 'e1', 'service': 'Emergency', 'deadline': 10},
+        {'id': 'i1', 'service': 'ICU', 'items': 2, 'deadline': 15},
+        {'id': 'l1', 'service': 'Laboratory', 'ready': 20},
+        {'id': 'c1', 'service': 'Cardiology'},
+        {'id': 'p1', 'service': 'Pediatrics', 'deadline': 40},
+        'Radiology'
+    ])
+
+    for number, trip in enumerate(plan['trips'], 1):
+        stops = ', '.join(f"{s['id']}@{s['service']} t={s['arrival']:.0f}"
+                          + (f" (late {s['lateness']:.0f})" if s['lateness'] else '')
+                          for s in trip['stops'])
+        print(f"Trip {number} [load {trip['load']}]: {stops}")
+        print(f"  route: {' -> '.join(trip['route'])}")
+    print(f"Distance: {plan['distance']}, on time: {plan['on_time']}, late: {plan['late']}, "
+          f"makespan: {plan['makespan']:.0f} min, {plan['orders_per_hour']:.1f} orders/h")
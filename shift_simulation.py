@@ -0,0 +1,284 @@
+# ============================================
+# DISCRETE-EVENT SHIFT SIMULATION
+# ============================================
+# Load testing for capacity planning: a simulated clock driven by an
+# event heap (no sleeping, no input()), so a 24h multi-agent shift runs
+# in seconds of wall time.
+# - requests arrive per service as Poisson processes
+# - idle agents at the depot take the oldest pending requests (up to
+#   their capacity), order them with the TourPlanner and travel corridor
+#   by corridor with DistributionAgent.move, each move taking
+#   distance / speed simulated minutes
+# - report: queueing delay, delivery latency (mean / p50 / p95 / p99),
+#   agent utilization and throughput
+#
+# Example:
+#   python shift_simulation.py --agents 3 --rate 2 --hours 24
+
+import argparse
+from collections import deque
+import heapq
+from itertools import count
+import random
+import time
+
+from benchmark import percentile
+from distribution_agent import DistributionAgent
+from hospital_graph import HospitalGraph
+
+
+def summarize(values):
+    """mean / p50 / p95 / p99 / max of a list of durations (minutes)"""
+    values = sorted(values)
+    if not values:
+        return {'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+    return {
+        'mean': sum(values) / len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': values[-1]
+    }
+
+
+class ShiftSimulator:
+    """
+    graph: HospitalGraph shared by every agent
+    rates: {service: requests per hour}; default `rate` for every
+    service except the depot
+    duration: minutes during which requests arrive
+    speed: distance units travelled per simulated minute
+    service_time: minutes per delivery stop
+    capacity: requests an agent takes per trip
+    """
+
+    def __init__(self, graph=None, num_agents=3, rates=None, rate=1.0, duration=1440,
+                 speed=1.0, service_time=1.0, capacity=4, algorithm='ucs',
+                 depot='Pharmacy', tour='auto', seed=0):
+        self.graph = graph if graph is not None else HospitalGraph()
+        self.num_agents = num_agents
+        self.rates = rates if rates is not None else {
+            service: rate for service in self.graph.services if service != depot}
+        self.duration = duration
+        self.speed = speed
+        self.service_time = service_time
+        self.capacity = capacity
+        self.algorithm = algorithm
+        self.depot = depot
+        self.tour = tour
+        self.seed = seed
+
+
+    def _schedule(self, when, kind, data=None):
+        heapq.heappush(self.events, (when, next(self.sequence), kind, data))
+
+
+    def run(self):
+        """Simulate the shift (then drain pending work) and return the report"""
+        started = time.perf_counter()
+        self.rng = random.Random(self.seed)
+        self.events = []
+        self.sequence = count()
+        self.pending = deque()
+        self.requests = []
+        self.unreachable = []
+        self.agents = []
+        self.idle = []
+        processed = 0
+
+        for index in range(self.num_agents):
+            agent = DistributionAgent(self.graph, verbose=False)
+            agent.reset_mission(self.depot)
+            self.agents.append({'index': index, 'agent': agent, 'busy': 0.0, 'trips': 0,
+                                'since': None, 'stops': deque(), 'path': deque(), 'waiting': {}})
+            self.idle.append(index)
+
+        for service, per_hour in self.rates.items():
+            if per_hour > 0:
+                self._next_arrival(service, 0.0)
+
+        now = 0.0
+        while self.events:
+            now, _, kind, data = heapq.heappop(self.events)
+            processed += 1
+            if kind == 'request':
+                self._on_request(now, data)
+            elif kind == 'move':
+                self._on_move(now, data)
+            elif kind == 'served':
+                self._next_leg(now, self.agents[data])
+
+        return self._report(max(now, self.duration), processed, time.perf_counter() - started)
+
+
+    # ----------------------------------------
+    # Event handlers
+    # ----------------------------------------
+
+    def _next_arrival(self, service, now):
+        when = now + self.rng.expovariate(self.rates[service] / 60)
+        if when < self.duration:
+            self._schedule(when, 'request', service)
+
+
+    def _on_request(self, now, service):
+        request = {'id': len(self.requests) + 1, 'service': service, 'arrival': now,
+                   'dispatched': None, 'delivered': None}
+        self.requests.append(request)
+        self.pending.append(request)
+        self._next_arrival(service, now)
+        self._dispatch(now)
+
+
+    def _dispatch(self, now):
+        """Give idle agents the oldest pending requests"""
+        while self.pending and self.idle:
+            state = self.agents[self.idle.pop()]
+            batch = [self.pending.popleft() for _ in range(min(self.capacity, len(self.pending)))]
+
+            waiting = {}
+            for request in batch:
+                request['dispatched'] = now
+                waiting.setdefault(request['service'], []).append(request)
+            services = list(waiting)
+
+            agent = state['agent']
+            agent.perceive_requests(services)
+            if self.tour is not None and len(services) > 1:
+                services = agent.plan_tour(services, self.tour)
+
+            state['waiting'] = waiting
+            state['stops'] = deque(services + [self.depot])
+            state['since'] = now
+            state['trips'] += 1
+            self._next_leg(now, state)
+
+
+    def _next_leg(self, now, state):
+        """Plan the route to the next stop, or finish the trip at the depot"""
+        agent = state['agent']
+        while state['stops']:
+            goal = state['stops'][0]
+            if agent.current_position == goal:
+                self._arrived(now, state)
+                return
+            plan = agent.plan_route(goal, self.algorithm)
+            if plan is not None:
+                state['path'] = deque(plan['path'][1:])
+                self._step(now, state)
+                return
+            state['stops'].popleft()
+            self.unreachable.extend(state['waiting'].pop(goal, ()))
+
+        # Trip over (back at the depot or nothing reachable left)
+        for requests in state['waiting'].values():
+            self.unreachable.extend(requests)
+        state['waiting'] = {}
+        state['busy'] += now - state['since']
+        state['since'] = None
+        self.idle.append(state['index'])
+        self._dispatch(now)
+
+
+    def _step(self, now, state):
+        """Schedule the next corridor move, replanning if it has been closed"""
+        agent = state['agent']
+        if not state['path']:
+            self._arrived(now, state)
+            return
+        distance = self.graph.get_distance(agent.current_position, state['path'][0])
+        if distance is None:
+            self._next_leg(now, state)
+            return
+        self._schedule(now + distance / self.speed, 'move', state['index'])
+
+
+    def _on_move(self, now, index):
+        state = self.agents[index]
+        state['agent'].move(state['path'].popleft())
+        self._step(now, state)
+
+
+    def _arrived(self, now, state):
+        goal = state['stops'].popleft()
+        requests = state['waiting'].pop(goal, None)
+        if not requests:
+            self._next_leg(now, state)
+            return
+        state['agent'].deliver_medications(goal)
+        for request in requests:
+            request['delivered'] = now + self.service_time
+        self._schedule(now + self.service_time, 'served', state['index'])
+
+
+    # ----------------------------------------
+    # Report
+    # ----------------------------------------
+
+    def _report(self, span, events, wall_time):
+        delivered = [r for r in self.requests if r['delivered'] is not None]
+        dispatched = [r for r in self.requests if r['dispatched'] is not None]
+        utilization = [
+            (state['busy'] + (span - state['since'] if state['since'] is not None else 0)) / span
+            for state in self.agents
+        ]
+
+        return {
+            'agents': self.num_agents,
+            'duration': self.duration,
+            'simulated_time': span,
+            'requests': len(self.requests),
+            'delivered': len(delivered),
+            'unreachable': len(self.unreachable),
+            'pending': len(self.requests) - len(delivered) - len(self.unreachable),
+            'queueing_delay': summarize([r['dispatched'] - r['arrival'] for r in dispatched]),
+            'latency': summarize([r['delivered'] - r['arrival'] for r in delivered]),
+            'utilization': utilization,
+            'mean_utilization': sum(utilization) / len(utilization) if utilization else 0.0,
+            'trips': [state['trips'] for state in self.agents],
+            'distance': [state['agent'].total_distance for state in self.agents],
+            'throughput_per_hour': 60 * len(delivered) / span if span else 0.0,
+            'events': events,
+            'wall_time': wall_time
+        }
+
+
+def display_report(report):
+    print("\n" + "="*70)
+    print(f"SHIFT SIMULATION - {report['agents']} agents, "
+          f"{report['duration'] / 60:.1f} h of arrivals")
+    print("="*70)
+    print(f"Requests: {report['requests']}, delivered: {report['delivered']}, "
+          f"unreachable: {report['unreachable']}, pending: {report['pending']}")
+    for name in ('queueing_delay', 'latency'):
+        s = report[name]
+        if s['mean'] is not None:
+            print(f"{name.replace('_', ' ').capitalize():<16} mean {s['mean']:7.1f}  p50 {s['p50']:7.1f}  "
+                  f"p95 {s['p95']:7.1f}  p99 {s['p99']:7.1f}  max {s['max']:7.1f} min")
+    print("Utilization:     " + ', '.join(f"{u:.0%}" for u in report['utilization'])
+          + f" (mean {report['mean_utilization']:.0%})")
+    print(f"Throughput:      {report['throughput_per_hour']:.1f} deliveries/h")
+    print(f"Simulated {report['simulated_time'] / 60:.1f} h ({report['events']} events) "
+          f"in {report['wall_time']:.2f} s")
+    print("="*70)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Discrete-event simulation of a delivery shift")
+    parser.add_argument('--agents', type=int, default=3)
+    parser.add_argument('--rate', type=float, default=1.0, help="requests per hour per service")
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--capacity', type=int, default=4)
+    parser.add_argument('--speed', type=float, default=1.0, help="distance units per minute")
+    parser.add_argument('--algorithm', default='ucs')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    simulator = ShiftSimulator(num_agents=args.agents, rate=args.rate, duration=args.hours * 60,
+                               speed=args.speed, capacity=args.capacity,
+                               algorithm=args.algorithm, seed=args.seed)
+    display_report(simulator.run())
+
+
+if __name__ == "__main__":
+    main()
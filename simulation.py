@@ -17,12 +17,17 @@ def full_comparison():
     
     services = ['Surgery', 'Laboratory', 'Cardiology']
     
-    algorithms = ['bfs', 'dfs', 'ucs', 'astar']
+    algorithms = ['bfs', 'dfs', 'ucs', 'astar', 'bi_ucs', 'bi_astar', 'ch', 'hpa', 'table']
     algorithm_names = {
         'bfs': 'BFS (Breadth-First Search)',
         'dfs': 'DFS (Depth-First Search)',
         'ucs': 'UCS (Uniform Cost Search)',
-        'astar': 'A* (A-Star)'
+        'astar': 'A* (A-Star)',
+        'bi_ucs': 'Bidirectional UCS',
+        'bi_astar': 'Bidirectional A*',
+        'ch': 'Contraction Hierarchy',
+        'hpa': 'Hierarchical (HPA*)',
+        'table': 'Precomputed shortest-path table'
     }
     
     results = {}
@@ -36,9 +41,9 @@ def full_comparison():
         
         agent = DistributionAgent()
         
-        start = time.time()
+        start = time.perf_counter()
         agent.execute_mission(services.copy(), algorithm=algo)
-        end = time.time()
+        end = time.perf_counter()
         
         results[algo] = {
             'distance': agent.total_distance,
@@ -0,0 +1,363 @@
+# ============================================
+# GRAPH SNAPSHOTS
+# ============================================
+# Binary on-disk form of a compiled graph and its precomputed tables
+# (all-pairs distances / next hops, ALT landmark tables, contraction
+# hierarchy). Loading maps the file with mmap and exposes every array as
+# a memoryview cast to its element type, so nothing is parsed or copied:
+# processes opening the same snapshot share the page cache, and start-up
+# costs only the service-name decoding.
+#
+# Layout (native byte order, recorded in the header):
+#   MAGIC | u64 header offset | 8-byte aligned sections ... | JSON header
+#
+# Example:
+#   save_snapshot(hospital, 'hospital.snap', hierarchy=True)
+#   graph = load_snapshot('hospital.snap')     # a CompactGraph
+#   agent = DistributionAgent(graph, verbose=False)
+
+from array import array
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+
+from algorithms import SearchAlgorithms
+from compact_graph import CompactGraph
+from contraction_hierarchy import ContractionHierarchy
+from heuristics import GoalHeuristic, LandmarkHeuristic
+
+MAGIC = b'HGSNAP01'
+# Largest graph that gets an all-pairs table by default (n^2 entries)
+TABLE_LIMIT = 2000
+
+
+# ----------------------------------------
+# Writing
+# ----------------------------------------
+
+class _Writer:
+    """Appends 8-byte aligned typed sections and records where they are"""
+
+    def __init__(self, f):
+        self.f = f
+        self.sections = {}
+
+    def begin(self, name, count, typecode):
+        self.f.write(bytes(-self.f.tell() % 8))
+        self.sections[name] = [self.f.tell(), count, typecode]
+
+    def write(self, name, values, typecode):
+        values = values if isinstance(values, array) and values.typecode == typecode \
+            else array(typecode, values)
+        self.begin(name, len(values), typecode)
+        values.tofile(self.f)
+
+
+def _missing(typecode):
+    """Stored value for 'unreachable' (distances are never negative)"""
+    return -1 if typecode == 'q' else math.inf
+
+
+def save_snapshot(graph, path, table=None, landmarks=4, hierarchy=False):
+    """
+    Write graph (HospitalGraph) and its derived tables to path.
+
+    table: store the all-pairs distance / next-hop table
+    (None = only when the graph has at most TABLE_LIMIT services)
+    landmarks: number of ALT landmarks to precompute (0 = none), or an
+    existing LandmarkHeuristic
+    hierarchy: True to build a contraction hierarchy, or an existing one
+    """
+    compact = graph.compile() if hasattr(graph, 'compile') else CompactGraph.from_graph(graph)
+    names, ids, n = compact.names, compact.ids, len(compact)
+    weight_type = 'd' if compact.weights.typecode == 'd' else 'q'
+    meta = {'nodes': n, 'version': compact.version, 'byteorder': sys.byteorder,
+            'weights': weight_type}
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(bytes(8))               # header offset, filled in at the end
+        out = _Writer(f)
+
+        out.write('names', '\0'.join(names).encode('utf-8'), 'B')
+        out.write('offsets', compact.offsets, 'q')
+        out.write('targets', compact.targets, 'q')
+        out.write('weights', compact.weights, weight_type)
+
+        coordinates = getattr(graph, 'coordinates', None)
+        if coordinates and all(name in coordinates for name in names):
+            dims = len(coordinates[names[0]])
+            meta['coordinate_dims'] = dims
+            out.write('coordinates', (float(c) for name in names for c in coordinates[name]), 'd')
+
+        if table is None:
+            table = hasattr(graph, 'get_path_table') and n <= TABLE_LIMIT
+        if table:
+            _write_path_table(out, graph, names, ids, weight_type)
+
+        if landmarks:
+            if not isinstance(landmarks, LandmarkHeuristic):
+                landmarks = LandmarkHeuristic(graph, landmarks)
+            landmarks.refresh()
+            out.write('landmarks', (ids[l] for l in landmarks.landmarks), 'q')
+            missing = _missing(weight_type)
+            out.write('landmark_tables',
+                      (t.get(name, missing) for t in landmarks.tables for name in names), weight_type)
+
+        if hierarchy:
+            if not isinstance(hierarchy, ContractionHierarchy):
+                hierarchy = ContractionHierarchy(graph)
+            _write_hierarchy(out, hierarchy, names, ids, weight_type)
+
+        meta['sections'] = out.sections
+        header_offset = f.tell()
+        f.write(json.dumps(meta).encode('utf-8'))
+        f.seek(len(MAGIC))
+        f.write(struct.pack('<Q', header_offset))
+
+
+def _write_path_table(out, graph, names, ids, typecode):
+    distances, next_hop = graph.get_path_table()
+    n = len(names)
+    missing = _missing(typecode)
+
+    # Row by row, so the n x n table is never held in memory twice
+    out.begin('distances', n * n, typecode)
+    for name in names:
+        row = array(typecode, [missing]) * n
+        for target, d in distances.get(name, {}).items():
+            row[ids[target]] = d
+        row.tofile(out.f)
+
+    out.begin('next_hop', n * n, 'q')
+    for name in names:
+        row = array('q', [-1]) * n
+        for target, hop in next_hop.get(name, {}).items():
+            row[ids[target]] = ids[hop]
+        row.tofile(out.f)
+
+
+def _write_hierarchy(out, hierarchy, names, ids, typecode):
+    """Upward graph as CSR plus, per arc, the bypassed service (-1 = real corridor)"""
+    offsets = array('q', [0])
+    targets = array('q')
+    weights = array(typecode)
+    middle = array('q')
+    for name in names:
+        for v, w in hierarchy.upward.get(name, {}).items():
+            targets.append(ids[v])
+            weights.append(w)
+            via = hierarchy.middle.get((name, v))
+            middle.append(-1 if via is None else ids[via])
+        offsets.append(len(targets))
+
+    out.write('ch_rank', (hierarchy.rank.get(name, -1) for name in names), 'q')
+    out.write('ch_offsets', offsets, 'q')
+    out.write('ch_targets', targets, 'q')
+    out.write('ch_weights', weights, typecode)
+    out.write('ch_middle', middle, 'q')
+
+
+# ----------------------------------------
+# Loading
+# ----------------------------------------
+
+class SnapshotLandmarks:
+    """ALT estimates read straight from the mapped landmark tables"""
+
+    def __init__(self, graph, landmarks, tables, missing):
+        self.graph = graph
+        self.landmarks = [graph.names[i] for i in landmarks]
+        self.tables = tables          # landmark-major, len(landmarks) * n
+        self.missing = missing
+        self._goals = {}
+
+    def refresh(self):
+        """Snapshots are immutable: nothing to recompute"""
+
+    def estimate(self, state, goal):
+        ids = self.graph.ids
+        i = ids.get(state)
+        j = ids.get(goal)
+        if i is None or j is None:
+            return 0
+        n = len(self.graph)
+        tables, missing = self.tables, self.missing
+        best = 0
+        for base in range(0, len(tables), n):
+            d_state = tables[base + i]
+            d_goal = tables[base + j]
+            if d_state != missing and d_goal != missing:
+                diff = abs(d_goal - d_state)
+                if diff > best:
+                    best = diff
+        return best
+
+    def for_goal(self, goal):
+        heuristic = self._goals.get(goal)
+        if heuristic is None:
+            heuristic = self._goals[goal] = GoalHeuristic(self, goal)
+        return heuristic
+
+
+class SnapshotGraph(CompactGraph):
+    """
+    Read-only CompactGraph backed by a memory-mapped snapshot file.
+
+    Besides the CompactGraph interface it offers shortest_distance /
+    shortest_path (table lookups when the snapshot has a table),
+    landmark_heuristic, hierarchy and coordinates when they were saved.
+    Pickling only sends the path, so worker processes re-map the file.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        self._views = []
+
+        if bytes(self._buffer[:len(MAGIC)]) != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a graph snapshot")
+        header_offset, = struct.unpack_from('<Q', self._buffer, len(MAGIC))
+        self.meta = json.loads(bytes(self._buffer[header_offset:]).decode('utf-8'))
+        if self.meta['byteorder'] != sys.byteorder:
+            self.close()
+            raise ValueError(f"{self.path} was written on a {self.meta['byteorder']}-endian machine")
+        self.sections = self.meta['sections']
+
+        names = bytes(self._view('names')).decode('utf-8').split('\0') if self.meta['nodes'] else []
+        super().__init__(names, self._view('offsets'), self._view('targets'),
+                         self._view('weights'), self.meta['version'])
+
+        self.missing = _missing(self.meta['weights'])
+        self.distances = self._view('distances')
+        self.next_hop = self._view('next_hop')
+
+        self.coordinates = None
+        dims = self.meta.get('coordinate_dims')
+        if dims:
+            flat = self._view('coordinates')
+            self.coordinates = {name: tuple(flat[i * dims:(i + 1) * dims])
+                                for i, name in enumerate(names)}
+
+        self.landmark_heuristic = None
+        if 'landmarks' in self.sections:
+            self.landmark_heuristic = SnapshotLandmarks(
+                self, self._view('landmarks'), self._view('landmark_tables'), self.missing)
+
+        self._hierarchy = None
+
+    def _view(self, name):
+        """Zero-copy typed view of a section (None if it was not saved)"""
+        if name not in self.sections:
+            return None
+        offset, count, typecode = self.sections[name]
+        size = array(typecode).itemsize
+        view = self._buffer[offset:offset + count * size].cast(typecode)
+        self._views.append(view)
+        return view
+
+    @property
+    def hierarchy(self):
+        """ContractionHierarchy rebuilt from the saved arrays (no contraction)"""
+        if self._hierarchy is None and 'ch_rank' in self.sections:
+            names = self.names
+            rank_view = self._view('ch_rank')
+            offsets = self._view('ch_offsets')
+            targets = self._view('ch_targets')
+            weights = self._view('ch_weights')
+            middle_view = self._view('ch_middle')
+
+            rank = {}
+            upward = {}
+            middle = {}
+            for i, name in enumerate(names):
+                if rank_view[i] < 0:
+                    continue
+                rank[name] = rank_view[i]
+                arcs = upward[name] = {}
+                for k in range(offsets[i], offsets[i + 1]):
+                    v = names[targets[k]]
+                    arcs[v] = weights[k]
+                    if middle_view[k] >= 0:
+                        middle[(name, v)] = middle[(v, name)] = names[middle_view[k]]
+            self._hierarchy = ContractionHierarchy.restore(self, rank, upward, middle)
+        return self._hierarchy
+
+    def shortest_distance(self, service1, service2):
+        """Same contract as HospitalGraph.shortest_distance"""
+        if self.distances is None:
+            result = SearchAlgorithms(self, verbose=False).ucs(service1, service2)
+            return result['cost'] if result else None
+        i = self.ids.get(service1)
+        j = self.ids.get(service2)
+        if i is None or j is None:
+            return None
+        d = self.distances[i * len(self) + j]
+        return None if d == self.missing else d
+
+    def shortest_path(self, service1, service2):
+        """Same contract as HospitalGraph.shortest_path: (path, cost) or None"""
+        if self.next_hop is None:
+            result = SearchAlgorithms(self, verbose=False).ucs(service1, service2)
+            return (result['path'], result['cost']) if result else None
+        cost = self.shortest_distance(service1, service2)
+        if cost is None:
+            return None
+
+        n = len(self)
+        goal = self.ids[service2]
+        current = self.ids[service1]
+        path = [service1]
+        while current != goal:
+            current = self.next_hop[current * n + goal]
+            path.append(self.names[current])
+        return path, cost
+
+    def close(self):
+        """Release every view and unmap the file"""
+        self._hierarchy = None
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._buffer.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __reduce__(self):
+        return (SnapshotGraph, (self.path,))
+
+
+def load_snapshot(path):
+    """Map a snapshot written by save_snapshot; returns a SnapshotGraph"""
+    return SnapshotGraph(path)
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    from hospital_graph import HospitalGraph
+
+    hospital = HospitalGraph()
+    path = os.path.join(tempfile.gettempdir(), 'hospital.snap')
+    save_snapshot(hospital, path, hierarchy=True)
+    print(f"Snapshot: {path} ({os.path.getsize(path)} bytes)")
+
+    start = time.perf_counter()
+    with load_snapshot(path) as graph:
+        print(f"Loaded in {(time.perf_counter() - start) * 1e3:.2f} ms: {len(graph)} services")
+        print("Table:", graph.shortest_path('Pharmacy', 'Laboratory'))
+        print("CH:", graph.hierarchy.query('Pharmacy', 'Laboratory'))
+        h = graph.landmark_heuristic.for_goal('Laboratory')
+        print("Landmark estimate Pharmacy -> Laboratory:", h.get('Pharmacy'))
@@ -0,0 +1,945 @@
+# ============================================
+# AUTOMATED TESTS
+# ============================================
+# Regression tests for the agent and the search engines. Exact engines
+# are checked against plain Dijkstra (UCS) or against brute-force
+# enumeration on small graphs.
+#
+# Run with:
+#   python test_project.py
+#   python -m pytest test_project.py
+
+from itertools import permutations
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+
+from algorithms import SearchAlgorithms
+from batch_planning import plan_missions
+from benchmark import grid_ward, multi_floor, random_geometric
+from compact_graph import CompactGraph
+from congestion import apply_congestion
+from distribution_agent import DistributionAgent
+from fleet_dispatcher import FleetDispatcher, hungarian
+from graph_loaders import iter_json_members, load_csv, load_geojson, load_graph, load_json
+from heuristics import make_heuristic
+from hierarchical_graph import HierarchicalGraph
+from hospital_graph import HospitalGraph
+from incremental_search import DStarLite
+from request_stream import StreamingPlanner, process_stream, read_requests
+from instrumentation import Histogram
+from planning_service import PlanningService
+from scheduler import DeliveryScheduler
+from snapshot import load_snapshot, save_snapshot
+from tour_planner import TourPlanner
+
+
+def path_cost(graph, path):
+    """Length of a path, checking that every corridor on it exists"""
+    total = 0
+    for a, b in zip(path, path[1:]):
+        distance = graph.get_distance(a, b)
+        assert distance is not None, f"no corridor {a} -> {b}"
+        total += distance
+    return total
+
+
+def sample_pairs(graph, count=60, seed=0):
+    """Random (start, goal) pairs, including start == goal"""
+    rng = random.Random(seed)
+    services = list(graph.services)
+    return [(rng.choice(services), rng.choice(services)) for _ in range(count)]
+
+
+def assert_matches_ucs(graph, query, pairs, reference=None):
+    """
+    query(search, start, goal) finds a route exactly as short as UCS
+    (on reference, default graph itself)
+    """
+    search = SearchAlgorithms(graph, verbose=False)
+    reference = SearchAlgorithms(reference if reference is not None else graph, verbose=False)
+    for start, goal in pairs:
+        expected = reference.ucs(start, goal)
+        result = query(search, start, goal)
+        if expected is None:
+            assert result is None, (start, goal)
+            continue
+        cost = expected['cost']
+        assert abs(result['cost'] - cost) <= 1e-9 * max(1, cost), (start, goal, result['cost'], cost)
+        assert result['path'][0] == start and result['path'][-1] == goal
+        assert abs(path_cost(graph, result['path']) - cost) <= 1e-9 * max(1, cost)
+
+
+def corridors(graph):
+    """Every corridor once, as (a, b)"""
+    return [(a, b) for a, neighbors in graph.graph.items() for b in neighbors if a < b]
+
+
+# ----------------------------------------
+# Graph loaders
+# ----------------------------------------
+
+def write_file(name, text):
+    path = os.path.join(tempfile.mkdtemp(), name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+
+def test_loaders_build_the_same_graph():
+    corridors = [('ICU', 'Surgery', 2), ('Surgery', 'Pharmacy', 4), ('ICU', 'Laboratory', 2.5)]
+    csv_path = write_file('plan.csv', "source,target,weight\n"
+                          + "".join(f"{a},{b},{d}\n" for a, b, d in corridors))
+    nodes_path = write_file('rooms.csv', "id,x,y,floor\nICU,0,0,2\nSurgery,1,0,2\n")
+    json_path = write_file('plan.json', json.dumps({
+        'services': [{'id': 'ICU', 'coordinates': [0, 0], 'floor': 2}, 'Surgery'],
+        'corridors': [{'from': a, 'to': b, 'distance': d} for a, b, d in corridors[:2]]
+                     + [list(corridors[2])]}))
+    points = {'ICU': [0, 0], 'Surgery': [2, 0], 'Pharmacy': [2, 4], 'Laboratory': [0, 2.5]}
+    geojson_path = write_file('plan.geojson', json.dumps({
+        'type': 'FeatureCollection',
+        'features': [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': xy},
+                      'properties': {'name': name, 'floor': 2}} for name, xy in points.items()]
+                    + [{'type': 'Feature',
+                        'geometry': {'type': 'LineString', 'coordinates': [points[a], points[b]]},
+                        'properties': {'from': a, 'to': b}} for a, b, _ in corridors]}))
+
+    expected = {'ICU': {'Surgery': 2, 'Laboratory': 2.5}, 'Surgery': {'ICU': 2, 'Pharmacy': 4},
+                'Pharmacy': {'Surgery': 4}, 'Laboratory': {'ICU': 2.5}}
+    for graph in (load_csv(csv_path, nodes=nodes_path), load_graph(json_path),
+                  load_geojson(geojson_path)):
+        assert graph.graph == expected
+        assert graph.coordinates['ICU'] == (0.0, 0.0)
+        assert graph.floors['ICU'] == 2
+        assert graph.shortest_distance('Pharmacy', 'Laboratory') == 8.5
+
+
+def test_loaders_check_corridor_symmetry():
+    csv_path = write_file('plan.csv', "from,to,distance\nA,B,3\nB,A,5\nB,C,1\n")
+    json_path = write_file('plan.json', '{"corridors": [["A", "B", 3], ["B", "A", 5], ["B", "C", 1]]}')
+    for load in (load_csv, load_json):
+        path = csv_path if load is load_csv else json_path
+        try:
+            load(path)
+        except ValueError as error:
+            assert 'Asymmetric' in str(error)
+        else:
+            raise AssertionError(f"{load.__name__} accepted an asymmetric corridor")
+        graph = load(path, strict=False)
+        assert graph.graph['A'] == {'B': 3} and graph.graph['B'] == {'A': 3, 'C': 1}
+
+
+def test_json_stream_across_chunk_boundaries():
+    document = json.dumps({'version': 12345.678, 'flag': True, 'corridors': [
+        ['A', 'B', 1234567], ['B', 'C', -0.000125], ['C', 'D', 1e-07]], 'note': None})
+    expected = list(iter_json_members(io.StringIO(document)))
+    assert expected[0] == ('version', 12345.678) and len(expected) == 6
+    for chunk_size in range(1, 40):
+        assert list(iter_json_members(io.StringIO(document), chunk_size)) == expected
+
+
+def test_json_stream_fails_fast_on_malformed_input():
+    class CountingReader(io.StringIO):
+        consumed = 0
+
+        def read(self, size=-1):
+            data = super().read(size)
+            self.consumed += len(data)
+            return data
+
+    document = '{"corridors": [["A", "B", 1], ["A" "C", 2]' + ', ["X", "Y", 1]' * 20000 + ']}'
+    reader = CountingReader(document)
+    try:
+        list(iter_json_members(reader, chunk_size=1024))
+    except ValueError:
+        assert reader.consumed <= 4096
+    else:
+        raise AssertionError("malformed JSON accepted")
+
+
+# ----------------------------------------
+# Corridor changes (path table, route cache, D* Lite)
+# ----------------------------------------
+
+def test_zero_length_corridor_mission():
+    path = os.path.join(tempfile.mkdtemp(), 'corridors.csv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("from,to,distance\nPharmacy,Lift,0\nLift,ICU,5\n")
+    agent = DistributionAgent(load_csv(path), verbose=False)
+
+    result = agent.execute_mission(['Lift', 'ICU'])
+    assert result['route'] == ['Pharmacy', 'Lift', 'ICU', 'Lift', 'Pharmacy']
+    assert result['deliveries'] == 2
+    assert result['distance'] == 10
+
+
+def test_dstar_lite_crosses_zero_length_corridors():
+    # A and B are joined by a 0-length corridor and are equally far from G
+    hospital = HospitalGraph({
+        'S': {'A': 1, 'X': 1},
+        'A': {'S': 1, 'B': 0, 'G': 5},
+        'B': {'A': 0, 'G': 5},
+        'X': {'S': 1, 'G': 20},
+        'G': {'A': 5, 'B': 5, 'X': 20}
+    })
+    planner = DStarLite(hospital, 'S', 'G')
+    try:
+        result = planner.plan()
+    finally:
+        planner.close()
+    assert result['cost'] == 6
+    assert path_cost(hospital, result['path']) == 6
+
+    agent = DistributionAgent(hospital, verbose=False)
+    agent.reset_mission('S')
+
+    def close_a_to_g(agent):
+        if agent.current_position == 'A':
+            hospital.block_edge('A', 'G')
+
+    agent.on_step = close_a_to_g
+    assert agent.follow_path(['S', 'A', 'G'], 'G')
+    assert agent.route == ['S', 'A', 'B', 'G']
+    assert agent.replans == 1
+
+
+def test_follow_path_stops_when_path_ends_early():
+    agent = DistributionAgent(verbose=False)
+    assert agent.follow_path(['Pharmacy', 'Surgery'], 'Laboratory') is False
+    assert agent.current_position == 'Surgery'
+
+
+def test_path_table_repaired_in_place():
+    hospital = grid_ward(6, 6)
+    hospital.build_path_table()
+    rng = random.Random(1)
+    edges = corridors(hospital)
+
+    for _ in range(40):
+        a, b = rng.choice(edges)
+        action = rng.choice(('block', 'unblock', 'longer', 'shorter'))
+        if action == 'block':
+            hospital.block_edge(a, b)
+        elif action == 'unblock':
+            hospital.unblock_edge(a, b)
+        elif hospital.get_distance(a, b) is not None:
+            distance = hospital.get_distance(a, b)
+            hospital.reweight_edge(a, b, distance + 3 if action == 'longer' else max(1, distance - 3))
+
+        # Repaired on the spot, not left for a full rebuild
+        assert hospital._path_table_version == hospital.version
+        distances, _ = hospital.get_path_table()
+        for source in hospital.graph:
+            expected, _ = hospital._shortest_path_tree(source)
+            assert distances[source] == expected
+        for target in ('W0-0', 'W5-5', 'W2-3'):
+            route = hospital.shortest_path('W3-0', target)
+            if route is not None:
+                assert path_cost(hospital, route[0]) == route[1]
+
+
+def test_route_cache_survives_unrelated_closures():
+    hospital = grid_ward(5, 5)
+    search = SearchAlgorithms(hospital, cache_size=64, verbose=False)
+    kept = search.ucs('W0-0', 'W0-4')
+    used = search.ucs('W4-0', 'W4-4')
+
+    # Close a corridor on the second route only
+    a, b = next((a, b) for a, b in zip(used['path'], used['path'][1:])
+                if {a, b}.isdisjoint(kept['path']))
+    hospital.block_edge(a, b)
+
+    again = search.ucs('W0-0', 'W0-4')
+    assert again['stats'].cache_hit
+    assert again['path'] == kept['path']
+
+    replanned = search.ucs('W4-0', 'W4-4')
+    assert not replanned['stats'].cache_hit
+    assert replanned['cost'] == SearchAlgorithms(hospital, verbose=False).ucs('W4-0', 'W4-4')['cost']
+    assert (a, b) not in zip(replanned['path'], replanned['path'][1:])
+
+
+def test_dstar_lite_matches_ucs_after_changes():
+    hospital = grid_ward(8, 8)
+    planner = DStarLite(hospital, 'W0-0', 'W7-7')
+    rng = random.Random(2)
+    edges = corridors(hospital)
+    try:
+        for _ in range(15):
+            result = planner.plan()
+            expected = SearchAlgorithms(hospital, verbose=False).ucs(planner.start, 'W7-7')
+            if expected is None:
+                assert result is None
+            else:
+                assert result['cost'] == expected['cost']
+                assert path_cost(hospital, result['path']) == expected['cost']
+                if len(result['path']) > 1:
+                    planner.move_to(result['path'][1])
+            a, b = rng.choice(edges)
+            if hospital.is_blocked(a, b):
+                hospital.unblock_edge(a, b)
+            else:
+                hospital.block_edge(a, b)
+    finally:
+        planner.close()
+
+
+def test_agent_replans_around_closure_while_travelling():
+    hospital = grid_ward(6, 6)
+    agent = DistributionAgent(hospital, verbose=False)
+    agent.reset_mission('W0-0')
+    plan = agent.plan_route('W5-5')
+    closed = []
+
+    def close_next_corridor(agent):
+        # At the second room of the plan, close the corridor ahead
+        if not closed and agent.current_position == plan['path'][1]:
+            closed.append((plan['path'][1], plan['path'][2]))
+            hospital.block_edge(*closed[0])
+
+    agent.on_step = close_next_corridor
+    assert agent.follow_path(plan['path'], 'W5-5')
+    assert agent.replans == 1
+    assert closed[0] not in zip(agent.route, agent.route[1:])
+    rest = SearchAlgorithms(hospital, verbose=False).ucs(plan['path'][1], 'W5-5')['cost']
+    assert agent.total_distance == hospital.graph['W0-0'][plan['path'][1]] + rest
+
+
+# ----------------------------------------
+# Time-dependent travel times
+# ----------------------------------------
+
+def earliest_arrivals(graph, source, departure):
+    """Brute force: relax every corridor until no arrival time improves"""
+    arrival = {source: departure}
+    changed = True
+    while changed:
+        changed = False
+        for a, t in list(arrival.items()):
+            for b in graph.get_neighbors(a):
+                t_new = t + graph.travel_time(a, b, t)
+                if t_new < arrival.get(b, float('inf')) - 1e-9:
+                    arrival[b] = t_new
+                    changed = True
+    return arrival
+
+
+def test_time_dependent_search_matches_brute_force():
+    ward = grid_ward(6, 6)
+    apply_congestion(ward)
+    search = SearchAlgorithms(ward, verbose=False)
+    heuristics = make_heuristic(ward)
+    rng = random.Random(7)
+    for start, goal in sample_pairs(ward, 100, seed=7):
+        departure = rng.uniform(0, 24 * 60)
+        expected = earliest_arrivals(ward, start, departure)[goal]
+        for result in (search.td_ucs(start, goal, departure),
+                       search.td_a_star(start, goal, departure, heuristics.for_goal(goal))):
+            assert abs(result['arrival'] - expected) <= 1e-6, (start, goal, departure)
+            clock = departure
+            for a, b in zip(result['path'], result['path'][1:]):
+                clock += ward.travel_time(a, b, clock)
+            assert abs(clock - result['arrival']) <= 1e-6
+
+
+def test_profiles_keep_static_tables():
+    hospital = HospitalGraph()
+    search = SearchAlgorithms(hospital, cache_size=16, verbose=False)
+    search.ucs('Pharmacy', 'ICU')
+    version = hospital.version
+    apply_congestion(hospital)
+    assert hospital.version == version and hospital.profile_version > 0
+    assert hospital._path_table_version == version
+    assert search.ucs('Pharmacy', 'ICU')['stats'].cache_hit
+
+
+# ----------------------------------------
+# Tour planning
+# ----------------------------------------
+
+def test_tour_planner_matches_brute_force():
+    graph = random_geometric(60, seed=5)
+    planner = TourPlanner(graph)
+    rng = random.Random(3)
+    for _ in range(5):
+        start, *stops = rng.sample(graph.services, 8)
+        distances = planner.matrix = planner.distance_matrix([start] + stops)
+        optimum = min(planner.tour_cost(start, order) for order in permutations(stops))
+
+        order, cost = planner.plan(start, stops, 'exact', distances)
+        assert sorted(order) == sorted(stops)
+        assert abs(cost - optimum) <= 1e-9 and abs(planner.tour_cost(start, order) - cost) <= 1e-9
+
+        order, cost = planner.plan(start, stops, 'heuristic', distances)
+        assert sorted(order) == sorted(stops)
+        greedy = planner.tour_cost(start, planner.nearest_neighbor(start, stops))
+        assert optimum - 1e-9 <= cost <= greedy + 1e-9
+
+
+def test_tour_mode_keeps_every_request():
+    agent = DistributionAgent(verbose=False)
+    requests = ['ICU', 'ICU', 'Pharmacy', 'Laboratory']
+    in_order = agent.execute_mission(requests)
+    for tour in ('auto', 'exact', 'heuristic'):
+        result = agent.execute_mission(requests, tour=tour)
+        assert result['deliveries'] == 4
+        assert sorted(result['delivered']) == sorted(requests)
+        assert result['distance'] <= in_order['distance']
+
+
+# ----------------------------------------
+# Delivery scheduling
+# ----------------------------------------
+
+def random_orders(graph, count, seed=0):
+    rng = random.Random(seed)
+    services = [s for s in graph.services if s != 'W0-0']
+    orders = []
+    for number in range(count):
+        ready = rng.choice((0, 0, rng.randint(0, 200)))
+        orders.append({
+            'id': f'o{number}',
+            'service': rng.choice(services),
+            'items': rng.randint(1, 3),
+            'priority': rng.randint(1, 3),
+            'ready': ready,
+            'deadline': rng.choice((None, ready + rng.randint(20, 300)))
+        })
+    return orders
+
+
+def assert_valid_schedule(scheduler, orders, plan, unreachable):
+    served = [stop['id'] for trip in plan['trips'] for stop in trip['stops']]
+    assert sorted(served) == sorted(o['id'] for o in orders if o['id'] not in unreachable)
+    assert sorted(o['id'] for o in plan['unreachable']) == sorted(unreachable)
+    for trip in plan['trips']:
+        assert trip['stops']
+        assert trip['load'] == sum(stop['items'] for stop in trip['stops']) <= scheduler.capacity
+        for stop in trip['stops']:
+            assert stop['arrival'] >= stop['ready']
+    assert plan['late'] + plan['on_time'] == len(served)
+
+
+def test_schedule_respects_capacity_and_reports_unreachable():
+    ward = grid_ward(6, 6)
+    for neighbor in list(ward.graph['W5-5']):
+        ward.block_edge('W5-5', neighbor)
+    orders = random_orders(ward, 40)
+    orders.append({'id': 'cut-off', 'service': 'W5-5'})
+    orders.append({'id': 'oversize', 'service': 'W2-2', 'items': 5})
+
+    scheduler = DeliveryScheduler(ward, capacity=4, depot='W0-0')
+    plan = scheduler.schedule(orders, time_budget=0.2)
+    unreachable = ['cut-off', 'oversize'] + [o['id'] for o in orders if o['service'] == 'W5-5']
+    assert_valid_schedule(scheduler, orders, plan, list(dict.fromkeys(unreachable)))
+
+
+def test_schedule_serves_urgent_orders_first():
+    hospital = HospitalGraph()
+    deadline = hospital.shortest_distance('Pharmacy', 'ICU') + 1
+    orders = [{'id': 'routine', 'service': 'ICU', 'priority': 1, 'deadline': deadline},
+              {'id': 'urgent', 'service': 'ICU', 'priority': 3, 'deadline': deadline}]
+    # One item per trip: only the first trip can make the deadline
+    plan = DeliveryScheduler(hospital, capacity=1).schedule(orders, time_budget=0.1)
+    first, second = (trip['stops'][0] for trip in plan['trips'])
+    assert (first['id'], first['lateness']) == ('urgent', 0)
+    assert second['id'] == 'routine' and second['lateness'] > 0
+
+
+def test_schedule_stays_within_time_budget():
+    ward = grid_ward(10, 10)
+    orders = random_orders(ward, 400, seed=1)
+    scheduler = DeliveryScheduler(ward, capacity=4, depot='W0-0')
+    plan = scheduler.schedule(orders, time_budget=0.05)
+    assert plan['planning_time'] < 0.05 + 0.25
+    assert_valid_schedule(scheduler, orders, plan, [])
+
+
+# ----------------------------------------
+# Batch planning
+# ----------------------------------------
+
+class UnpicklableGraph(HospitalGraph):
+    """Fails if plan_missions pickles it to the workers"""
+
+    def __getstate__(self):
+        raise TypeError("graph was pickled")
+
+
+def test_batch_planning_same_results_in_workers():
+    hospital = HospitalGraph()
+    destinations = [s for s in hospital.services if s != 'Pharmacy']
+    rng = random.Random(8)
+    batch = [rng.sample(destinations, rng.randint(1, 4)) for _ in range(60)]
+
+    def summary(results):
+        return [(r['requests'], r['route'], r['distance'], r['delivered']) for r in results]
+
+    for algorithm, tour in (('ucs', None), ('astar', 'auto')):
+        alone = plan_missions(batch, algorithm, workers=1, tour=tour, graph=hospital)
+        pooled = plan_missions(batch, algorithm, workers=3, tour=tour, graph=hospital)
+        assert summary(alone) == summary(pooled)
+
+
+def test_batch_workers_inherit_graph_without_pickling():
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return
+    results = plan_missions([['ICU'], ['Laboratory', 'Emergency']], workers=2,
+                            graph=UnpicklableGraph())
+    assert [r['deliveries'] for r in results] == [1, 2]
+
+
+# ----------------------------------------
+# Fleet dispatching
+# ----------------------------------------
+
+def test_hungarian_matches_brute_force():
+    rng = random.Random(6)
+    for _ in range(200):
+        rows = rng.randint(1, 5)
+        cols = rng.randint(rows, 6)
+        cost = [[rng.randint(0, 20) for _ in range(cols)] for _ in range(rows)]
+        assignment = hungarian(cost)
+        assert len(set(assignment)) == rows
+        best = min(sum(cost[i][j] for i, j in enumerate(columns))
+                   for columns in permutations(range(cols), rows))
+        assert sum(cost[i][j] for i, j in enumerate(assignment)) == best
+
+
+def test_fleet_needs_an_agent():
+    for num_agents in (0, -1):
+        try:
+            FleetDispatcher(num_agents)
+        except ValueError:
+            continue
+        raise AssertionError(f"num_agents={num_agents} accepted")
+
+
+def test_fleet_on_compact_graph():
+    requests = ['ICU', 'Laboratory', 'Emergency', 'Radiology', 'Cardiology', 'ICU']
+    reports = [FleetDispatcher(3, graph).run(requests)
+               for graph in (HospitalGraph(), CompactGraph.from_graph(HospitalGraph()))]
+    for report in reports:
+        assert report['deliveries'] == len(requests)
+        assert all(agent['route'][-1] == 'Pharmacy' for agent in report['agents'])
+    assert [agent['route'] for agent in reports[0]['agents']] == \
+        [agent['route'] for agent in reports[1]['agents']]
+
+
+# ----------------------------------------
+# Streaming requests
+# ----------------------------------------
+
+def test_read_requests_skips_bad_lines():
+    lines = io.StringIO("\n".join([
+        '{"id": "r1", "services": ["ICU", "Laboratory"]}',
+        '{"id": "r2", "service": "Emergency"}',
+        '["Cardiology", "Radiology"]',
+        '{"id": "r4", "services": "Surgery"}',
+        '{"services": []}',
+        '{"id": "r6"}',
+        '{"services": [1, 2]}',
+        '42',
+        'not json',
+        ''
+    ]))
+    assert list(read_requests(lines)) == [
+        {'id': 'r1', 'services': ['ICU', 'Laboratory']},
+        {'id': 'r2', 'services': ['Emergency']},
+        {'id': 3, 'services': ['Cardiology', 'Radiology']},
+        {'id': 'r4', 'services': ['Surgery']}
+    ]
+
+
+def test_streaming_insertion_is_cheapest():
+    graph = grid_ward(6, 6)
+    planner = StreamingPlanner(DistributionAgent(graph, verbose=False), depot='W0-0')
+    rng = random.Random(4)
+
+    def length(stops):
+        route = [planner.agent.current_position] + stops + [planner.depot]
+        return sum(planner.distance(a, b) for a, b in zip(route, route[1:]))
+
+    for number in range(12):
+        service = rng.choice(graph.services)
+        before = [stop[0] for stop in planner.stops]
+        planner.add_request({'id': number, 'services': [service]})
+        after = [stop[0] for stop in planner.stops]
+        if service in before:
+            assert after == before
+        else:
+            best = min(length(before[:i] + [service] + before[i:]) for i in range(len(before) + 1))
+            assert length(after) == best
+        if number % 3 == 2:
+            assert planner.step()['event'] == 'delivered'
+
+
+def test_stream_on_compact_graph():
+    lines = ['["ICU", "Nowhere"]', '{"service": "Laboratory"}', '["Cardiology", "ICU"]']
+    outputs = []
+    for graph in (HospitalGraph(), CompactGraph.from_graph(HospitalGraph())):
+        out = io.StringIO()
+        planner = StreamingPlanner(DistributionAgent(graph, verbose=False))
+        assert process_stream(read_requests(io.StringIO("\n".join(lines))), out, planner) == 4
+        assert planner.agent.route == ['Pharmacy']
+        outputs.append(out.getvalue())
+    assert outputs[0] == outputs[1]
+    assert '"rejected"' in outputs[0]
+
+
+# ----------------------------------------
+# Planning service
+# ----------------------------------------
+
+async def http(port, request):
+    """Send one raw HTTP request; returns (status, JSON payload)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request.encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+def get(target):
+    return f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n"
+
+
+def run_service(scenario, **options):
+    """Run scenario(service, port) against a service on a free port"""
+    async def main():
+        service = PlanningService(**options)
+        server = await service.start(port=0)
+        try:
+            return await scenario(service, server.sockets[0].getsockname()[1])
+        finally:
+            await service.close()
+    return asyncio.run(main())
+
+
+def test_service_coalesces_identical_queries():
+    async def scenario(service, port):
+        replies = await asyncio.gather(
+            *(http(port, get('/plan?source=Pharmacy&goal=ICU')) for _ in range(25)))
+        return service.stats, replies
+
+    stats, replies = run_service(scenario, batch_window=0.05)
+    expected = SearchAlgorithms(HospitalGraph(), verbose=False).ucs('Pharmacy', 'ICU')
+    assert all(status == 200 and payload['cost'] == expected['cost'] for status, payload in replies)
+    assert stats['queries'] == 25
+    assert stats['searches'] == 25 - stats['coalesced']
+    assert stats['coalesced'] >= 20
+
+
+def test_service_batches_goals_into_one_sweep():
+    goals = ['ICU', 'Laboratory', 'Radiology', 'Cardiology', 'Emergency']
+
+    async def scenario(service, port):
+        replies = await asyncio.gather(
+            *(http(port, get(f'/plan?source=Pharmacy&goal={goal}')) for goal in goals))
+        return service.stats, replies
+
+    stats, replies = run_service(scenario, batch_window=0.05)
+    reference = SearchAlgorithms(HospitalGraph(), verbose=False)
+    for goal, (status, payload) in zip(goals, replies):
+        assert status == 200
+        assert payload['cost'] == reference.ucs('Pharmacy', goal)['cost']
+        assert payload['path'][-1] == goal
+    assert stats['batches'] == 1 and stats['multi_sweeps'] == 1 and stats['searches'] == 1
+
+
+def test_service_rejects_bad_requests():
+    def post(length, body=''):
+        return (f"POST /plan HTTP/1.1\r\nContent-Length: {length}\r\n"
+                f"Connection: close\r\n\r\n{body}")
+
+    async def scenario(service, port):
+        def broken(*args):
+            raise RuntimeError("search exploded")
+        replies = [await http(port, request) for request in (
+            post('abc'), post(-5), get('/plan?goal=ICU'), get('/plan?source=Pharmacy&goal=Nowhere'),
+            get('/plan?source=Pharmacy&goal=ICU&algorithm=magic'), get('/nowhere'))]
+        service.agent.plan_route = broken
+        replies.append(await http(port, get('/plan?source=Pharmacy&goal=ICU&algorithm=astar')))
+        return replies
+
+    replies = run_service(scenario)
+    assert [status for status, _ in replies] == [400, 400, 400, 404, 400, 404, 500]
+    assert 'exploded' not in replies[-1][1]['error']
+
+
+# ----------------------------------------
+# Exact searches
+# ----------------------------------------
+
+def exact_test_graphs():
+    return grid_ward(10, 10), random_geometric(150), multi_floor(2, 5, 5), HospitalGraph()
+
+
+def test_bidirectional_searches_match_ucs():
+    for graph in exact_test_graphs():
+        heuristics = make_heuristic(graph)
+        pairs = sample_pairs(graph, 100)
+        assert_matches_ucs(graph, lambda search, start, goal: search.bidirectional_ucs(start, goal), pairs)
+        assert_matches_ucs(graph, lambda search, start, goal: search.bidirectional_a_star(
+            start, goal, heuristics.for_goal(goal), heuristics.for_goal(start)), pairs)
+
+
+def test_table_lookup_matches_ucs():
+    for graph in exact_test_graphs():
+        assert_matches_ucs(graph, lambda search, start, goal: search.table_lookup(start, goal),
+                           sample_pairs(graph, 100))
+
+
+def test_compact_searches_match_ucs():
+    for graph in exact_test_graphs():
+        compact = CompactGraph.from_graph(graph)
+        heuristics = make_heuristic(graph)
+        pairs = sample_pairs(graph, 100)
+        assert_matches_ucs(compact, lambda search, start, goal: search.ucs(start, goal),
+                           pairs, reference=graph)
+        assert_matches_ucs(compact, lambda search, start, goal: search.a_star(
+            start, goal, heuristics.for_goal(goal)), pairs, reference=graph)
+
+
+def test_ucs_multi_matches_ucs():
+    for graph in exact_test_graphs():
+        goals = list(graph.services)[::3]
+        for source in list(graph.services)[::7]:
+            results = SearchAlgorithms(graph, verbose=False).ucs_multi(source, goals)
+            assert set(results) == set(goals)
+            assert_matches_ucs(graph, lambda search, start, goal: results[goal],
+                               [(source, goal) for goal in goals])
+
+
+# ----------------------------------------
+# Contraction hierarchies
+# ----------------------------------------
+
+def ch_query(search, start, goal):
+    return search.ch_query(start, goal)
+
+
+def test_ch_matches_ucs():
+    hospital = HospitalGraph()
+    everything = [(a, b) for a in hospital.services for b in hospital.services]
+    assert_matches_ucs(hospital, ch_query, everything)
+    for graph in (grid_ward(8, 8), random_geometric(80)):
+        assert_matches_ucs(graph, ch_query, sample_pairs(graph))
+
+
+def test_ch_matches_ucs_on_compact_graphs():
+    compact = CompactGraph.from_graph(grid_ward(8, 8, seed=3))
+    assert_matches_ucs(compact, ch_query, sample_pairs(compact))
+
+    folder = tempfile.mkdtemp()
+    for hierarchy in (True, False):
+        path = os.path.join(folder, f'ward-{hierarchy}.snapshot')
+        save_snapshot(grid_ward(8, 8, seed=4), path, hierarchy=hierarchy)
+        with load_snapshot(path) as snapshot:
+            assert_matches_ucs(snapshot, ch_query, sample_pairs(snapshot))
+
+
+def test_ch_follows_graph_edits():
+    hospital = grid_ward(6, 6)
+    search = SearchAlgorithms(hospital, verbose=False)
+    search.ch_query('W0-0', 'W5-5')
+    hospital.block_edge('W0-0', 'W0-1')
+    hospital.reweight_edge('W1-0', 'W2-0', 40)
+    result = search.ch_query('W0-0', 'W5-5')
+    assert result['cost'] == SearchAlgorithms(hospital, verbose=False).ucs('W0-0', 'W5-5')['cost']
+
+
+# ----------------------------------------
+# Hierarchical search (HPA*)
+# ----------------------------------------
+
+def hpa_query(graph, cluster_size=8):
+    """Query function for a hierarchy with small clusters, so even
+    small test wards span several clusters and levels"""
+    hierarchy = HierarchicalGraph(graph, cluster_size=cluster_size)
+    return lambda search, start, goal: hierarchy.query(start, goal)
+
+
+def test_hpa_matches_ucs():
+    hospital = HospitalGraph()
+    everything = [(a, b) for a in hospital.services for b in hospital.services]
+    assert_matches_ucs(hospital, hpa_query(hospital, cluster_size=3), everything)
+    for graph in (multi_floor(3, 5, 5), grid_ward(10, 10), random_geometric(120)):
+        assert_matches_ucs(graph, hpa_query(graph), sample_pairs(graph, 100))
+
+
+def test_hpa_matches_ucs_on_compact_graphs():
+    compact = CompactGraph.from_graph(grid_ward(10, 10, seed=3))
+    assert_matches_ucs(compact, hpa_query(compact), sample_pairs(compact))
+
+    path = os.path.join(tempfile.mkdtemp(), 'floors.snapshot')
+    save_snapshot(multi_floor(2, 6, 6), path)
+    with load_snapshot(path) as snapshot:
+        assert_matches_ucs(snapshot, hpa_query(snapshot), sample_pairs(snapshot))
+        assert_matches_ucs(snapshot, lambda search, start, goal: search.hpa_query(start, goal),
+                           sample_pairs(snapshot, 20))
+
+
+def test_hpa_follows_graph_edits():
+    hospital = multi_floor(2, 5, 5)
+    query = hpa_query(hospital)
+    pairs = sample_pairs(hospital, 30)
+    assert_matches_ucs(hospital, query, pairs)
+    for a, b in corridors(hospital)[::7]:
+        hospital.block_edge(a, b)
+    assert_matches_ucs(hospital, query, pairs)
+
+
+# ----------------------------------------
+# Weighted and anytime A* (ARA*)
+# ----------------------------------------
+
+def assert_within_bound(graph, run, pairs):
+    """run(search, heuristic, start, goal) stays within its proven bound of UCS"""
+    heuristics = make_heuristic(graph)
+    search = SearchAlgorithms(graph, verbose=False)
+    results = []
+    for start, goal in pairs:
+        optimum = search.ucs(start, goal)
+        result = run(search, heuristics.for_goal(goal), start, goal)
+        if optimum is None:
+            assert result is None, (start, goal)
+            continue
+        cost = path_cost(graph, result['path'])
+        assert abs(cost - result['cost']) <= 1e-9 * max(1, cost)
+        assert result['path'][0] == start and result['path'][-1] == goal
+        assert 1 <= result['bound'] <= result['epsilon']
+        assert cost <= result['bound'] * optimum['cost'] + 1e-9, (start, goal, cost, optimum['cost'])
+        results.append((result, optimum))
+    return results
+
+
+def test_weighted_a_star_within_epsilon():
+    for graph in (grid_ward(12, 12), random_geometric(150)):
+        for epsilon in (1.5, 3.0):
+            results = assert_within_bound(
+                graph, lambda search, heuristic, start, goal:
+                    search.weighted_a_star(start, goal, heuristic, epsilon),
+                sample_pairs(graph))
+            assert all(result['epsilon'] == epsilon for result, _ in results)
+
+
+def test_anytime_a_star_reaches_optimum():
+    for graph in (grid_ward(12, 12), random_geometric(150)):
+        results = assert_within_bound(
+            graph, lambda search, heuristic, start, goal:
+                search.anytime_a_star(start, goal, heuristic, deadline_ms=10000),
+            sample_pairs(graph))
+        for result, optimum in results:
+            assert result['bound'] == 1.0
+            assert abs(result['cost'] - optimum['cost']) <= 1e-9 * max(1, optimum['cost'])
+
+
+def test_anytime_a_star_keeps_first_route_without_time():
+    graph = random_geometric(150)
+    assert_within_bound(
+        graph, lambda search, heuristic, start, goal:
+            search.anytime_a_star(start, goal, heuristic, deadline_ms=0, epsilon=5.0),
+        sample_pairs(graph))
+
+
+# ----------------------------------------
+# K shortest paths (Yen)
+# ----------------------------------------
+
+def simple_paths(graph, start, goal):
+    """Every loopless path start -> goal with its cost (brute force)"""
+    found = []
+    stack = [(start, [start], 0)]
+    while stack:
+        current, path, cost = stack.pop()
+        if current == goal:
+            found.append((cost, path))
+            continue
+        for neighbor, distance in graph.get_neighbors(current).items():
+            if neighbor not in path:
+                stack.append((neighbor, path + [neighbor], cost + distance))
+    return found
+
+
+def assert_k_shortest(graph, pairs, k):
+    search = SearchAlgorithms(graph, verbose=False)
+    for start, goal in pairs:
+        routes = search.k_shortest_paths(start, goal, k)
+        expected = sorted(simple_paths(graph, start, goal))[:k]
+        assert [route['cost'] for route in routes] == [cost for cost, _ in expected], (start, goal)
+
+        seen = set()
+        for route in routes:
+            path = tuple(route['path'])
+            assert path not in seen and len(set(path)) == len(path)
+            assert path[0] == start and path[-1] == goal
+            assert path_cost(graph, path) == route['cost']
+            seen.add(path)
+
+
+def test_k_shortest_paths_match_brute_force():
+    hospital = HospitalGraph()
+    assert_k_shortest(hospital, [(a, b) for a in hospital.services for b in hospital.services if a != b], 6)
+    ward = grid_ward(4, 4)
+    assert_k_shortest(ward, sample_pairs(ward, 25), 8)
+
+
+def test_k_shortest_paths_when_routes_run_out():
+    hospital = HospitalGraph()
+    start, goal = 'Pharmacy', 'Laboratory'
+    total = len(simple_paths(hospital, start, goal))
+    routes = SearchAlgorithms(hospital, verbose=False).k_shortest_paths(start, goal, total + 5)
+    assert len(routes) == total
+
+    ward = grid_ward(3, 3)
+    for a, b in corridors(ward):
+        if 'W1-1' in (a, b):
+            ward.block_edge(a, b)
+    assert SearchAlgorithms(ward, verbose=False).k_shortest_paths('W0-0', 'W1-1', 3) == []
+
+
+# ----------------------------------------
+# Instrumentation
+# ----------------------------------------
+
+def test_histogram_keeps_sub_second_values():
+    histogram = Histogram()
+    for seconds in (0.6, 0.7, 0.8):
+        histogram.add(seconds)
+    assert histogram.percentile(50) == 0.8
+    assert histogram.summary()['buckets'] == {1.0: 3}
+
+    histogram.add(0)
+    histogram.add(0.0003)
+    summary = histogram.summary()
+    assert summary['buckets'] == {0: 1, 2 ** -11: 1, 1.0: 3}
+    assert histogram.percentile(20) == 0
+    assert 0.0003 <= histogram.percentile(40) <= 2 ** -11
+    assert summary['p99'] == 0.8
+
+
+def run_all():
+    tests = [(name, test) for name, test in globals().items()
+             if name.startswith('test_') and callable(test)]
+    failures = 0
+    for name, test in tests:
+        try:
+            test()
+        except Exception as error:
+            failures += 1
+            print(f"FAIL {name}: {type(error).__name__}: {error}")
+        else:
+            print(f"ok   {name}")
+    print(f"\n{len(tests) - failures}/{len(tests)} tests passed")
+    return failures
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if run_all() else 0)
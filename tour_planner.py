@@ -0,0 +1,211 @@
+# ============================================
+# TOUR PLANNER
+# ============================================
+# Chooses the order in which requested services are visited
+# - Held-Karp dynamic programming (exact) for small request sets
+# - Nearest neighbor + 2-opt / Or-opt improvement for larger ones
+# Tours start and end at the same service (Pharmacy)
+# Leg costs come from a distance matrix built with one ucs_multi sweep
+# per stop (n searches instead of one per pair)
+
+from algorithms import SearchAlgorithms
+
+INFINITY = float('inf')
+
+
+class TourPlanner:
+
+    def __init__(self, graph, exact_limit=12, search=None):
+        """
+        graph: HospitalGraph
+        exact_limit: largest number of stops solved with Held-Karp
+        search: SearchAlgorithms to run the sweeps with (e.g. the agent's,
+        so its route cache is shared); a quiet one is created by default
+        """
+        self.graph = graph
+        self.exact_limit = exact_limit
+        self.search = search if search is not None else SearchAlgorithms(graph, verbose=False)
+        self.matrix = {}
+
+
+    def distance_matrix(self, services):
+        """matrix[a][b] = shortest distance (None if unreachable), one sweep per service"""
+        services = list(dict.fromkeys(services))
+        matrix = {}
+        for source in services:
+            results = self.search.ucs_multi(source, services)
+            matrix[source] = {goal: (r['cost'] if r else None) for goal, r in results.items()}
+        return matrix
+
+
+    def distance(self, service1, service2):
+        d = self.matrix.get(service1, {}).get(service2)
+        return INFINITY if d is None else d
+
+
+    def tour_cost(self, start, order):
+        """Length of start -> order... -> start"""
+        stops = [start] + list(order) + [start]
+        return sum(self.distance(a, b) for a, b in zip(stops, stops[1:]))
+
+
+    def plan(self, start, services, method='auto', distances=None):
+        """
+        Return (order, cost) for visiting every service once.
+
+        method: 'exact', 'heuristic' or 'auto' (exact up to exact_limit stops)
+        distances: optional precomputed matrix covering start and services
+        Every request is kept: a service requested several times appears
+        on consecutive stops (one visit), requests for start come first.
+        Unreachable services are kept at the end of the order.
+        """
+        if distances is None:
+            distances = self.distance_matrix([start] + list(services))
+        self.matrix = distances
+
+        repeats = {}
+        for service in services:
+            repeats[service] = repeats.get(service, 0) + 1
+        at_start = [start] * repeats.pop(start, 0)
+
+        stops = []
+        unreachable = []
+        for service in repeats:
+            if self.distance(start, service) == INFINITY:
+                unreachable.append(service)
+            else:
+                stops.append(service)
+
+        if method == 'auto':
+            method = 'exact' if len(stops) <= self.exact_limit else 'heuristic'
+
+        if method == 'exact':
+            order = self.held_karp(start, stops)
+        elif method == 'heuristic':
+            order = self.nearest_neighbor(start, stops)
+            order = self.improve(start, order)
+        else:
+            raise ValueError(f"Unknown tour method: {method}")
+
+        visits = [service for service in order + unreachable for _ in range(repeats[service])]
+        return at_start + visits, self.tour_cost(start, order)
+
+
+    def held_karp(self, start, stops):
+        """Exact DP over subsets: O(2^n * n^2)"""
+        n = len(stops)
+        if n <= 1:
+            return list(stops)
+
+        dist = [[self.distance(a, b) for b in stops] for a in stops]
+        from_start = [self.distance(start, b) for b in stops]
+        to_start = [self.distance(a, start) for a in stops]
+
+        # cost[mask][j]: shortest path from start through `mask`, ending at j
+        full = 1 << n
+        cost = [[INFINITY] * n for _ in range(full)]
+        parent = [[-1] * n for _ in range(full)]
+        for j in range(n):
+            cost[1 << j][j] = from_start[j]
+
+        for mask in range(1, full):
+            row = cost[mask]
+            for j in range(n):
+                c = row[j]
+                if c == INFINITY:
+                    continue
+                dist_j = dist[j]
+                for k in range(n):
+                    if mask & (1 << k):
+                        continue
+                    new_mask = mask | (1 << k)
+                    new_cost = c + dist_j[k]
+                    if new_cost < cost[new_mask][k]:
+                        cost[new_mask][k] = new_cost
+                        parent[new_mask][k] = j
+
+        mask = full - 1
+        last = min(range(n), key=lambda j: cost[mask][j] + to_start[j])
+
+        order = []
+        while last != -1:
+            order.append(stops[last])
+            last, mask = parent[mask][last], mask & ~(1 << last)
+        order.reverse()
+
+        return order
+
+
+    def nearest_neighbor(self, start, stops):
+        """Greedy construction: always go to the closest unvisited stop"""
+        remaining = list(stops)
+        order = []
+        current = start
+
+        while remaining:
+            nearest = min(remaining, key=lambda s: self.distance(current, s))
+            remaining.remove(nearest)
+            order.append(nearest)
+            current = nearest
+
+        return order
+
+
+    def improve(self, start, order):
+        """Alternate 2-opt and Or-opt until neither finds an improvement"""
+        tour = [start] + list(order) + [start]
+        improved = True
+        while improved:
+            improved = self._two_opt(tour)
+            improved = self._or_opt(tour) or improved
+        return tour[1:-1]
+
+
+    def _two_opt(self, tour):
+        """Reverse tour[i:k+1] whenever it shortens the tour (symmetric costs)"""
+        d = self.distance
+        improved = False
+        n = len(tour)
+
+        for i in range(1, n - 2):
+            for k in range(i + 1, n - 1):
+                a, b = tour[i - 1], tour[i]
+                c, e = tour[k], tour[k + 1]
+                delta = d(a, c) + d(b, e) - d(a, b) - d(c, e)
+                if delta < 0:
+                    tour[i:k + 1] = reversed(tour[i:k + 1])
+                    improved = True
+
+        return improved
+
+
+    def _or_opt(self, tour):
+        """Move segments of 1 to 3 consecutive stops to a better position"""
+        d = self.distance
+        improved = False
+
+        for length in (1, 2, 3):
+            i = 1
+            while i + length < len(tour):
+                segment = tour[i:i + length]
+                prev, nxt = tour[i - 1], tour[i + length]
+                removal_gain = d(prev, segment[0]) + d(segment[-1], nxt) - d(prev, nxt)
+
+                rest = tour[:i] + tour[i + length:]
+                best_delta = 0
+                best_pos = None
+                for j in range(len(rest) - 1):
+                    if j == i - 1:
+                        continue
+                    a, b = rest[j], rest[j + 1]
+                    delta = d(a, segment[0]) + d(segment[-1], b) - d(a, b) - removal_gain
+                    if delta < best_delta:
+                        best_delta = delta
+                        best_pos = j + 1
+
+                if best_pos is not None:
+                    tour[:] = rest[:best_pos] + segment + rest[best_pos:]
+                    improved = True
+                i += 1
+
+        return improved